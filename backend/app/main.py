@@ -1,4 +1,5 @@
-from fastapi import FastAPI, UploadFile, File, Depends
+from fastapi import FastAPI, UploadFile, File, Depends, Header, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
@@ -13,17 +14,24 @@ from app.services.pricing_service import PricingService, MockScraperService
 from app.services.seasonality_service import SeasonalityService
 from app.services.scraper_service import RealScraperService
 from app.services.smart_search_service import SmartSearchService
-from app.services.image_analyzer_service import ImageAnalyzerService
+from app.services.image_analyzer_service import ImageAnalyzerService, IMAGE_UPLOAD_MAX_BYTES
+from app.services.image_cache_service import get_image_cache
 from app.services.url_scraper_service import URLScraperService
 from app.services.url_scraper_service import URLScraperService
 from app.services.graph_service import GraphService
 from app.services.curated_feed_service import CuratedFeedService
+from app.services.io_pool import run_blocking
+from app.services.tracing_service import traced, trace_span, aggregate_traces, recent_traces
+from app.services.metrics_service import get_metrics_registry, observe_request, HTTP_IN_FLIGHT, THREADPOOL_WORKERS, THREADPOOL_BUSY, THREADPOOL_WAITING
 from app.database import engine, Base, get_db
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
+import contextvars
 import datetime
 import base64
+import json
+import time
 
 # Create tables
 Base.metadata.create_all(bind=engine)
@@ -45,6 +53,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Endpoint latency histogram, labelled by route template (not raw path)."""
+    start = time.perf_counter()
+    status = 500
+    HTTP_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        observe_request(request.method, getattr(route, "path", "unmatched"), status, time.perf_counter() - start)
+
 # Services
 pricing_service = PricingService()
 mock_scraper = MockScraperService()
@@ -173,16 +196,24 @@ feed_service = CuratedFeedService()
 
 # ...
 
+def _with_trace(result: dict, trace, debug_header: Optional[str]) -> dict:
+    """Attach the trace summary when requested (shallow copy: `result` may be a cached dict)."""
+    if not debug_header or not isinstance(result, dict):
+        return result
+    return {**result, "trace": trace.summary()}
+
 @app.get("/discovery/search")
-def search_products(
+async def search_products(
     q: Optional[str] = None, 
     brand: Optional[str] = None,
     location: Optional[str] = "Mumbai", 
     anonymous_id: Optional[str] = None, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    x_debug_trace: Optional[str] = Header(None)
 ):
     """
     Smart Search: Uses LLM to analyze query + SerpApi to fetch results
+    Send `X-Debug-Trace: 1` to get per-stage timings and call costs in the response.
     """
     # Robustness: Allow brand to substitute for q
     if not q and brand:
@@ -197,19 +228,81 @@ def search_products(
     # This ensures we keep the original URL context for ranking
     search_term = q.strip()
 
-    # Record search in graph (using clean term)
+    with traced("smart_search", endpoint="/discovery/search") as trace:
+        # Record search in graph (using clean term)
+        if search_term:
+            with trace_span("record_search"):
+                try:
+                    await run_blocking(graph_service.record_search, db, search_term, anonymous_id)
+                except Exception as e:
+                    print(f"Failed to record search: {e}")
+
+        result = await smart_searcher.smart_search_async(search_term, location, db=db)
+
+    return _with_trace(result, trace, x_debug_trace)
+
+def _iter_in_context(events):
+    """
+    StreamingResponse advances a sync iterator from a fresh worker-thread context
+    on every step; run every step in one context so the search trace survives.
+    """
+    ctx = contextvars.copy_context()
+    while True:
+        try:
+            yield ctx.run(next, events)
+        except StopIteration:
+            return
+
+@app.get("/discovery/search/stream")
+def search_products_stream(
+    q: Optional[str] = None,
+    brand: Optional[str] = None,
+    location: Optional[str] = "Mumbai",
+    anonymous_id: Optional[str] = None,
+    format: str = "ndjson",
+    db: Session = Depends(get_db)
+):
+    """
+    Streaming Smart Search: raw results per marketplace as they arrive, then the
+    LLM-classified tiers, then the final (image-verified) response.
+    format=ndjson (one JSON event per line) or format=sse (text/event-stream).
+    """
+    if not q and brand:
+        q = brand
+    if not q:
+        return {"error": "Query parameter 'q' or 'brand' is required."}
+
+    search_term = q.strip()
     if search_term:
         try:
             graph_service.record_search(db, search_term, anonymous_id)
         except Exception as e:
             print(f"Failed to record search: {e}")
 
-    return smart_searcher.smart_search(search_term, location, db=db)
+    def _encode(events):
+        try:
+            for event in events:
+                if format == "sse":
+                    yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+                else:
+                    yield json.dumps(event, default=str) + "\n"
+        except Exception as e:
+            error = {"event": "error", "error": str(e)}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n" if format == "sse" else json.dumps(error) + "\n"
+
+    # The DB session is released before streaming starts; the pipeline does not need it
+    events = smart_searcher.smart_search_stream(search_term, location)
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(_iter_in_context(_encode(events)), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.get("/graph/popular")
-def get_popular_searches(limit: int = 5, db: Session = Depends(get_db)):
-    """Get most popular search terms"""
-    return graph_service.get_popular_searches(db, limit)
+def get_popular_searches(limit: int = 5, window: str = "all", db: Session = Depends(get_db)):
+    """Get most popular search terms. window: all, today, hour, or sliding <n>h / <n>d (e.g. 24h, 7d)."""
+    try:
+        return graph_service.get_popular_searches(db, limit, window)
+    except ValueError as e:
+        return {"error": str(e)}
 
 @app.get("/graph/history/user")
 def get_user_history(anonymous_id: str, db: Session = Depends(get_db)):
@@ -218,13 +311,40 @@ def get_user_history(anonymous_id: str, db: Session = Depends(get_db)):
     return user.searches
 
 
+@app.get("/discovery/suggest")
+async def suggest(q: str, limit: int = 8):
+    """Typeahead completions from brands and frequent searches (in-memory prefix index)."""
+    from app.services.suggest_service import get_suggest_index
+    index = get_suggest_index()
+    index.refresh_if_stale()
+    return {"query": q, "suggestions": index.suggest(q, min(max(limit, 0), 20))}
+
 @app.get("/discovery/landing")
-def get_landing_feed():
+async def get_landing_feed(if_none_match: Optional[str] = Header(None)):
     """
     Get the curated 10-item default feed for the homepage.
+    Served from memory as pre-serialized JSON; supports If-None-Match (304).
     """
-    return {"feed": feed_service.get_landing_feed()}
-
+    snapshot = feed_service.get_landing_snapshot()
+    headers = {"ETag": snapshot.etag, "Cache-Control": "public, max-age=60"}
+    if if_none_match and (if_none_match.strip() == "*" or snapshot.etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+async def _read_upload(file: UploadFile, max_bytes: int) -> Optional[bytes]:
+    """Read an upload in chunks; None once it exceeds `max_bytes`."""
+    chunks = []
+    size = 0
+    while True:
+        chunk = await file.read(256 * 1024)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            return None
+        chunks.append(chunk)
+    return b"".join(chunks)
 
 @app.post("/discovery/search-by-image")
 async def search_by_image(file: UploadFile = File(...), location: Optional[str] = "Mumbai", anonymous_id: Optional[str] = None, db: Session = Depends(get_db)):
@@ -233,80 +353,92 @@ async def search_by_image(file: UploadFile = File(...), location: Optional[str]
     and extract product details, then performs a smart search.
     """
     try:
-        # Read and encode image
-        contents = await file.read()
-        image_base64 = base64.b64encode(contents).decode('utf-8')
-        
-        # Analyze image
-        analysis = image_analyzer.analyze_product_image(image_base64)
-        
-        if "error" in analysis or not analysis.get("search_query"):
-            return {"error": analysis.get("error", "Could not analyze image"), "analysis": analysis}
+        with traced("search_by_image", endpoint="/discovery/search-by-image"):
+            # Read with a size cap instead of buffering arbitrarily large uploads
+            contents = await _read_upload(file, IMAGE_UPLOAD_MAX_BYTES)
+            if contents is None:
+                return {"error": f"Image too large (max {IMAGE_UPLOAD_MAX_BYTES // (1024 * 1024)} MB)"}
+            if not contents:
+                return {"error": "Empty image upload"}
+            
+            # Decode/resize on the image pool, vision call on the I/O pool
+            analysis = await image_analyzer.analyze_image_bytes_async(contents)
+            
+            if "error" in analysis or not analysis.get("search_query"):
+                return {"error": analysis.get("error", "Could not analyze image"), "analysis": analysis}
+            
+            # Record extracted query
+            try:
+                await run_blocking(graph_service.record_search, db, analysis["search_query"], anonymous_id)
+            except Exception as e:
+                print(f"Failed to record image search: {e}")
+
+            # Perform search with extracted query (repeat images reuse the linked result)
+            image_cache = get_image_cache()
+            image_hash = analysis.get("image_hash")
+            search_location = real_scraper.online_location(location)
+            search_results = image_cache.get_search(image_hash, search_location) if image_hash else None
+            if search_results is None:
+                search_results = await smart_searcher.smart_search_async(analysis["search_query"], location, db=db)
+                if image_hash and search_results and "error" not in search_results:
+                    image_cache.link_search(image_hash, search_location, search_results)
         
-        # Record extracted query
-        try:
-            graph_service.record_search(db, analysis["search_query"], anonymous_id)
-        except Exception as e:
-            print(f"Failed to record image search: {e}")
-
-        # Perform search with extracted query
-        search_results = smart_searcher.smart_search(analysis["search_query"], location, db=db)
-        
-        # Include image analysis in response
-        search_results["image_analysis"] = analysis
-        
-        return search_results
+        # Include image analysis in response (copy: search_results may be the cached dict)
+        return {**search_results, "image_analysis": analysis}
         
     except Exception as e:
         return {"error": f"Image upload failed: {str(e)}"}
 
 
 @app.post("/discovery/search-by-url")
-def search_by_url(url: str, location: Optional[str] = "Mumbai", anonymous_id: Optional[str] = None, db: Session = Depends(get_db)):
+async def search_by_url(url: str, location: Optional[str] = "Mumbai", anonymous_id: Optional[str] = None, db: Session = Depends(get_db), x_debug_trace: Optional[str] = Header(None)):
     """
     Search by pasting a product URL. Scrapes the page to extract product details,
     then performs a smart search for Indian alternatives.
     """
     try:
-        # Extract product info from URL
-        extraction = url_scraper.extract_product_from_url(url)
-        
-        if "error" in extraction or not extraction.get("search_query"):
-            return {"error": extraction.get("error", "Could not extract product from URL"), "extraction": extraction}
-        
-        # Record extracted query
-        try:
-            graph_service.record_search(db, extraction["search_query"], anonymous_id)
-        except Exception as e:
-            print(f"Failed to record url search: {e}")
-
-        # Perform search with extracted query
-        search_results = smart_searcher.smart_search(extraction["search_query"], location, db=db)
-        
-        # Include URL extraction in response
-        search_results["url_extraction"] = extraction
+        with traced("search_by_url", endpoint="/discovery/search-by-url") as trace:
+            # Extract product info from URL
+            with trace_span("url_extraction"):
+                extraction = await url_scraper.extract_product_from_url_async(url)
+            
+            if "error" in extraction or not extraction.get("search_query"):
+                return {"error": extraction.get("error", "Could not extract product from URL"), "extraction": extraction}
+            
+            # Record extracted query
+            with trace_span("record_search"):
+                try:
+                    await run_blocking(graph_service.record_search, db, extraction["search_query"], anonymous_id)
+                except Exception as e:
+                    print(f"Failed to record url search: {e}")
+
+            # Perform search with extracted query
+            search_results = await smart_searcher.smart_search_async(extraction["search_query"], location, db=db)
+            
+            # Include URL extraction in response
+            search_results["url_extraction"] = extraction
         
-        return search_results
+        return _with_trace(search_results, trace, x_debug_trace)
         
     except Exception as e:
         return {"error": f"URL search failed: {str(e)}"}
 
 
 @app.get("/discovery/resolve-link")
-def resolve_link(url: str):
+async def resolve_link(url: str):
     """
     Resolve a Google Shopping Viewer link (ibp=oshop) to the actual retailer URL.
     Scrapes the viewer page for the 'Visit site' link.
     """
     try:
-        resolved_url = real_scraper.resolve_viewer_link(url)
+        resolved_url = await real_scraper.resolve_viewer_link_async(url)
         return {"url": resolved_url}
     except Exception as e:
         print(f"Error resolving link: {e}")
         return {"url": url} # Fallback to original
 
 @app.get("/product/compare")
-def compare_prices(title: str, location: str = "Mumbai", image_url: str = None):
+async def compare_prices(title: str, location: str = "Mumbai", image_url: str = None, x_debug_trace: Optional[str] = Header(None)):
     """
     Given a product title, search across all marketplaces
     and return prices sorted lowest-first for price comparison.
@@ -314,7 +446,8 @@ def compare_prices(title: str, location: str = "Mumbai", image_url: str = None):
     """
     try:
         # Use smart search which already queries multiple marketplaces
-        results = smart_searcher.smart_search(title, location=location, image_url=image_url)
+        with traced("compare", endpoint="/product/compare") as trace:
+            results = await smart_searcher.smart_search_async(title, location=location, image_url=image_url)
         online_results = results.get("results", {}).get("online", [])
         
         # Sort by match quality first (EXACT → VARIANT → SIMILAR), then price within each tier
@@ -353,14 +486,14 @@ def compare_prices(title: str, location: str = "Mumbai", image_url: str = None):
                 })
 
         
-        return {
+        return _with_trace({
             "query": title,
             "total_results": len(online_results),
             "unique_stores": len(unique_by_source),
             "prices": unique_by_source,
             "lowest_price": unique_by_source[0] if unique_by_source else None,
             "highest_price": unique_by_source[-1] if unique_by_source else None
-        }
+        }, trace, x_debug_trace)
     except Exception as e:
         print(f"Error comparing prices: {e}")
         return {"error": str(e), "prices": []}
@@ -369,19 +502,120 @@ def compare_prices(title: str, location: str = "Mumbai", image_url: str = None):
 def health_check():
     return {"status": "healthy", "service": "BharatPricing API"}
 
+@app.on_event("startup")
+def prepare_search_counts():
+    """Backfill search counters from search_queries once, and drop expired hourly/daily buckets."""
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        graph_service.backfill_search_counts(db)
+        graph_service.prune_search_counts(db)
+    except Exception as e:
+        print(f"Search counter maintenance failed: {e}")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def build_suggest_index():
+    """Load the typeahead index (brands + frequent searches) before the first keystroke."""
+    from app.services.suggest_service import get_suggest_index
+    try:
+        get_suggest_index().load()
+    except Exception as e:
+        print(f"Suggest index build failed: {e}")
+
+@app.on_event("startup")
+def warm_attribute_cache():
+    """Promote disk-cached Layer-2 attributes for the most frequent searches into memory."""
+    from app.database import SessionLocal
+    from app.services.cache_service import _get_env_int
+    limit = _get_env_int("ATTR_CACHE_WARM_LIMIT", 100)
+    if limit <= 0:
+        return
+    db = SessionLocal()
+    try:
+        popular = graph_service.get_popular_searches(db, limit)
+        url_scraper.warm_attribute_cache([p["term"] for p in popular])
+    except Exception as e:
+        print(f"Attribute cache warm-up failed: {e}")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def start_landing_feed_scheduler():
+    """Keep the landing feed regenerated ahead of expiry, off the request path."""
+    feed_service.start_scheduler()
+
+@app.on_event("shutdown")
+def stop_landing_feed_scheduler():
+    feed_service.stop_scheduler()
+
+@app.on_event("startup")
+def start_cache_warmer():
+    """Replay the popular/trending warm set now, then keep it ahead of expiry."""
+    from app.services.cache_warmer_service import get_cache_warmer
+    get_cache_warmer().start()
+
+@app.on_event("shutdown")
+def stop_cache_warmer():
+    from app.services.cache_warmer_service import get_cache_warmer
+    get_cache_warmer().stop()
+
+@app.on_event("shutdown")
+def shutdown_browser():
+    """Close the pooled Playwright browser, if it was ever started."""
+    from app.services.browser_pool_service import shutdown_browser_pool
+    shutdown_browser_pool()
+
 @app.get("/cache/stats")
 def cache_stats():
     """Get cache statistics."""
     from app.services.cache_service import get_cache
-    return get_cache().stats()
+    from app.services.attr_cache_service import get_attr_cache
+    from app.services.semantic_cache_service import get_semantic_cache
+    from app.services.cache_warmer_service import get_cache_warmer
+    from app.services.llm_gate_service import get_llm_gate
+    from app.services.match_verdict_cache_service import get_match_verdict_cache
+    stats = get_cache().stats()
+    stats["attributes"] = get_attr_cache().stats()
+    stats["images"] = get_image_cache().stats()
+    stats["semantic"] = get_semantic_cache().stats()
+    stats["warmer"] = get_cache_warmer().stats()
+    stats["llm_gate"] = get_llm_gate().stats()
+    stats["match_verdicts"] = get_match_verdict_cache().stats()
+    return stats
 
 @app.post("/cache/clear")
 def cache_clear():
     """Clear all cached data. Use when you want to force refresh."""
     from app.services.cache_service import clear_all_cache
-    count = clear_all_cache()
+    from app.services.attr_cache_service import get_attr_cache
+    from app.services.semantic_cache_service import get_semantic_cache
+    from app.services.match_verdict_cache_service import get_match_verdict_cache
+    count = clear_all_cache() + get_attr_cache().clear() + get_image_cache().clear() + get_match_verdict_cache().clear()
+    get_semantic_cache().clear()  # only pointers into the search cache
     return {"message": f"Cache cleared", "items_removed": count}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of latency, outbound call, cache, DB and thread pool metrics."""
+    # Sync endpoints run on anyio's default thread limiter; sampled here, on the event loop
+    import anyio.to_thread
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    stats = limiter.statistics()
+    THREADPOOL_WORKERS.set(limiter.total_tokens, pool="fastapi")
+    THREADPOOL_BUSY.set(stats.borrowed_tokens, pool="fastapi")
+    THREADPOOL_WAITING.set(stats.tasks_waiting, pool="fastapi")
+    return PlainTextResponse(get_metrics_registry().render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/traces")
+def metrics_traces(name: Optional[str] = None, recent: int = 20):
+    """Per-stage latency percentiles, external call counts and estimated cost over recent requests."""
+    return {
+        "aggregate": aggregate_traces(name),
+        "recent": recent_traces(recent)
+    }
+
 @app.get("/test")
 def test():
     return {
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -59,6 +59,21 @@ class SearchQuery(Base):
     
     user = relationship("User", back_populates="searches")
 
+class SearchQueryCount(Base):
+    """Search counts per normalized query and time bucket (granularity: hour, day or all)."""
+    __tablename__ = "search_query_counts"
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "normalized_query", name="uq_search_count_bucket"),
+        Index("ix_search_count_top", "granularity", "bucket_start", "count"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String, nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    normalized_query = Column(String, nullable=False)
+    display_query = Column(String)  # latest spelling users typed
+    count = Column(Integer, nullable=False, default=0)
+
 class ProductView(Base):
     __tablename__ = "product_views"
 
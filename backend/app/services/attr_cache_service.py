@@ -0,0 +1,227 @@
+"""
+Two-tier cache for Layer-2 structured attribute extraction.
+L1 is a bounded in-process LRU, L2 is a SQLite file that survives restarts,
+so recurring queries don't pay a GPT round-trip after every deploy. The file
+is opened in WAL mode, so every uvicorn worker on the host shares one L2.
+
+Environment Variables:
+- ATTR_CACHE_MAX_ENTRIES: Max entries held in memory (default: 2000)
+- ATTR_CACHE_TTL: TTL in seconds for disk entries (default: 2592000 = 30 days)
+- ATTR_CACHE_PATH: SQLite file for the disk tier (default: backend/attr_cache.db, empty disables)
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from app.services.cache_service import _get_env_int, CACHE_ENABLED
+from app.services.metrics_service import record_cache
+from app.services.shared_cache_service import _BACKEND_DIR
+
+logger = logging.getLogger(__name__)
+
+ATTR_CACHE_MAX_ENTRIES = _get_env_int("ATTR_CACHE_MAX_ENTRIES", 2000)
+ATTR_CACHE_TTL = _get_env_int("ATTR_CACHE_TTL", 2592000)
+ATTR_CACHE_PATH = os.environ.get("ATTR_CACHE_PATH", os.path.join(_BACKEND_DIR, "attr_cache.db"))
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase, collapse whitespace and drop punctuation that doesn't change meaning."""
+    t = str(title or "").lower().strip()
+    t = re.sub(r"[''`\"]", "", t)
+    t = re.sub(r"[|,;:]+", " ", t)
+    t = re.sub(r"\s+", " ", t)
+    return t
+
+
+def make_attr_key(title: str, image_url: str = None) -> str:
+    """Cache key: hash of normalized title + image URL."""
+    raw = f"{normalize_title(title)}|{(image_url or '').strip()}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+class AttributeCache:
+    """Bounded LRU in front of a SQLite-backed store."""
+
+    def __init__(self, max_entries: int = ATTR_CACHE_MAX_ENTRIES, path: Optional[str] = ATTR_CACHE_PATH, ttl_seconds: int = ATTR_CACHE_TTL):
+        self.max_entries = max(1, max_entries)
+        self.path = path or None
+        self.ttl_seconds = ttl_seconds
+        self._lru: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    # ── Disk tier ────────────────────────────────────────────────────────
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        if self._conn is None:
+            try:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS attr_cache ("
+                    " key TEXT PRIMARY KEY, title TEXT, value TEXT NOT NULL, updated_at REAL NOT NULL)"
+                )
+                self._conn.commit()
+            except Exception as e:
+                logger.warning(f"[AttrCache] Disk tier unavailable ({self.path}): {e}")
+                self.path = None
+                self._conn = None
+        return self._conn
+
+    def _disk_get(self, key: str) -> Optional[dict]:
+        conn = self._db()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute("SELECT value, updated_at FROM attr_cache WHERE key = ?", (key,)).fetchone()
+        except Exception as e:
+            logger.warning(f"[AttrCache] Disk read failed: {e}")
+            return None
+        if not row:
+            return None
+        value, updated_at = row
+        if time.time() - updated_at > self.ttl_seconds:
+            return None
+        return json.loads(value)
+
+    def _disk_set(self, key: str, title: str, value: dict) -> None:
+        conn = self._db()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO attr_cache (key, title, value, updated_at) VALUES (?, ?, ?, ?)",
+                (key, title, json.dumps(value), time.time())
+            )
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"[AttrCache] Disk write failed: {e}")
+
+    # ── Memory tier ──────────────────────────────────────────────────────
+    def _lru_put(self, key: str, value: dict) -> None:
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self._evictions += 1
+
+    # ── Public API ───────────────────────────────────────────────────────
+    def get(self, title: str, image_url: str = None) -> Optional[dict]:
+        """Look up L1, then L2 (promoting disk hits into memory)."""
+        if not CACHE_ENABLED:
+            return None
+        key = make_attr_key(title, image_url)
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self._memory_hits += 1
+                record_cache("attributes", True)
+                return self._lru[key]
+            value = self._disk_get(key)
+            if value is not None:
+                self._lru_put(key, value)
+                self._disk_hits += 1
+                record_cache("attributes", True)
+                return value
+            self._misses += 1
+            record_cache("attributes", False)
+            return None
+
+    def set(self, title: str, image_url: str, value: dict, persist: bool = True) -> None:
+        """Store in memory, and on disk unless `persist` is False (e.g. degraded fallbacks)."""
+        if not CACHE_ENABLED:
+            return
+        key = make_attr_key(title, image_url)
+        with self._lock:
+            self._lru_put(key, value)
+            if persist:
+                self._disk_set(key, normalize_title(title), value)
+
+    def warm(self, titles: Iterable[str], compute: Callable[[str], Any] = None) -> dict:
+        """
+        Bulk warm-up for title-only entries (how smart_search calls Layer 2).
+        Disk entries are promoted into memory; with `compute`, missing ones are
+        generated (e.g. by the GPT extractor, which stores its own result).
+        """
+        loaded = computed = missing = 0
+        for title in titles:
+            if not title:
+                continue
+            key = make_attr_key(title)
+            with self._lock:
+                if key in self._lru:
+                    loaded += 1
+                    continue
+                value = self._disk_get(key)
+                if value is not None:
+                    self._lru_put(key, value)
+                    loaded += 1
+                    continue
+            if compute:
+                try:
+                    compute(title)
+                    computed += 1
+                except Exception as e:
+                    logger.warning(f"[AttrCache] Warm-up compute failed for '{title[:50]}': {e}")
+            else:
+                missing += 1
+        logger.info(f"[AttrCache] Warm-up: loaded={loaded}, computed={computed}, missing={missing}")
+        return {"loaded": loaded, "computed": computed, "missing": missing}
+
+    def clear(self, include_disk: bool = True) -> int:
+        """Clear memory (and disk) entries. Returns count of memory items cleared."""
+        with self._lock:
+            count = len(self._lru)
+            self._lru.clear()
+            conn = self._db() if include_disk else None
+            if conn is not None:
+                try:
+                    conn.execute("DELETE FROM attr_cache")
+                    conn.commit()
+                except Exception as e:
+                    logger.warning(f"[AttrCache] Disk clear failed: {e}")
+        return count
+
+    def stats(self) -> dict:
+        """Get cache statistics."""
+        lookups = self._memory_hits + self._disk_hits + self._misses
+        disk_size = 0
+        conn = self._db()
+        if conn is not None:
+            try:
+                disk_size = conn.execute("SELECT COUNT(*) FROM attr_cache").fetchone()[0]
+            except Exception:
+                pass
+        return {
+            "size": len(self._lru),
+            "max_entries": self.max_entries,
+            "disk_size": disk_size,
+            "memory_hits": self._memory_hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "hit_rate": (self._memory_hits + self._disk_hits) / lookups if lookups else 0
+        }
+
+
+# Singleton instance for app-wide use
+_attr_cache_instance = None
+
+def get_attr_cache() -> AttributeCache:
+    """Get the singleton attribute cache instance."""
+    global _attr_cache_instance
+    if _attr_cache_instance is None:
+        _attr_cache_instance = AttributeCache()
+    return _attr_cache_instance
@@ -0,0 +1,288 @@
+"""
+Managed Playwright Browser Pool.
+Keeps one warm Chromium alive and hands out reusable browser contexts, so DOM
+fallback scrapes don't pay for a full browser boot on every call.
+
+The Playwright sync API is bound to the thread that started it, while FastAPI
+runs sync handlers on a threadpool. The pool therefore owns a dedicated thread
+running an asyncio loop with the async API; callers submit jobs to that loop
+and block on the result.
+
+Environment Variables:
+- BROWSER_POOL_SIZE: Max concurrent browser contexts (default: 2)
+- BROWSER_PAGES_PER_CONTEXT: Pages served by a context before it is recycled (default: 25)
+- BROWSER_PAGES_PER_BROWSER: Pages served by the browser before it is relaunched (default: 200)
+- BROWSER_GOTO_TIMEOUT_MS: Navigation timeout in milliseconds (default: 45000)
+- BROWSER_BLOCKED_RESOURCES: Comma-separated resource types to abort (default: image,font,media)
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import List, Optional
+
+from app.services.cache_service import _get_env_int
+
+logger = logging.getLogger(__name__)
+
+BROWSER_POOL_SIZE = _get_env_int("BROWSER_POOL_SIZE", 2)
+BROWSER_PAGES_PER_CONTEXT = _get_env_int("BROWSER_PAGES_PER_CONTEXT", 25)
+BROWSER_PAGES_PER_BROWSER = _get_env_int("BROWSER_PAGES_PER_BROWSER", 200)
+BROWSER_GOTO_TIMEOUT_MS = _get_env_int("BROWSER_GOTO_TIMEOUT_MS", 45000)
+BROWSER_BLOCKED_RESOURCES = {
+    r.strip() for r in os.environ.get("BROWSER_BLOCKED_RESOURCES", "image,font,media").split(",") if r.strip()
+}
+
+DESKTOP_USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+class _PooledContext:
+    """A browser context plus the number of pages it has served."""
+
+    def __init__(self, context, generation: int):
+        self.context = context
+        self.generation = generation
+        self.pages_served = 0
+
+
+class BrowserPoolService:
+    """Long-lived headless Chromium with a bounded pool of recycled contexts."""
+
+    def __init__(self, pool_size: int = BROWSER_POOL_SIZE):
+        self.pool_size = max(1, pool_size)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        # Owned by the pool loop only
+        self._playwright = None
+        self._browser = None
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self._generation = 0
+        self._browser_pages = 0
+        self._checked_out = 0
+        self._idle: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self._stats = {"pages": 0, "browser_launches": 0, "context_recycles": 0, "blocked_requests": 0, "errors": 0}
+
+    # ── Loop management ──────────────────────────────────────────────────
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the pool thread + event loop on first use."""
+        if self._loop and self._thread and self._thread.is_alive():
+            return self._loop
+        with self._start_lock:
+            if self._loop and self._thread and self._thread.is_alive():
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                self._browser_lock = asyncio.Lock()
+                self._idle = asyncio.Queue()
+                self._slots = asyncio.Semaphore(self.pool_size)
+                ready.set()
+                loop.run_forever()
+
+            thread = threading.Thread(target=_run, name="browser-pool", daemon=True)
+            thread.start()
+            ready.wait()
+            self._loop = loop
+            self._thread = thread
+            return loop
+
+    def _submit(self, coro, timeout: float):
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    # ── Browser / context lifecycle (run on the pool loop) ───────────────
+    async def _get_browser(self):
+        async with self._browser_lock:
+            # Only relaunch when no context is mid-scrape on the old browser
+            if self._browser and self._browser_pages >= BROWSER_PAGES_PER_BROWSER and self._checked_out == 0:
+                logger.info(f"[BrowserPool] Relaunching browser after {self._browser_pages} pages")
+                await self._close_browser()
+
+            if self._browser is None or not self._browser.is_connected():
+                from playwright.async_api import async_playwright
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True)
+                self._generation += 1
+                self._browser_pages = 0
+                self._stats["browser_launches"] += 1
+                logger.info(f"[BrowserPool] Launched Chromium (generation={self._generation})")
+            return self._browser
+
+    async def _close_browser(self):
+        # Contexts of the old generation are dropped lazily when released
+        while not self._idle.empty():
+            pooled = self._idle.get_nowait()
+            await self._close_context(pooled)
+        if self._browser:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                logger.warning(f"[BrowserPool] Browser close failed: {e}")
+        self._browser = None
+
+    async def _block_heavy_resources(self, route):
+        if route.request.resource_type in BROWSER_BLOCKED_RESOURCES:
+            self._stats["blocked_requests"] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _new_context(self) -> _PooledContext:
+        browser = await self._get_browser()
+        # Desktop viewport and User-Agent to avoid mobile/accessibility views
+        context = await browser.new_context(
+            viewport={'width': 1920, 'height': 1080},
+            user_agent=DESKTOP_USER_AGENT
+        )
+        if BROWSER_BLOCKED_RESOURCES:
+            await context.route("**/*", self._block_heavy_resources)
+        return _PooledContext(context, self._generation)
+
+    async def _close_context(self, pooled: _PooledContext):
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+
+    async def _acquire(self) -> _PooledContext:
+        await self._slots.acquire()
+        try:
+            while not self._idle.empty():
+                pooled = self._idle.get_nowait()
+                reusable = (
+                    pooled.generation == self._generation
+                    and self._browser and self._browser.is_connected()
+                    and self._browser_pages < BROWSER_PAGES_PER_BROWSER
+                )
+                if reusable:
+                    self._checked_out += 1
+                    return pooled
+                await self._close_context(pooled)
+            pooled = await self._new_context()
+            self._checked_out += 1
+            return pooled
+        except Exception:
+            self._slots.release()
+            raise
+
+    async def _release(self, pooled: _PooledContext, healthy: bool = True):
+        self._checked_out -= 1
+        try:
+            stale = pooled.generation != self._generation
+            if not healthy or stale or pooled.pages_served >= BROWSER_PAGES_PER_CONTEXT:
+                if not stale and healthy:
+                    self._stats["context_recycles"] += 1
+                await self._close_context(pooled)
+            else:
+                self._idle.put_nowait(pooled)
+        finally:
+            self._slots.release()
+
+    # ── Jobs ─────────────────────────────────────────────────────────────
+    async def _scrape_title(self, url: str, selectors: List[str], timeout_ms: int) -> str:
+        pooled = await self._acquire()
+        healthy = True
+        page = None
+        try:
+            page = await pooled.context.new_page()
+            pooled.pages_served += 1
+            self._browser_pages += 1
+            self._stats["pages"] += 1
+
+            await page.goto(url, timeout=timeout_ms, wait_until="domcontentloaded")
+
+            for selector in selectors:
+                try:
+                    locator = page.locator(selector)
+                    if await locator.count() > 0:
+                        text = (await locator.first.inner_text()).strip()
+                        # Filter garbage
+                        if text and "keyboard shortcut" not in text.lower() and "product summary" not in text.lower():
+                            return text
+                except Exception:
+                    continue
+            return ""
+        except Exception:
+            healthy = False
+            self._stats["errors"] += 1
+            raise
+        finally:
+            if page:
+                try:
+                    await page.close()
+                except Exception:
+                    healthy = False
+            await self._release(pooled, healthy)
+
+    async def _shutdown(self):
+        if self._idle is not None:
+            await self._close_browser()
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    # ── Public API ───────────────────────────────────────────────────────
+    def scrape_title(self, url: str, selectors: List[str], timeout_ms: int = BROWSER_GOTO_TIMEOUT_MS) -> str:
+        """
+        Loads `url` in a pooled context and returns the first non-empty text
+        matching `selectors`. Raises on navigation/browser failure.
+        """
+        # Allow for context acquisition + selector probing on top of navigation
+        return self._submit(self._scrape_title(url, selectors, timeout_ms), timeout=timeout_ms / 1000 + 15)
+
+    def shutdown(self) -> None:
+        """Close the browser and stop the pool thread."""
+        if not self._loop:
+            return
+        try:
+            self._submit(self._shutdown(), timeout=15)
+        except Exception as e:
+            logger.warning(f"[BrowserPool] Shutdown failed: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+
+    def stats(self) -> dict:
+        """Get pool statistics."""
+        return {
+            "pool_size": self.pool_size,
+            "running": bool(self._thread and self._thread.is_alive()),
+            "idle_contexts": self._idle.qsize() if self._idle else 0,
+            "generation": self._generation,
+            "pages_per_context": BROWSER_PAGES_PER_CONTEXT,
+            "pages_per_browser": BROWSER_PAGES_PER_BROWSER,
+            **self._stats
+        }
+
+
+# Singleton instance for app-wide use
+_pool_instance = None
+_pool_lock = threading.Lock()
+
+def get_browser_pool() -> BrowserPoolService:
+    """Get the singleton browser pool instance."""
+    global _pool_instance
+    if _pool_instance is None:
+        with _pool_lock:
+            if _pool_instance is None:
+                _pool_instance = BrowserPoolService()
+    return _pool_instance
+
+def shutdown_browser_pool() -> None:
+    """Close the shared browser if it was ever started."""
+    if _pool_instance is not None:
+        _pool_instance.shutdown()
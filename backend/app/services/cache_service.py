@@ -1,17 +1,31 @@
 """
-In-Memory Cache Service with TTL support.
+Two-tier Cache Service with TTL support.
 Provides fast caching for search results to reduce API calls.
+L1 is a small per-process LRU; L2 is the host-wide shared store
+(shared_cache_service), so all uvicorn workers see each other's results.
+L1 entries live at most CACHE_L1_TTL so other workers' writes and clears
+propagate quickly. Prefixes with a registered codec (search payloads) are
+held in both tiers in their compact encoded form (immutable, so hits can't
+mutate the cache) and decoded on every hit, outside the L1 lock.
 
 Environment Variables:
 - CACHE_TTL_SEARCH: TTL in seconds for search results (default: 3600 = 1 hour)
 - CACHE_TTL_BRAND: TTL in seconds for brand results (default: 21600 = 6 hours)
+- CACHE_TTL_LOCAL: TTL in seconds for local store results, keyed per location (default: 3600 = 1 hour)
 - CACHE_ENABLED: Set to 'false' to disable caching (default: true)
+- CACHE_L1_MAX_ENTRIES: Max entries in the per-process L1 (default: 500)
+- CACHE_L1_TTL: Max seconds an entry stays in L1 before re-reading L2 (default: 60)
 """
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 import logging
 import hashlib
 import os
+import threading
+
+from app.services.metrics_service import record_cache
+from app.services.search_payload_codec import pack_search, unpack_search
 
 logger = logging.getLogger(__name__)
 
@@ -32,18 +46,34 @@ def _get_env_bool(key: str, default: bool) -> bool:
 CACHE_ENABLED = _get_env_bool("CACHE_ENABLED", True)
 CACHE_TTL_SEARCH = _get_env_int("CACHE_TTL_SEARCH", 28800)  # 8 hours default
 CACHE_TTL_BRAND = _get_env_int("CACHE_TTL_BRAND", 28800)    # 8 hours default
+CACHE_TTL_LOCAL = _get_env_int("CACHE_TTL_LOCAL", 3600)
+CACHE_L1_MAX_ENTRIES = _get_env_int("CACHE_L1_MAX_ENTRIES", 500)
+CACHE_L1_TTL = _get_env_int("CACHE_L1_TTL", 60)
 
 logger.info(f"Cache Config: enabled={CACHE_ENABLED}, search_ttl={CACHE_TTL_SEARCH}s, brand_ttl={CACHE_TTL_BRAND}s")
 
 
 class CacheService:
-    """Simple in-memory cache with TTL (Time To Live) support."""
+    """Bounded in-memory L1 with TTL in front of the shared cross-process L2."""
     
-    def __init__(self):
-        self._cache = {}  # {key: (value, expiry_time)}
+    def __init__(self, shared=None, max_entries: int = CACHE_L1_MAX_ENTRIES, l1_ttl: int = CACHE_L1_TTL):
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()  # {key: (value, expiry_time)}
+        self._lock = threading.Lock()
+        self._shared = shared
+        self.max_entries = max(1, max_entries)
+        self.l1_ttl = l1_ttl
+        self._codecs: Dict[str, Tuple[Callable, Callable]] = {}
         self._hits = 0
+        self._shared_hits = 0
         self._misses = 0
     
+    @property
+    def shared(self):
+        if self._shared is None:
+            from app.services.shared_cache_service import SharedCacheStore
+            self._shared = SharedCacheStore()
+        return self._shared
+    
     def _normalize_query(self, query: str) -> str:
         """Normalize search query for better cache hit rate.
         
@@ -69,68 +99,148 @@ class CacheService:
             key_str = f"{prefix}:{hashlib.md5(key_str.encode()).hexdigest()}"
         return key_str
     
+    def register_codec(self, prefix: str, encode: Callable[[Any], bytes], decode: Callable[[bytes], Any]) -> None:
+        """Store values under `prefix:` encoded (e.g. compressed) and decode them on hit."""
+        self._codecs[prefix] = (encode, decode)
+    
+    def _encode(self, layer: str, value: Any) -> Any:
+        codec = self._codecs.get(layer)
+        if codec is None:
+            return value
+        try:
+            return codec[0](value)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"CACHE ENCODE FAILED for {layer}, storing as-is: {e}")
+            return value
+    
+    def _decode(self, layer: str, value: Any) -> Any:
+        codec = self._codecs.get(layer)
+        if codec is None or not isinstance(value, bytes):
+            return value
+        return codec[1](value)
+    
+    def _l1_put(self, key: str, value: Any, expiry: datetime) -> None:
+        """Caller holds the lock."""
+        self._cache[key] = (value, min(expiry, datetime.now() + timedelta(seconds=self.l1_ttl)))
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+    
     def get(self, key: str) -> Optional[Any]:
-        """Get value from cache if exists and not expired."""
+        """Get value from L1, then the shared tier (promoting hits into L1)."""
         if not CACHE_ENABLED:
             return None
             
-        if key in self._cache:
-            value, expiry = self._cache[key]
-            if datetime.now() < expiry:
+        layer = key.split(":", 1)[0]
+        hit = False
+        with self._lock:
+            if key in self._cache:
+                value, expiry = self._cache[key]
+                if datetime.now() < expiry:
+                    self._cache.move_to_end(key)
+                    self._hits += 1
+                    hit = True
+                else:
+                    # Expired in L1, fall through to the shared tier
+                    del self._cache[key]
+        if hit:
+            # L1 holds the immutable encoded bytes; decode outside the lock so hits don't serialize
+            record_cache(layer, True)
+            logger.info(f"CACHE HIT: {key[:50]}... (hits={self._hits})")
+            return self._decode(layer, value)
+        
+        shared = self.shared.get(key)
+        if shared is not None:
+            value, expires_at = shared
+            try:
+                decoded = self._decode(layer, value)
+            except Exception as e:
+                # Written by an incompatible build (e.g. another Python's marshal format)
+                logger.warning(f"CACHE DECODE FAILED: {key[:50]}...: {e}")
+                self.shared.delete(key)
+                shared = None
+        if shared is not None:
+            with self._lock:
+                self._l1_put(key, value, datetime.fromtimestamp(expires_at))
                 self._hits += 1
-                logger.info(f"CACHE HIT: {key[:50]}... (hits={self._hits})")
-                return value
-            else:
-                # Expired, remove it
-                del self._cache[key]
-                logger.info(f"CACHE EXPIRED: {key[:50]}...")
+                self._shared_hits += 1
+            record_cache(layer, True)
+            logger.info(f"CACHE HIT (shared): {key[:50]}... (hits={self._hits})")
+            return decoded
         
-        self._misses += 1
+        with self._lock:
+            self._misses += 1
+        record_cache(layer, False)
+        return None
+    
+    def ttl_remaining(self, key: str) -> Optional[float]:
+        """Seconds until `key` expires in the shared tier (L1 when there is none); None if absent."""
+        expires_at = self.shared.expires_at(key)
+        if expires_at is not None:
+            return expires_at - datetime.now().timestamp()
+        if self.shared.path is None:
+            with self._lock:
+                entry = self._cache.get(key)
+            if entry is not None and datetime.now() < entry[1]:
+                return (entry[1] - datetime.now()).total_seconds()
         return None
     
     def set(self, key: str, value: Any, ttl_seconds: int = 3600) -> None:
-        """Store value in cache with TTL."""
+        """Store value in both tiers with TTL."""
         if not CACHE_ENABLED:
             return
             
+        value = self._encode(key.split(":", 1)[0], value)
         expiry = datetime.now() + timedelta(seconds=ttl_seconds)
-        self._cache[key] = (value, expiry)
-        logger.info(f"CACHE SET: {key[:50]}... (TTL={ttl_seconds}s, size={len(self._cache)})")
+        with self._lock:
+            self._l1_put(key, value, expiry)
+        self.shared.set(key, value, ttl_seconds)
+        size_note = f", {len(value)}B" if isinstance(value, bytes) else ""
+        logger.info(f"CACHE SET: {key[:50]}... (TTL={ttl_seconds}s, size={len(self._cache)}{size_note})")
     
     def delete(self, key: str) -> bool:
-        """Delete a key from cache."""
-        if key in self._cache:
-            del self._cache[key]
-            return True
-        return False
+        """Delete a key from both tiers."""
+        with self._lock:
+            local = self._cache.pop(key, None) is not None
+        return self.shared.delete(key) or local
     
     def clear(self) -> int:
-        """Clear all cached items. Returns count of items cleared."""
-        count = len(self._cache)
-        self._cache = {}
+        """Clear all cached items in both tiers. Returns count of items cleared."""
+        with self._lock:
+            count = len(self._cache)
+            self._cache = OrderedDict()
+        count = max(count, self.shared.clear())
         logger.info(f"CACHE CLEARED: {count} items removed")
         return count
     
     def cleanup_expired(self) -> int:
         """Remove all expired entries. Returns count of items removed."""
         now = datetime.now()
-        expired_keys = [k for k, (v, exp) in self._cache.items() if exp < now]
-        for key in expired_keys:
-            del self._cache[key]
-        if expired_keys:
-            logger.info(f"CACHE CLEANUP: {len(expired_keys)} expired items removed")
-        return len(expired_keys)
+        with self._lock:
+            expired_keys = [k for k, (v, exp) in self._cache.items() if exp < now]
+            for key in expired_keys:
+                del self._cache[key]
+        removed = len(expired_keys) + self.shared.purge_expired()
+        if removed:
+            logger.info(f"CACHE CLEANUP: {removed} expired items removed")
+        return removed
     
     def stats(self) -> dict:
         """Get cache statistics."""
         return {
             "enabled": CACHE_ENABLED,
             "size": len(self._cache),
+            "max_entries": self.max_entries,
+            "encoded_bytes": sum(len(v) for v, _ in list(self._cache.values()) if isinstance(v, bytes)),
             "hits": self._hits,
+            "shared_hits": self._shared_hits,
             "misses": self._misses,
             "hit_rate": self._hits / (self._hits + self._misses) if (self._hits + self._misses) > 0 else 0,
             "ttl_search": CACHE_TTL_SEARCH,
-            "ttl_brand": CACHE_TTL_BRAND
+            "ttl_brand": CACHE_TTL_BRAND,
+            "ttl_local": CACHE_TTL_LOCAL,
+            "l1_ttl": self.l1_ttl,
+            "shared": self.shared.stats()
         }
 
 
@@ -142,20 +252,46 @@ def get_cache() -> CacheService:
     global _cache_instance
     if _cache_instance is None:
         _cache_instance = CacheService()
+        _cache_instance.register_codec("search", pack_search, unpack_search)
     return _cache_instance
 
 
 # Convenience functions
-def cache_search(query: str, location: str, results: dict, ttl: int = None) -> None:
-    """Cache search results (uses CACHE_TTL_SEARCH env var)."""
+def _search_key(cache: CacheService, query: str, location: str, image_url: str = None) -> str:
+    if image_url:
+        return cache._make_key("search", query, location, hashlib.md5(image_url.encode()).hexdigest())
+    return cache._make_key("search", query, location)
+
+def cache_search(query: str, location: str, results: dict, ttl: int = None, image_url: str = None) -> None:
+    """Cache search results (uses CACHE_TTL_SEARCH env var).
+    
+    `location` is the location that reaches the upstream API
+    (RealScraperService.online_location), not the client's city, so every
+    city sharing the same upstream results shares one entry.
+    """
+    cache = get_cache()
+    cache.set(_search_key(cache, query, location, image_url), results, ttl or CACHE_TTL_SEARCH)
+
+def get_cached_search(query: str, location: str, image_url: str = None) -> Optional[dict]:
+    """Get cached search results (see cache_search for `location`)."""
+    cache = get_cache()
+    return cache.get(_search_key(cache, query, location, image_url))
+
+def search_ttl_remaining(query: str, location: str, image_url: str = None) -> Optional[float]:
+    """Seconds left on a cached search (see cache_search for `location`); None if not cached."""
+    cache = get_cache()
+    return cache.ttl_remaining(_search_key(cache, query, location, image_url))
+
+def cache_local(query: str, location: str, results: list, ttl: int = None) -> None:
+    """Cache local store results; these do depend on the client's location."""
     cache = get_cache()
-    key = cache._make_key("search", query, location)
-    cache.set(key, results, ttl or CACHE_TTL_SEARCH)
+    key = cache._make_key("local", query, location)
+    cache.set(key, results, ttl or CACHE_TTL_LOCAL)
 
-def get_cached_search(query: str, location: str) -> Optional[dict]:
-    """Get cached search results."""
+def get_cached_local(query: str, location: str) -> Optional[list]:
+    """Get cached local store results."""
     cache = get_cache()
-    key = cache._make_key("search", query, location)
+    key = cache._make_key("local", query, location)
     return cache.get(key)
 
 def cache_brand(brand: str, results: dict, ttl: int = None) -> None:
@@ -0,0 +1,218 @@
+"""
+Background warmer that keeps the most requested searches hot.
+The warm set is the top-N all-time searches (GraphService.get_popular_searches)
+plus the top trending ones of the last few hours. Every pass re-runs
+smart_search (bypassing the cache lookup) for queries that aren't cached or
+expire within CACHE_WARM_LEAD, most popular first, until the hourly SerpAPI /
+OpenAI budget is used. The first pass runs right at startup, so a deploy
+replays the warm set instead of waiting for users to pay for it.
+
+Only one worker per host warms at a time (a lease in the shared cache tier,
+renewed before every search so a pass longer than its TTL keeps it); the
+results land in the shared tier for all of them.
+
+Environment Variables:
+- CACHE_WARM_ENABLED: Set to 'false' to disable the warmer (default: true)
+- CACHE_WARM_TOP_N: All-time most popular searches to keep warm (default: 50)
+- CACHE_WARM_TRENDING_N: Trending searches to keep warm (default: 20)
+- CACHE_WARM_TRENDING_HOURS: Window for trending searches (default: 24)
+- CACHE_WARM_LEAD: Re-run a search when its cache entry expires within this many seconds (default: 900)
+- CACHE_WARM_INTERVAL: Seconds between warm passes (default: 300)
+- CACHE_WARM_SERPAPI_PER_HOUR: Max SerpAPI calls the warmer may spend per hour (default: 200)
+- CACHE_WARM_OPENAI_PER_HOUR: Max OpenAI calls the warmer may spend per hour (default: 500)
+"""
+from collections import deque
+from typing import List, Optional
+import logging
+import os
+import socket
+import threading
+import time
+
+from app.services.cache_service import _get_env_int, _get_env_bool, CACHE_ENABLED, get_cache, search_ttl_remaining
+from app.services.tracing_service import traced
+
+logger = logging.getLogger(__name__)
+
+CACHE_WARM_ENABLED = _get_env_bool("CACHE_WARM_ENABLED", True)
+CACHE_WARM_TOP_N = _get_env_int("CACHE_WARM_TOP_N", 50)
+CACHE_WARM_TRENDING_N = _get_env_int("CACHE_WARM_TRENDING_N", 20)
+CACHE_WARM_TRENDING_HOURS = _get_env_int("CACHE_WARM_TRENDING_HOURS", 24)
+CACHE_WARM_LEAD = _get_env_int("CACHE_WARM_LEAD", 900)
+CACHE_WARM_INTERVAL = _get_env_int("CACHE_WARM_INTERVAL", 300)
+CACHE_WARM_SERPAPI_PER_HOUR = _get_env_int("CACHE_WARM_SERPAPI_PER_HOUR", 200)
+CACHE_WARM_OPENAI_PER_HOUR = _get_env_int("CACHE_WARM_OPENAI_PER_HOUR", 500)
+
+# The lease is renewed before each search, so its TTL only has to outlast one search
+_LEASE_TTL = CACHE_WARM_INTERVAL * 2
+
+# Cost of a search never warmed before: one SerpAPI call per marketplace sub-query, a few LLM calls
+_DEFAULT_ESTIMATE = (8, 4)
+
+
+class CacheWarmerService:
+    def __init__(self, searcher=None, graph=None, session_factory=None):
+        self._searcher = searcher
+        self._graph = graph
+        self._session_factory = session_factory
+        self._spent = deque()      # (timestamp, serpapi_calls, openai_calls) over the last hour
+        self._estimates = {}       # query -> (serpapi_calls, openai_calls) of its last warm
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.last_run = None
+        self.warm_set: List[str] = []
+        self._warmed = 0
+        self._failed = 0
+        self._over_budget = 0
+
+    @property
+    def searcher(self):
+        if self._searcher is None:
+            from app.services.smart_search_service import SmartSearchService
+            self._searcher = SmartSearchService()
+        return self._searcher
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            from app.services.graph_service import GraphService
+            self._graph = GraphService()
+        return self._graph
+
+    def _load_warm_set(self) -> List[str]:
+        """Popular first, then trending; case-insensitive duplicates dropped."""
+        if self._session_factory is None:
+            from app.database import SessionLocal
+            self._session_factory = SessionLocal
+        db = self._session_factory()
+        try:
+            popular = self.graph.get_popular_searches(db, CACHE_WARM_TOP_N) if CACHE_WARM_TOP_N > 0 else []
+            trending = self.graph.get_trending_searches(db, CACHE_WARM_TRENDING_HOURS, CACHE_WARM_TRENDING_N) \
+                if CACHE_WARM_TRENDING_N > 0 else []
+        finally:
+            db.close()
+        seen, terms = set(), []
+        for entry in popular + trending:
+            key = " ".join(entry["term"].lower().split())
+            if key and key not in seen:
+                seen.add(key)
+                terms.append(entry["term"])
+        return terms
+
+    # ── Budget ───────────────────────────────────────────────────────────
+    def spent_last_hour(self) -> tuple:
+        cutoff = time.time() - 3600
+        with self._lock:
+            while self._spent and self._spent[0][0] < cutoff:
+                self._spent.popleft()
+            return (sum(s[1] for s in self._spent), sum(s[2] for s in self._spent))
+
+    def _within_budget(self, query: str) -> bool:
+        serpapi, openai = self.spent_last_hour()
+        est_serpapi, est_openai = self._estimates.get(query, _DEFAULT_ESTIMATE)
+        return serpapi + est_serpapi <= CACHE_WARM_SERPAPI_PER_HOUR and openai + est_openai <= CACHE_WARM_OPENAI_PER_HOUR
+
+    # ── Warming ──────────────────────────────────────────────────────────
+    def _is_due(self, query: str) -> bool:
+        remaining = search_ttl_remaining(self.searcher._cache_query(query), self.searcher.scraper.online_location())
+        return remaining is None or remaining < CACHE_WARM_LEAD
+
+    def warm(self, query: str) -> bool:
+        """Re-run one search into the cache and charge its external calls to the budget."""
+        with traced("cache_warm", query=query) as trace:
+            try:
+                result = self.searcher.smart_search(query, refresh=True)
+                ok = bool(result) and "error" not in result
+            except Exception as e:
+                logger.warning(f"[CacheWarmer] '{query}' failed: {e}")
+                ok = False
+            calls = dict(trace.calls)
+        serpapi = calls.get("serpapi", 0)
+        openai = sum(n for kind, n in calls.items() if kind != "serpapi")
+        with self._lock:
+            self._spent.append((time.time(), serpapi, openai))
+            self._estimates[query] = (serpapi, openai)
+            if ok:
+                self._warmed += 1
+            else:
+                self._failed += 1
+        return ok
+
+    def _hold_lease(self) -> bool:
+        return get_cache().shared.try_lease("cache_warmer", self._owner, _LEASE_TTL)
+
+    def run_once(self) -> dict:
+        """One pass over the warm set; returns what it did."""
+        summary = {"due": 0, "warmed": 0, "failed": 0, "over_budget": 0}
+        if not (CACHE_ENABLED and CACHE_WARM_ENABLED):
+            return summary
+        if not self._hold_lease():
+            return summary  # another worker on this host is warming
+        try:
+            self.warm_set = self._load_warm_set()
+        except Exception as e:
+            logger.warning(f"[CacheWarmer] Could not load popular searches: {e}")
+            return summary
+        for query in self.warm_set:
+            if self._stop.is_set():
+                break
+            if not self._is_due(query):
+                continue
+            if not self._hold_lease():
+                logger.warning("[CacheWarmer] Lost the warm lease mid-pass, stopping")
+                break
+            summary["due"] += 1
+            if not self._within_budget(query):
+                summary["over_budget"] = len(self.warm_set) - self.warm_set.index(query)
+                with self._lock:
+                    self._over_budget += 1
+                break
+            summary["warmed" if self.warm(query) else "failed"] += 1
+        self.last_run = time.time()
+        if summary["due"]:
+            logger.info(f"[CacheWarmer] Pass done: {summary}")
+        return summary
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"[CacheWarmer] Pass failed: {e}")
+            self._stop.wait(CACHE_WARM_INTERVAL)
+
+    def start(self) -> None:
+        """Warm now (startup replay), then every CACHE_WARM_INTERVAL, in a daemon thread."""
+        if not CACHE_WARM_ENABLED or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> dict:
+        serpapi, openai = self.spent_last_hour()
+        return {
+            "enabled": CACHE_WARM_ENABLED,
+            "warm_set_size": len(self.warm_set),
+            "warmed": self._warmed,
+            "failed": self._failed,
+            "budget_stops": self._over_budget,
+            "spent_last_hour": {"serpapi": serpapi, "openai": openai},
+            "budget_per_hour": {"serpapi": CACHE_WARM_SERPAPI_PER_HOUR, "openai": CACHE_WARM_OPENAI_PER_HOUR},
+            "last_run": self.last_run
+        }
+
+
+_warmer_instance = None
+
+def get_cache_warmer() -> CacheWarmerService:
+    """Get the singleton cache warmer."""
+    global _warmer_instance
+    if _warmer_instance is None:
+        _warmer_instance = CacheWarmerService()
+    return _warmer_instance
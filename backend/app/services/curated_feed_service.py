@@ -1,15 +1,57 @@
+"""
+Curated landing feed (10 items across 4 verticals + a wildcard).
+The feed is generated in the background and swapped into
+landing_feed_cache.json atomically; requests only ever read the last good
+feed, so the homepage never waits on SerpAPI. The parsed feed, its
+serialized response body and ETag are held in memory and only rebuilt
+when the file changes (mtime/size) or this process writes a new feed.
+
+Every worker runs the scheduler, but a refresh first takes the "landing_feed"
+lease in the shared cache tier (as the cache warmer does), so one worker per
+host spends the SerpAPI calls and the others pick up its file. A failed
+refresh keeps the lease for LANDING_FEED_RETRY_BACKOFF, and this process
+doesn't retry before then either, however many requests see a stale feed.
+
+Environment Variables:
+- LANDING_FEED_REFRESH_AHEAD: Seconds before expiry at which the scheduler regenerates (default: 7200)
+- LANDING_FEED_CHECK_INTERVAL: Seconds between scheduler checks (default: 300)
+- LANDING_FEED_WORKERS: Concurrent vertical queries during a refresh (default: 6)
+- LANDING_FEED_RETRY_BACKOFF: Seconds before retrying after a failed refresh (default: 900)
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import json
 import os
+import socket
+import tempfile
+import threading
 import time
 import random
 import logging
 from datetime import datetime, timedelta
 from app.services.scraper_service import RealScraperService
+from app.services.metrics_service import record_cache
+from app.services.cache_service import _get_env_int, get_cache
 
 logger = logging.getLogger(__name__)
 
 CACHE_FILE = "landing_feed_cache.json"
 CACHE_DURATION_HOURS = 24
+LANDING_FEED_REFRESH_AHEAD = _get_env_int("LANDING_FEED_REFRESH_AHEAD", 7200)
+LANDING_FEED_CHECK_INTERVAL = _get_env_int("LANDING_FEED_CHECK_INTERVAL", 300)
+LANDING_FEED_WORKERS = _get_env_int("LANDING_FEED_WORKERS", 6)
+LANDING_FEED_RETRY_BACKOFF = _get_env_int("LANDING_FEED_RETRY_BACKOFF", 900)
+
+# file_key: (mtime_ns, size) of the file it was loaded from; body: the /discovery/landing JSON
+FeedSnapshot = namedtuple("FeedSnapshot", ["file_key", "timestamp", "feed", "body", "etag"])
+_EMPTY_SNAPSHOT = FeedSnapshot(None, 0, [], b'{"feed": []}', '"empty"')
+
+
+def _build_snapshot(file_key, timestamp: float, feed: list) -> FeedSnapshot:
+    body = json.dumps({"feed": feed}, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+    return FeedSnapshot(file_key, timestamp, feed, body, etag)
 
 class CuratedFeedService:
     def __init__(self):
@@ -36,40 +78,142 @@ class CuratedFeedService:
                 "slots": 3
             }
         }
+        self._refresh_lock = threading.Lock()
+        self._snapshot = _EMPTY_SNAPSHOT
+        self._snapshot_lock = threading.Lock()
+        self._scheduler: threading.Thread = None
+        self._stop = threading.Event()
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._retry_after = 0.0
 
     def get_landing_feed(self):
+        """Returns the curated 10-item feed (see get_landing_snapshot)."""
+        return self.get_landing_snapshot().feed
+
+    def get_landing_snapshot(self) -> FeedSnapshot:
         """
-        Returns the curated 10-item feed.
-        Checks cache first. If stale/missing, regenerates.
+        The current feed with its pre-serialized body and ETag.
+        Costs one os.stat per call; the file is only re-read when it changed.
+        Always serves the last saved feed, even past expiry; a stale or missing
+        feed only triggers a background refresh.
         """
-        # 1. Check Cache
-        cached_data = self._load_cache()
-        if cached_data:
-            logger.info("Serving Landing Feed from Cache")
-            return cached_data
-
-        # 2. Regenerate
-        logger.info("Regenerating Landing Feed...")
-        feed = self._generate_feed()
-        
-        # 3. Save Cache
-        self._save_cache(feed)
-        return feed
+        snapshot = self._current_snapshot()
+        fresh = snapshot.file_key is not None and not self._is_stale(snapshot.timestamp, 0)
+        record_cache("landing_feed", fresh)
+        if not fresh:
+            self.refresh_async()
+        return snapshot
+
+    def _current_snapshot(self) -> FeedSnapshot:
+        try:
+            st = os.stat(CACHE_FILE)
+            file_key = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return self._snapshot
+        snapshot = self._snapshot
+        if snapshot.file_key == file_key:
+            return snapshot
+        with self._snapshot_lock:
+            if self._snapshot.file_key != file_key:
+                data = self._read_cache_file()
+                if data and data.get('feed'):
+                    self._snapshot = _build_snapshot(file_key, data.get('timestamp', 0), data['feed'])
+                    logger.info(f"Landing Feed loaded from disk ({len(data['feed'])} items)")
+                else:
+                    # Unreadable/empty file: keep serving what we have, don't re-read until it changes
+                    self._snapshot = self._snapshot._replace(file_key=file_key)
+            return self._snapshot
+
+    # ── Background refresh ───────────────────────────────────────────────
+    def _is_stale(self, timestamp: float, ahead_seconds: int) -> bool:
+        return time.time() - timestamp > CACHE_DURATION_HOURS * 3600 - ahead_seconds
+
+    def refresh(self) -> bool:
+        """
+        Regenerate and atomically swap the feed. No-op if a refresh is already
+        running, another worker holds the lease, or the last one failed recently.
+        """
+        if time.time() < self._retry_after or not self._refresh_lock.acquire(blocking=False):
+            return False
+        return self._refresh_locked()
+
+    def refresh_async(self) -> None:
+        # Lock taken here (not in the thread) so callers can't start two refreshes
+        if time.time() < self._retry_after or not self._refresh_lock.acquire(blocking=False):
+            return
+        threading.Thread(target=self._refresh_locked, name="landing-feed-refresh", daemon=True).start()
+
+    def _refresh_locked(self) -> bool:
+        try:
+            if not get_cache().shared.try_lease("landing_feed", self._owner, LANDING_FEED_RETRY_BACKOFF):
+                # Another worker on this host is refreshing (or backing off); its file is picked up by stat
+                self._retry_after = time.time() + LANDING_FEED_CHECK_INTERVAL
+                return False
+            started = time.perf_counter()
+            logger.info("Regenerating Landing Feed...")
+            feed = self._generate_feed()
+            if not feed:
+                logger.warning("Landing Feed refresh produced no items; keeping previous feed")
+                self._retry_after = time.time() + LANDING_FEED_RETRY_BACKOFF
+                return False
+            timestamp = self._save_cache(feed)
+            if not timestamp:
+                self._retry_after = time.time() + LANDING_FEED_RETRY_BACKOFF
+                return False
+            # Install directly; the next stat sees our own file and keeps this snapshot
+            st = os.stat(CACHE_FILE)
+            with self._snapshot_lock:
+                self._snapshot = _build_snapshot((st.st_mtime_ns, st.st_size), timestamp, feed)
+            logger.info(f"Landing Feed refreshed: {len(feed)} items in {time.perf_counter() - started:.1f}s")
+            return True
+        except Exception as e:
+            logger.error(f"Landing Feed refresh failed: {e}")
+            self._retry_after = time.time() + LANDING_FEED_RETRY_BACKOFF
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def _scheduler_loop(self):
+        while not self._stop.is_set():
+            snapshot = self._current_snapshot()
+            if snapshot.file_key is None or self._is_stale(snapshot.timestamp, LANDING_FEED_REFRESH_AHEAD):
+                self.refresh()
+            self._stop.wait(LANDING_FEED_CHECK_INTERVAL)
+
+    def start_scheduler(self) -> None:
+        """Refresh ahead of expiry in a daemon thread (checked every LANDING_FEED_CHECK_INTERVAL)."""
+        if self._scheduler and self._scheduler.is_alive():
+            return
+        self._stop.clear()
+        self._scheduler = threading.Thread(target=self._scheduler_loop, name="landing-feed-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def stop_scheduler(self) -> None:
+        self._stop.set()
+
+    def _fetch_vertical_queries(self) -> dict:
+        """All vertical queries concurrently; results keep query order so ranking is unchanged."""
+        jobs = [(v_name, q) for v_name, v_config in self.verticals.items() for q in v_config["queries"]]
+        with ThreadPoolExecutor(max_workers=LANDING_FEED_WORKERS, thread_name_prefix="feed") as pool:
+            futures = [pool.submit(self.scraper.search_products, q) for _, q in jobs]
+        candidates = {v_name: [] for v_name in self.verticals}
+        for (v_name, q), future in zip(jobs, futures):
+            try:
+                candidates[v_name].extend(future.result().get("online", []))
+            except Exception as e:
+                logger.error(f"Landing Feed query failed for '{q}': {e}")
+        return candidates
 
     def _generate_feed(self):
         all_candidates = []
         final_feed = []
         
-        # A. Fetch & Rank per Vertical
+        # A. Fetch (concurrently) & Rank per Vertical
         vertical_results = {}
+        fetched = self._fetch_vertical_queries()
         
         for v_name, v_config in self.verticals.items():
-            candidates = []
-            for q in v_config["queries"]:
-                # Fetch only, no analysis to save time
-                resp = self.scraper.search_products(q)
-                items = resp.get("online", [])
-                candidates.extend(items)
+            candidates = fetched[v_name]
             
             # Remove duplicates based on URL or Title
             unique_candidates = {c['title']: c for c in candidates if c.get('title')}.values()
@@ -200,28 +344,36 @@ class CuratedFeedService:
         except:
             return 0
 
-    def _load_cache(self):
+    def _read_cache_file(self):
+        """Raw {timestamp, feed} from disk, regardless of age."""
         if not os.path.exists(CACHE_FILE):
             return None
         try:
             with open(CACHE_FILE, 'r') as f:
-                data = json.load(f)
-            
-            # Check expiry
-            ts = data.get('timestamp', 0)
-            if time.time() - ts > CACHE_DURATION_HOURS * 3600:
-                return None
-                
-            return data.get('feed')
+                return json.load(f)
         except:
             return None
 
     def _save_cache(self, feed):
+        # Write a temp file in the same directory, then rename over the old one:
+        # readers see either the previous feed or the new one, never a partial file
+        # Returns the saved timestamp, or None on failure
+        tmp_path = None
+        timestamp = time.time()
         try:
-            with open(CACHE_FILE, 'w') as f:
+            directory = os.path.dirname(os.path.abspath(CACHE_FILE))
+            with tempfile.NamedTemporaryFile('w', dir=directory, prefix='.landing_feed_', suffix='.tmp', delete=False) as f:
+                tmp_path = f.name
                 json.dump({
-                    'timestamp': time.time(),
+                    'timestamp': timestamp,
                     'feed': feed
                 }, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, CACHE_FILE)
+            return timestamp
         except Exception as e:
             logger.error(f"Failed to save feed cache: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
@@ -3,6 +3,8 @@ from app.models import Product, CompetitorProduct, PriceHistory
 from datetime import datetime
 import logging
 
+from app.services.metrics_service import observe_db_commit
+
 logger = logging.getLogger(__name__)
 
 def save_product_snapshot(db: Session, product_data: dict, source: str = "SerpApi"):
@@ -55,7 +57,7 @@ def save_product_snapshot(db: Session, product_data: dict, source: str = "SerpAp
                 image_url=image
             )
             db.add(product)
-            db.commit()
+            observe_db_commit(db, "product_insert")
             db.refresh(product)
 
         # 2. Find or Create CompetitorProduct (The link to external store)
@@ -73,13 +75,13 @@ def save_product_snapshot(db: Session, product_data: dict, source: str = "SerpAp
                 last_updated=datetime.utcnow()
             )
             db.add(competitor)
-            db.commit()
+            observe_db_commit(db, "competitor_insert")
             db.refresh(competitor)
         else:
             # Update last known price
             competitor.last_price = price
             competitor.last_updated = datetime.utcnow()
-            db.commit()
+            observe_db_commit(db, "competitor_update")
 
         # 3. Add Price History Record
         # Only add if price changed or it's been > 24 hours? 
@@ -104,7 +106,7 @@ def save_product_snapshot(db: Session, product_data: dict, source: str = "SerpAp
                 timestamp=datetime.utcnow()
             )
             db.add(history)
-            db.commit()
+            observe_db_commit(db, "price_history_insert")
 
     except Exception as e:
         logger.error(f"Failed to save product snapshot: {e}")
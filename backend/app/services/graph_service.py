@@ -1,7 +1,34 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
-from app.models import User, SearchQuery, ProductView, Product, PriceHistory
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.models import User, SearchQuery, SearchQueryCount, ProductView, Product, PriceHistory
 from datetime import datetime, timedelta
+from typing import Optional
+import os
+import re
+import socket
+
+ALL_TIME = datetime(1970, 1, 1)
+# Long enough for a backfill over a large search_queries table; after it, the filled table stops reruns
+_BACKFILL_LEASE_TTL = 3600
+_WINDOW_RE = re.compile(r"^(\d+)([hd])$")
+
+
+def normalize_search_term(query: str) -> Optional[str]:
+    """Counter key for a search; None for URLs and long strings, which are never listed."""
+    term = " ".join(str(query or "").lower().split())
+    if not term or len(term) > 40 or term.startswith(('http://', 'https://', 'www.')):
+        return None
+    return term
+
+
+def _bucket_starts(ts: datetime) -> dict:
+    return {
+        "hour": ts.replace(minute=0, second=0, microsecond=0),
+        "day": ts.replace(hour=0, minute=0, second=0, microsecond=0),
+        "all": ALL_TIME,
+    }
+
 
 class GraphService:
     def get_or_create_user(self, db: Session, anonymous_id: str):
@@ -19,29 +46,106 @@ class GraphService:
             user = self.get_or_create_user(db, anonymous_id)
             user_id = user.id
             
-        search = SearchQuery(user_id=user_id, query_text=query)
+        search = SearchQuery(user_id=user_id, query_text=query, timestamp=datetime.utcnow())
         db.add(search)
+        self._increment_counts(db, query, search.timestamp)
         db.commit()
+        from app.services.suggest_service import get_suggest_index
+        get_suggest_index().record(query)
         return search
 
-    def get_popular_searches(self, db: Session, limit: int = 5):
-        # Fetch more candidates to allow for filtering
-        candidates = db.query(
-            SearchQuery.query_text, 
-            func.count(SearchQuery.query_text).label('count')
-        ).group_by(SearchQuery.query_text).order_by(desc('count')).limit(limit * 4).all()
-        
-        results = []
-        for r in candidates:
-            term = r[0]
-            # Filter out URLs and long strings
-            if term and len(term) <= 40 and not term.lower().startswith(('http://', 'https://', 'www.')):
-                results.append({"term": term, "count": r[1]})
-                
-            if len(results) >= limit:
-                break
-                
-        return results
+    def _increment_counts(self, db: Session, query: str, ts: datetime, amount: int = 1):
+        """Upsert the hour, day and all-time counters for one search (no commit)."""
+        term = normalize_search_term(query)
+        if term is None:
+            return
+        stmt = sqlite_insert(SearchQueryCount).values([
+            {"granularity": g, "bucket_start": start, "normalized_query": term,
+             "display_query": " ".join(str(query).split()), "count": amount}
+            for g, start in _bucket_starts(ts).items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["granularity", "bucket_start", "normalized_query"],
+            set_={"count": SearchQueryCount.count + stmt.excluded.count, "display_query": stmt.excluded.display_query}
+        )
+        db.execute(stmt)
+
+    def get_top_searches(self, db: Session, window: str = "all", limit: int = 5):
+        """
+        Top-K searches for a window: "all", "today" (UTC day), "hour" (current hour),
+        or a sliding "<n>h" / "<n>d" (e.g. 24h, 7d). Reads only the counter table.
+        """
+        now = datetime.utcnow()
+        buckets = _bucket_starts(now)
+        C = SearchQueryCount
+        if window in ("all", "today", "hour"):
+            granularity = {"all": "all", "today": "day", "hour": "hour"}[window]
+            rows = db.query(C.display_query, C.count).filter(
+                C.granularity == granularity, C.bucket_start == buckets[granularity]
+            ).order_by(desc(C.count)).limit(limit).all()
+            return [{"term": r[0], "count": r[1]} for r in rows]
+
+        match = _WINDOW_RE.match(window or "")
+        if not match or int(match.group(1)) <= 0:
+            raise ValueError(f"Unknown window '{window}' (use all, today, hour, <n>h or <n>d)")
+        n, unit = int(match.group(1)), match.group(2)
+        granularity = "hour" if unit == "h" else "day"
+        since = buckets[granularity] - (timedelta(hours=n - 1) if unit == "h" else timedelta(days=n - 1))
+        total = func.sum(C.count).label("count")
+        rows = db.query(C.normalized_query, total).filter(
+            C.granularity == granularity, C.bucket_start >= since
+        ).group_by(C.normalized_query).order_by(desc(total)).limit(limit).all()
+        # Every search rewrites the all-time row's display_query, so it holds the latest spelling
+        display = dict(db.query(C.normalized_query, C.display_query).filter(
+            C.granularity == "all", C.bucket_start == ALL_TIME, C.normalized_query.in_([r[0] for r in rows])
+        ).all()) if rows else {}
+        return [{"term": display.get(r[0]) or r[0], "count": r[1]} for r in rows]
+
+    def get_popular_searches(self, db: Session, limit: int = 5, window: str = "all"):
+        return self.get_top_searches(db, window, limit)
+
+    def get_trending_searches(self, db: Session, hours: int = 24, limit: int = 5):
+        """Most frequent searches within the last `hours`."""
+        return self.get_top_searches(db, f"{hours}h", limit)
+
+    def backfill_search_counts(self, db: Session, batch_size: int = 5000) -> int:
+        """
+        One-time fill of the counter table from existing search_queries rows.
+        Runs under a host-wide lease so workers starting together don't fill it twice.
+        """
+        if db.query(SearchQueryCount.id).first() is not None:
+            return 0
+        from app.services.cache_service import get_cache
+        if not get_cache().shared.try_lease("search_counts_backfill", f"{socket.gethostname()}:{os.getpid()}",
+                                            _BACKFILL_LEASE_TTL):
+            return 0  # another worker is backfilling
+        counts, display = {}, {}
+        rows = db.query(SearchQuery.query_text, SearchQuery.timestamp).order_by(SearchQuery.timestamp).yield_per(batch_size)
+        for text, ts in rows:
+            term = normalize_search_term(text)
+            if term is None:
+                continue
+            display[term] = " ".join(str(text).split())
+            for g, start in _bucket_starts(ts or datetime.utcnow()).items():
+                key = (g, start, term)
+                counts[key] = counts.get(key, 0) + 1
+        db.bulk_insert_mappings(SearchQueryCount, [
+            {"granularity": g, "bucket_start": start, "normalized_query": term,
+             "display_query": display[term], "count": n}
+            for (g, start, term), n in counts.items()
+        ])
+        db.commit()
+        return len(counts)
+
+    def prune_search_counts(self, db: Session, hour_days: int = 8, day_days: int = 400) -> int:
+        """Drop hourly buckets older than `hour_days` and daily ones older than `day_days`."""
+        now = datetime.utcnow()
+        removed = db.query(SearchQueryCount).filter(
+            ((SearchQueryCount.granularity == "hour") & (SearchQueryCount.bucket_start < now - timedelta(days=hour_days)))
+            | ((SearchQueryCount.granularity == "day") & (SearchQueryCount.bucket_start < now - timedelta(days=day_days)))
+        ).delete(synchronize_session=False)
+        db.commit()
+        return removed
 
     def record_view(self, db: Session, product_id: int, anonymous_id: str = None):
         user_id = None
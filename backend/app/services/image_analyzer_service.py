@@ -1,12 +1,98 @@
+"""
+Product identification from uploaded images (GPT-4o-mini vision).
+Uploads are decoded, downscaled and re-encoded as a small JPEG on a
+dedicated worker pool before the vision call. Analyses are cached by exact
+and perceptual hash (see image_cache_service), so a re-uploaded image or a
+near-duplicate skips the call entirely.
+
+Environment Variables:
+- IMAGE_UPLOAD_MAX_BYTES: Largest accepted upload (default: 10485760 = 10 MB)
+- IMAGE_MAX_DIMENSION: Longest side sent to the vision model (default: 1024)
+- IMAGE_MAX_PIXELS: Decoded size limit, guards against decompression bombs (default: 40000000)
+- IMAGE_WORKERS: Threads for decode/resize/encode (default: 4)
+"""
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
+from PIL import Image, ImageOps
+import asyncio
+import hashlib
+import io
 import json
 import logging
 import os
 import base64
 from typing import Dict, Any
+from app.services.cache_service import _get_env_int
+from app.services.image_cache_service import get_image_cache, dhash, color_signature
+from app.services.io_pool import run_blocking
+from app.services.tracing_service import record_llm, trace_span
+from app.services.metrics_service import observe_call
 
 logger = logging.getLogger(__name__)
 
+IMAGE_UPLOAD_MAX_BYTES = _get_env_int("IMAGE_UPLOAD_MAX_BYTES", 10 * 1024 * 1024)
+IMAGE_MAX_DIMENSION = _get_env_int("IMAGE_MAX_DIMENSION", 1024)
+IMAGE_MAX_PIXELS = _get_env_int("IMAGE_MAX_PIXELS", 40_000_000)
+IMAGE_WORKERS = _get_env_int("IMAGE_WORKERS", 4)
+IMAGE_JPEG_QUALITY = 85
+
+# Pillow raises DecompressionBombError above 2x this
+Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS // 2
+
+_image_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+
+
+def _decode_image(raw: bytes) -> Image.Image:
+    """Decode, orient and downscale to IMAGE_MAX_DIMENSION as RGB (alpha flattened on white)."""
+    img = Image.open(io.BytesIO(raw))
+    # JPEG: let the decoder scale by 1/2..1/8 while decoding instead of after
+    img.draft("RGB", (IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION))
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        img = background
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+    img.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION), Image.LANCZOS)
+    return img
+
+
+def _encode_jpeg(img: Image.Image) -> bytes:
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+def preprocess_image(raw: bytes) -> bytes:
+    """
+    Decode, orient, downscale to IMAGE_MAX_DIMENSION and re-encode as JPEG.
+    A 12 MP phone photo becomes a ~100-200 KB JPEG: far less to base64 and upload,
+    and the vision model downsamples anything larger anyway.
+    """
+    return _encode_jpeg(_decode_image(raw))
+
+
+def _prepare_upload(raw: bytes) -> tuple:
+    """
+    Cache lookup + preprocessing, cheapest first: SHA-256 exact match, then
+    decode + dHash/colour near-duplicate match, and only on a miss the JPEG encode.
+    Returns (sha256, phash, colors, cached_analysis, jpeg).
+    """
+    cache = get_image_cache()
+    sha = hashlib.sha256(raw).hexdigest()
+    cached = cache.get_exact(sha)
+    if cached:
+        return sha, None, None, cached, None
+    img = _decode_image(raw)
+    phash, colors = dhash(img), color_signature(img)
+    cached = cache.get_near(phash, colors)
+    if cached:
+        return sha, phash, colors, cached, None
+    return sha, phash, colors, None, _encode_jpeg(img)
+
+
 class ImageAnalyzerService:
     def __init__(self):
         try:
@@ -38,7 +124,7 @@ class ImageAnalyzerService:
         try:
             logger.info("Analyzing product image with GPT-4 Vision")
             
-            response = self.client.chat.completions.create(
+            response = observe_call("openai", self.client.chat.completions.create,
                 model="gpt-4o-mini",  # Using gpt-4o-mini for vision (cost-effective)
                 messages=[
                     {
@@ -74,6 +160,7 @@ class ImageAnalyzerService:
                 response_format={"type": "json_object"},
                 max_tokens=500
             )
+            record_llm("gpt-4o-mini", response, vision=True)
             
             result = json.loads(response.choices[0].message.content)
             logger.info(f"Image analysis complete: {result.get('search_query', 'N/A')}")
@@ -86,3 +173,40 @@ class ImageAnalyzerService:
                 "search_query": "",
                 "confidence": "low"
             }
+
+    def _store_analysis(self, sha: str, phash: int, colors: tuple, result: Dict[str, Any]) -> Dict[str, Any]:
+        # Failures and unusable answers are not cached, so a retry can succeed
+        if "error" in result or not result.get("search_query"):
+            return result
+        get_image_cache().set(sha, phash, result, colors)
+        return dict(result, image_hash=sha)
+
+    def analyze_image_bytes(self, raw: bytes) -> Dict[str, Any]:
+        """
+        Preprocess + analyze raw upload bytes. Cached results (exact or
+        near-duplicate) carry `image_hash`, the key for linking a search result.
+        """
+        with trace_span("image_preprocess"):
+            sha, phash, colors, cached, jpeg = _prepare_upload(raw)
+        if cached:
+            logger.info("Image analysis served from cache")
+            return cached
+        with trace_span("image_analysis"):
+            result = self.analyze_product_image(base64.b64encode(jpeg).decode("utf-8"))
+        return self._store_analysis(sha, phash, colors, result)
+
+    async def analyze_image_bytes_async(self, raw: bytes) -> Dict[str, Any]:
+        """
+        analyze_image_bytes for async endpoints: hashing and decode/resize/encode
+        run on the image pool, the vision call on the shared I/O pool.
+        """
+        loop = asyncio.get_running_loop()
+        with trace_span("image_preprocess"):
+            sha, phash, colors, cached, jpeg = await loop.run_in_executor(_image_executor, _prepare_upload, raw)
+        if cached:
+            logger.info("Image analysis served from cache")
+            return cached
+        logger.info(f"Image preprocessed: {len(raw)} -> {len(jpeg)} bytes")
+        with trace_span("image_analysis"):
+            result = await run_blocking(self.analyze_product_image, base64.b64encode(jpeg).decode("utf-8"))
+        return self._store_analysis(sha, phash, colors, result)
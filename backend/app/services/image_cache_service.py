@@ -0,0 +1,201 @@
+"""
+Content-hash cache for image analyses.
+Entries are keyed by the SHA-256 of the upload; a 64-bit difference hash
+(dHash) of the decoded image also finds near-duplicates (re-saved
+screenshots, recompressed or resized copies of the same photo). The dHash is
+grayscale, so a near hit must also agree on a coarse colour signature (mean
+RGB of each quadrant): a red and a blue kurta from the same shoot share a
+dHash but not an analysis. The smart search response for an image's
+`search_query` is linked to its hash per location in the shared cache (search
+codec, CACHE_TTL_SEARCH), so a repeat image search on any worker skips both
+the vision call and the search.
+
+Environment Variables:
+- CACHE_TTL_IMAGE: TTL in seconds for cached analyses (default: 86400 = 1 day)
+- IMAGE_CACHE_MAX_ENTRIES: Max cached analyses held in memory (default: 1000)
+- IMAGE_PHASH_MAX_DISTANCE: Max Hamming distance (of 64 bits) treated as the same image (default: 6)
+- IMAGE_COLOR_MAX_DELTA: Max per-channel difference (0-255) of the quadrant colour means for a near hit (default: 24)
+"""
+from collections import OrderedDict
+from typing import Optional, Tuple
+import logging
+import threading
+import time
+
+from PIL import Image
+
+from app.services.cache_service import _get_env_int, CACHE_ENABLED, CACHE_TTL_SEARCH, get_cache
+from app.services.metrics_service import record_cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL_IMAGE = _get_env_int("CACHE_TTL_IMAGE", 86400)
+IMAGE_CACHE_MAX_ENTRIES = _get_env_int("IMAGE_CACHE_MAX_ENTRIES", 1000)
+IMAGE_PHASH_MAX_DISTANCE = _get_env_int("IMAGE_PHASH_MAX_DISTANCE", 6)
+IMAGE_COLOR_MAX_DELTA = _get_env_int("IMAGE_COLOR_MAX_DELTA", 24)
+
+
+def dhash(img: Image.Image, hash_size: int = 8) -> int:
+    """Difference hash: sign of horizontal gradients on a (hash_size+1) x hash_size grayscale thumbnail."""
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (1 if pixels[offset + col] > pixels[offset + col + 1] else 0)
+    return value
+
+
+def color_signature(img: Image.Image) -> Tuple[int, ...]:
+    """Mean R, G, B of each quadrant (12 values), which the grayscale dHash can't tell apart."""
+    small = img.convert("RGB").resize((2, 2), Image.BOX)
+    return tuple(channel for pixel in small.getdata() for channel in pixel)
+
+
+def color_delta(a: Tuple[int, ...], b: Tuple[int, ...]) -> int:
+    return max(abs(x - y) for x, y in zip(a, b))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _informative(phash: Optional[int]) -> bool:
+    """Flat images (blank screenshots, solid swatches) hash to ~all 0s/1s and would all collide."""
+    return phash is not None and 8 <= bin(phash).count("1") <= 56
+
+
+class _Entry:
+    __slots__ = ("phash", "colors", "analysis", "expires_at")
+
+    def __init__(self, phash: Optional[int], colors: Optional[Tuple[int, ...]], analysis: dict, expires_at: float):
+        self.phash = phash
+        self.colors = colors
+        self.analysis = analysis
+        self.expires_at = expires_at
+
+
+class ImageAnalysisCache:
+    """Bounded LRU of analyses, looked up by exact hash then by perceptual hash."""
+
+    def __init__(self, max_entries: int = IMAGE_CACHE_MAX_ENTRIES, ttl_seconds: int = CACHE_TTL_IMAGE,
+                 max_distance: int = IMAGE_PHASH_MAX_DISTANCE, max_color_delta: int = IMAGE_COLOR_MAX_DELTA):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self.max_color_delta = max_color_delta
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._exact_hits = 0
+        self._near_hits = 0
+        self._misses = 0
+        self._search_hits = 0
+
+    def _live(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get_exact(self, sha256: str) -> Optional[dict]:
+        """Analysis for an identical upload (counted as a miss only by get_near)."""
+        if not CACHE_ENABLED:
+            return None
+        with self._lock:
+            entry = self._live(sha256)
+            if entry is None:
+                return None
+            self._exact_hits += 1
+        record_cache("image", True)
+        return dict(entry.analysis, image_hash=sha256)
+
+    def get_near(self, phash: int, colors: Tuple[int, ...]) -> Optional[dict]:
+        """Analysis for the closest cached image within max_distance bits and max_color_delta."""
+        if not CACHE_ENABLED:
+            return None
+        if not _informative(phash) or colors is None:
+            with self._lock:
+                self._misses += 1
+            record_cache("image", False)
+            return None
+        with self._lock:
+            best_key, best_distance = None, self.max_distance + 1
+            now = time.time()
+            for key, entry in self._entries.items():
+                if entry.phash is None or entry.expires_at < now:
+                    continue
+                if entry.colors is None or color_delta(colors, entry.colors) > self.max_color_delta:
+                    continue
+                distance = hamming(phash, entry.phash)
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+            entry = self._live(best_key) if best_key else None
+            if entry is None:
+                self._misses += 1
+            else:
+                self._near_hits += 1
+        record_cache("image", entry is not None)
+        if entry is None:
+            return None
+        logger.info(f"[ImageCache] Near-duplicate hit (distance={best_distance})")
+        return dict(entry.analysis, image_hash=best_key)
+
+    def set(self, sha256: str, phash: Optional[int], analysis: dict, colors: Optional[Tuple[int, ...]] = None) -> None:
+        if not CACHE_ENABLED:
+            return
+        with self._lock:
+            self._entries[sha256] = _Entry(phash if _informative(phash) else None, colors, analysis,
+                                           time.time() + self.ttl_seconds)
+            self._entries.move_to_end(sha256)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _search_key(sha256: str, location: str) -> str:
+        # "search" prefix, so the entry is compressed with the search payload codec
+        return get_cache()._make_key("search", "image", sha256, (location or "").lower())
+
+    def link_search(self, sha256: str, location: str, response: dict) -> None:
+        """Link the smart search response for this image's query (kept for CACHE_TTL_SEARCH)."""
+        get_cache().set(self._search_key(sha256, location), response, CACHE_TTL_SEARCH)
+
+    def get_search(self, sha256: str, location: str) -> Optional[dict]:
+        linked = get_cache().get(self._search_key(sha256, location))
+        if linked is not None:
+            with self._lock:
+                self._search_hits += 1
+        return linked
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        return count
+
+    def stats(self) -> dict:
+        lookups = self._exact_hits + self._near_hits + self._misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "exact_hits": self._exact_hits,
+            "near_hits": self._near_hits,
+            "misses": self._misses,
+            "linked_search_hits": self._search_hits,
+            "hit_rate": (self._exact_hits + self._near_hits) / lookups if lookups else 0,
+            "ttl": self.ttl_seconds
+        }
+
+
+_image_cache_instance = None
+
+def get_image_cache() -> ImageAnalysisCache:
+    """Get the singleton image analysis cache."""
+    global _image_cache_instance
+    if _image_cache_instance is None:
+        _image_cache_instance = ImageAnalysisCache()
+    return _image_cache_instance
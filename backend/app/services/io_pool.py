@@ -0,0 +1,108 @@
+"""
+Bridge from async endpoints to the blocking service layer.
+SerpAPI (google-search-results, built on requests), requests itself and the
+sync OpenAI client all block, and none of them is swapped for an async client
+here: the async service methods are a thread offload. They run the existing
+pipeline on a dedicated, wide I/O pool instead of FastAPI's default thread
+limiter (40 tokens), so the event loop stays free and the number of in-flight
+uncached searches is bounded by IO_POOL_WORKERS, not by the request threadpool.
+
+Sizing: a thread blocked on a socket costs a stack and no CPU (the GIL is
+released), so the pools are sized for in-flight waits, not cores. One
+uncached search holds one I/O thread for its whole pipeline (~1-4 s) and its
+8 marketplace sub-queries for ~1-2 s each, so 256 I/O threads cover 256
+concurrent uncached searches; cached searches return on the event loop in
+milliseconds and never reach a pool. Beyond the pool sizes, work queues
+(visible as `waiting` in /metrics) rather than failing.
+
+A search's marketplace fan-out gets a pool of its own: the search itself may
+already hold an I/O pool thread, so waiting on sub-queries queued behind it
+in the same pool could deadlock, and the small stage_executor pool is for DAG
+stages (URL extraction), not for hundreds of concurrent searches.
+
+Pool occupancy is counted by the pools themselves (TrackedPool) rather than
+read from ThreadPoolExecutor internals.
+
+Environment Variables:
+- IO_POOL_WORKERS: Threads available to in-flight blocking calls (default: 256)
+- SEARCH_FANOUT_WORKERS: Threads for marketplace sub-queries across all searches (default: 256)
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+import asyncio
+import contextvars
+import logging
+import threading
+
+from app.services.cache_service import _get_env_int
+
+logger = logging.getLogger(__name__)
+
+IO_POOL_WORKERS = _get_env_int("IO_POOL_WORKERS", 256)
+SEARCH_FANOUT_WORKERS = _get_env_int("SEARCH_FANOUT_WORKERS", 256)
+
+
+
+class TrackedPool:
+    """ThreadPoolExecutor that counts its own submitted, queued and running tasks."""
+
+    def __init__(self, workers: int, thread_name_prefix: str):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._queued = 0
+        self._busy = 0
+
+    def _run(self, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._busy += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._busy -= 1
+
+    def _on_done(self, future: Future) -> None:
+        if future.cancelled():  # never started, so still counted as queued
+            with self._lock:
+                self._queued -= 1
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            self._submitted += 1
+            self._queued += 1
+        future = self._executor.submit(self._run, fn, args, kwargs)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def submit_in_context(self, fn: Callable, *args, **kwargs) -> Future:
+        """submit(), carrying the caller's context (active trace) into the worker thread."""
+        return self.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": self.workers, "busy": self._busy, "waiting": self._queued, "submitted": self._submitted}
+
+
+_io_pool = TrackedPool(IO_POOL_WORKERS, "io")
+_fanout_pool = TrackedPool(SEARCH_FANOUT_WORKERS, "fanout")
+
+
+async def run_blocking(fn: Callable, *args, **kwargs) -> Any:
+    """Await a blocking call on the I/O pool, carrying the caller's context (active trace)."""
+    return await asyncio.wrap_future(_io_pool.submit_in_context(fn, *args, **kwargs))
+
+
+def submit_fanout(fn: Callable, *args, **kwargs) -> Future:
+    """Submit a search sub-query to the fan-out pool, carrying the caller's context (active trace)."""
+    return _fanout_pool.submit_in_context(fn, *args, **kwargs)
+
+
+def io_pool_stats() -> dict:
+    return _io_pool.stats()
+
+
+def fanout_pool_stats() -> dict:
+    return _fanout_pool.stats()
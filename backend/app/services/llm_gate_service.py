@@ -0,0 +1,130 @@
+"""
+Confidence gate in front of the Layer-3 LLM batch scorer.
+Without an LLM verdict, the top candidates are tiered by fuzzy score
+(>= 85 exact, >= 60 variant, else similar). When those scores are already
+decisive, the GPT round-trip rarely changes the tiers, so it is skipped:
+- high: at least LLM_GATE_MIN_MODEL_MATCHES candidates have a model-number
+  match scoring LLM_GATE_HIGH_SCORE or more
+- low: no candidate reaches LLM_GATE_LOW_SCORE
+
+A sample of skipped searches (LLM_GATE_AUDIT_PERCENT) still calls the LLM and
+compares its tiers with the fuzzy ones, so the disagreement rate of the gate
+is measured rather than assumed.
+
+Environment Variables:
+- LLM_GATE_ENABLED: Set to 'false' to always call the LLM scorer (default: true)
+- LLM_GATE_HIGH_SCORE: Fuzzy score of a decisive model-number match (default: 90)
+- LLM_GATE_MIN_MODEL_MATCHES: Decisive model-number matches needed to skip (default: 3)
+- LLM_GATE_LOW_SCORE: Skip when every candidate scores below this (default: 30)
+- LLM_GATE_AUDIT_PERCENT: Percent of skipped searches that call the LLM anyway to measure disagreement (default: 5)
+"""
+from typing import Dict, List
+import logging
+import random
+import threading
+
+from app.services.cache_service import _get_env_int, _get_env_bool
+from app.services.metrics_service import record_llm_gate
+
+logger = logging.getLogger(__name__)
+
+LLM_GATE_ENABLED = _get_env_bool("LLM_GATE_ENABLED", True)
+LLM_GATE_HIGH_SCORE = _get_env_int("LLM_GATE_HIGH_SCORE", 90)
+LLM_GATE_MIN_MODEL_MATCHES = _get_env_int("LLM_GATE_MIN_MODEL_MATCHES", 3)
+LLM_GATE_LOW_SCORE = _get_env_int("LLM_GATE_LOW_SCORE", 30)
+LLM_GATE_AUDIT_PERCENT = _get_env_int("LLM_GATE_AUDIT_PERCENT", 5)
+
+_LLM_TIERS = {"EXACT": "EXACT_MATCH", "VARIANT": "VARIANT_MATCH", "SIMILAR": "SIMILAR"}
+
+
+def fuzzy_tier(score: int) -> str:
+    """Tier a candidate gets when the LLM has no verdict for it."""
+    if score >= 85:
+        return "EXACT_MATCH"
+    if score >= 60:
+        return "VARIANT_MATCH"
+    return "SIMILAR"
+
+
+class LLMGate:
+    def __init__(self, enabled: bool = LLM_GATE_ENABLED, high_score: int = LLM_GATE_HIGH_SCORE,
+                 min_model_matches: int = LLM_GATE_MIN_MODEL_MATCHES, low_score: int = LLM_GATE_LOW_SCORE,
+                 audit_percent: int = LLM_GATE_AUDIT_PERCENT, rng: random.Random = None):
+        self.enabled = enabled
+        self.high_score = high_score
+        self.min_model_matches = min_model_matches
+        self.low_score = low_score
+        self.audit_percent = audit_percent
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._counts = {"called": 0, "skipped_high": 0, "skipped_low": 0,
+                        "audited": 0, "audit_disagreed": 0, "audit_candidates": 0, "audit_candidates_changed": 0}
+
+    def decide(self, candidates: List[dict], scores: List[int]) -> dict:
+        """
+        Whether the LLM call can be skipped for these candidates.
+        `scores` are the fuzzy scores the tiering would use (official boost applied).
+        Returns {"skip", "reason", "audit"}; when `audit` is set the caller still calls the LLM
+        and reports back through record_audit().
+        """
+        reason = None
+        if self.enabled and candidates:
+            decisive = sum(1 for c, s in zip(candidates, scores)
+                           if s >= self.high_score and "Model Match" in (c.get("match_reasons") or []))
+            if decisive >= self.min_model_matches:
+                reason = "high"
+            elif max(scores) < self.low_score:
+                reason = "low"
+        if reason is None:
+            with self._lock:
+                self._counts["called"] += 1
+            record_llm_gate("called", "")
+            return {"skip": False, "reason": None, "audit": False}
+
+        audit = self._rng.random() * 100 < self.audit_percent
+        with self._lock:
+            self._counts["audited" if audit else f"skipped_{reason}"] += 1
+        record_llm_gate("audited" if audit else "skipped", reason)
+        return {"skip": True, "reason": reason, "audit": audit}
+
+    def record_audit(self, decision: dict, scores: List[int], llm_scores: Dict[int, dict]) -> bool:
+        """Compare the LLM's tiers with the fuzzy tiers the gate would have used; True if they differ."""
+        changed = 0
+        for i, score in enumerate(scores):
+            llm_class = (llm_scores.get(i) or {}).get("classification", "").upper()
+            tier = _LLM_TIERS.get(llm_class) or fuzzy_tier(score)
+            if tier != fuzzy_tier(score):
+                changed += 1
+        with self._lock:
+            self._counts["audit_candidates"] += len(scores)
+            self._counts["audit_candidates_changed"] += changed
+            if changed:
+                self._counts["audit_disagreed"] += 1
+        record_llm_gate("disagreed" if changed else "agreed", decision.get("reason") or "")
+        if changed:
+            logger.info(f"[LLMGate] Audit: LLM changed {changed}/{len(scores)} tiers of a '{decision.get('reason')}' skip")
+        return bool(changed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        skipped = counts["skipped_high"] + counts["skipped_low"]
+        total = skipped + counts["called"] + counts["audited"]
+        return {
+            "enabled": self.enabled,
+            "thresholds": {"high_score": self.high_score, "min_model_matches": self.min_model_matches,
+                           "low_score": self.low_score, "audit_percent": self.audit_percent},
+            **counts,
+            "skip_rate": skipped / total if total else 0,
+            "audit_disagreement_rate": counts["audit_disagreed"] / counts["audited"] if counts["audited"] else 0
+        }
+
+
+_gate_instance = None
+
+def get_llm_gate() -> LLMGate:
+    """Get the singleton LLM gate."""
+    global _gate_instance
+    if _gate_instance is None:
+        _gate_instance = LLMGate()
+    return _gate_instance
@@ -0,0 +1,155 @@
+"""
+Batch text scoring of search candidates against the query fingerprint.
+Replaces one _calculate_match_score call per SerpAPI item: all titles are
+upper-cased into one separator-joined string, each target needle (model,
+brand, collection, color, material) is found with a single scan over it,
+and match positions are mapped back to rows with np.searchsorted. The hits
+form an (items x features) matrix; scores are one product with the weight
+vector, and reasons are built once per distinct feature pattern.
+
+Environment Variables:
+- MATCH_WEIGHT_MODEL: Points for the target model number in the title (default: 90)
+- MATCH_WEIGHT_BRAND: Points for the target brand in the title (default: 20)
+- MATCH_WEIGHT_COLLECTION: Points for the target collection/series in the title (default: 15)
+- MATCH_WEIGHT_COLLECTION_CONFLICT: Points for a different known series in the title (default: -30)
+- MATCH_WEIGHT_COLOR: Points for the target color in the title (default: 10)
+- MATCH_WEIGHT_MATERIAL: Points for the target material in the title (default: 10)
+- MATCH_WEIGHT_TRUSTED: Points for an official-site candidate (default: 0; official
+  results get their boost after LLM classification)
+"""
+from typing import Dict, List, Optional, Tuple
+import re
+
+import numpy as np
+
+from app.services.cache_service import _get_env_int
+from app.services.query_analyzer_service import get_query_analyzer
+
+FEATURES = ("model", "brand", "collection", "collection_conflict", "color", "material", "trusted")
+
+MATCH_WEIGHTS = {
+    "model": _get_env_int("MATCH_WEIGHT_MODEL", 90),
+    "brand": _get_env_int("MATCH_WEIGHT_BRAND", 20),
+    "collection": _get_env_int("MATCH_WEIGHT_COLLECTION", 15),
+    "collection_conflict": _get_env_int("MATCH_WEIGHT_COLLECTION_CONFLICT", -30),
+    "color": _get_env_int("MATCH_WEIGHT_COLOR", 10),
+    "material": _get_env_int("MATCH_WEIGHT_MATERIAL", 10),
+    "trusted": _get_env_int("MATCH_WEIGHT_TRUSTED", 0),
+}
+
+TRUSTED_SOURCES = {"Official Site"}
+
+_SEP = "\x00"
+_NO_SERIES = np.iinfo(np.int64).max
+_NON_ALNUM_RE = re.compile(r"[^a-zA-Z0-9\x00]")
+
+
+def _rows_containing(needle: str, text: str, starts: np.ndarray, rows: int) -> np.ndarray:
+    """Boolean per row: does `needle` occur in that row of the joined text."""
+    hits = np.zeros(rows, dtype=bool)
+    if not needle:
+        return hits
+    positions = [m.start() for m in re.finditer(re.escape(needle), text)]
+    if positions:
+        hits[np.searchsorted(starts, positions, side="right") - 1] = True
+    return hits
+
+
+def _join(texts: List[str]) -> Tuple[str, np.ndarray]:
+    """Separator-joined text and each row's start offset."""
+    texts = [t.replace(_SEP, "\x01") for t in texts]
+    lengths = np.fromiter((len(t) + 1 for t in texts), dtype=np.int64, count=len(texts))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if texts else np.zeros(0, dtype=np.int64)
+    return _SEP.join(texts), starts
+
+
+class BatchMatchScorer:
+    """Text score (model/brand/fingerprint hits) for a whole candidate list at once."""
+
+    def __init__(self, weights: Optional[Dict[str, int]] = None, analyzer=None):
+        self.weights = {**MATCH_WEIGHTS, **(weights or {})}
+        self._weight_vector = np.array([self.weights[f] for f in FEATURES], dtype=np.int64)
+        self.analyzer = analyzer or get_query_analyzer()
+
+    def features(self, target_model: Optional[str], target_brand: Optional[str], target_fingerprint: dict,
+                 titles: List[str], sources: List[str]) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """(items x FEATURES) hit matrix, plus each candidate's conflicting series (or None)."""
+        n = len(titles)
+        matrix = np.zeros((n, len(FEATURES)), dtype=bool)
+        conflicts: List[Optional[str]] = [None] * n
+        if not n:
+            return matrix, conflicts
+        upper, starts = _join([(t or "").upper() for t in titles])
+        column = FEATURES.index
+
+        if target_model:
+            clean_rows = _NON_ALNUM_RE.sub("", upper).split(_SEP)
+            clean, clean_starts = _join(clean_rows)
+            matrix[:, column("model")] = (_rows_containing(target_model, upper, starts, n)
+                                          | _rows_containing(target_model, clean, clean_starts, n))
+        if target_brand:
+            matrix[:, column("brand")] = _rows_containing(target_brand.upper(), upper, starts, n)
+
+        coll = (target_fingerprint.get("collection") or "").upper()
+        if coll:
+            has_coll = _rows_containing(coll, upper, starts, n)
+            matrix[:, column("collection")] = has_coll
+            # A different known series in the title contradicts the target's collection;
+            # one scan over all titles, earliest series in the table wins per row
+            found = self.analyzer.find_series(upper)
+            if found:
+                positions, names, priorities = zip(*found)
+                best = np.full(n, _NO_SERIES, dtype=np.int64)
+                np.minimum.at(best, np.searchsorted(starts, positions, side="right") - 1, priorities)
+                name_of = dict(zip(priorities, names))
+                for i in np.flatnonzero(~has_coll & (best != _NO_SERIES)):
+                    series = name_of[int(best[i])]
+                    if series != coll:
+                        conflicts[i] = series
+                        matrix[i, column("collection_conflict")] = True
+        for feature in ("color", "material"):
+            value = (target_fingerprint.get(feature) or "").upper()
+            if value:
+                matrix[:, column(feature)] = _rows_containing(value, upper, starts, n)
+        matrix[:, column("trusted")] = np.fromiter((s in TRUSTED_SOURCES for s in sources), dtype=bool, count=n)
+        return matrix, conflicts
+
+    def score(self, target_model: Optional[str], target_brand: Optional[str], target_fingerprint: dict,
+              titles: List[str], sources: List[str]) -> Tuple[np.ndarray, List[List[str]]]:
+        """Scores (int array) and reasons (one list per candidate), in candidate order."""
+        matrix, conflicts = self.features(target_model, target_brand, target_fingerprint, titles, sources)
+        scores = matrix.astype(np.int64) @ self._weight_vector
+
+        labels = {
+            "model": "Model Match",
+            "brand": "Brand Match",
+            "collection": f"Collection: {(target_fingerprint.get('collection') or '').upper()}",
+            "color": f"Color: {(target_fingerprint.get('color') or '').upper()}",
+            "material": f"Material: {(target_fingerprint.get('material') or '').upper()}",
+            "trusted": "Trusted Source" if self.weights["trusted"] else None,
+        }
+        codes = matrix.astype(np.int64) @ (1 << np.arange(len(FEATURES), dtype=np.int64))
+        by_pattern: Dict[tuple, List[str]] = {}
+        reasons = []
+        for code, conflict in zip(codes.tolist(), conflicts):
+            pattern = by_pattern.get((code, conflict))
+            if pattern is None:
+                pattern = []
+                for bit, feature in enumerate(FEATURES):
+                    if code >> bit & 1:
+                        label = f"Conflict: Series {conflict}" if feature == "collection_conflict" else labels[feature]
+                        if label:
+                            pattern.append(label)
+                by_pattern[(code, conflict)] = pattern
+            reasons.append(list(pattern))
+        return scores, reasons
+
+
+_scorer_instance = None
+
+def get_match_scorer() -> BatchMatchScorer:
+    """Get the singleton batch match scorer."""
+    global _scorer_instance
+    if _scorer_instance is None:
+        _scorer_instance = BatchMatchScorer()
+    return _scorer_instance
@@ -0,0 +1,195 @@
+"""
+Per-candidate cache for Layer-3 LLM match verdicts.
+The same marketplace listings show up for every search of a popular product,
+so (source fingerprint, candidate title, candidate source) pairs recur
+constantly. Each verdict ({classification, confidence, reason}) is cached on
+its own; _llm_score_matches only sends the candidates without one to the
+model. Like the attribute cache, L1 is a bounded in-process LRU and L2 a
+SQLite file in WAL mode shared by every worker on the host.
+
+The price in the prompt is not part of the key: a listing's price moves,
+its verdict against the same source product doesn't.
+
+Environment Variables:
+- MATCH_VERDICT_CACHE_MAX_ENTRIES: Max verdicts held in memory (default: 20000)
+- MATCH_VERDICT_CACHE_TTL: TTL in seconds for disk entries (default: 604800 = 7 days)
+- MATCH_VERDICT_CACHE_PATH: SQLite file for the disk tier (default: backend/match_verdicts.db, empty disables)
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from app.services.attr_cache_service import normalize_title
+from app.services.cache_service import _get_env_int, CACHE_ENABLED
+from app.services.metrics_service import record_cache
+from app.services.shared_cache_service import _BACKEND_DIR
+
+logger = logging.getLogger(__name__)
+
+MATCH_VERDICT_CACHE_MAX_ENTRIES = _get_env_int("MATCH_VERDICT_CACHE_MAX_ENTRIES", 20000)
+MATCH_VERDICT_CACHE_TTL = _get_env_int("MATCH_VERDICT_CACHE_TTL", 604800)
+MATCH_VERDICT_CACHE_PATH = os.environ.get("MATCH_VERDICT_CACHE_PATH", os.path.join(_BACKEND_DIR, "match_verdicts.db"))
+
+# Source attributes that appear in the scoring prompt
+_SOURCE_FIELDS = ("brand", "category", "type", "color", "material", "pattern", "length")
+
+
+def source_fingerprint(source_attrs: dict) -> str:
+    """Stable hash of the source attributes the LLM sees."""
+    fields = {f: normalize_title(source_attrs.get(f) or "") for f in _SOURCE_FIELDS}
+    fields["match_keywords"] = sorted({normalize_title(k) for k in source_attrs.get("match_keywords") or [] if k})
+    return hashlib.md5(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+def make_verdict_key(fingerprint: str, candidate: dict) -> str:
+    """Cache key: source fingerprint + candidate title (as sent, 80 chars) + source."""
+    title = normalize_title((candidate.get("title") or "")[:80])
+    source = normalize_title(candidate.get("source") or "")
+    return hashlib.md5(f"{fingerprint}|{title}|{source}".encode()).hexdigest()
+
+
+class MatchVerdictCache:
+    """Bounded LRU in front of a SQLite-backed store, with batch lookups."""
+
+    def __init__(self, max_entries: int = MATCH_VERDICT_CACHE_MAX_ENTRIES, path: Optional[str] = MATCH_VERDICT_CACHE_PATH,
+                 ttl_seconds: int = MATCH_VERDICT_CACHE_TTL):
+        self.max_entries = max(1, max_entries)
+        self.path = path or None
+        self.ttl_seconds = ttl_seconds
+        self._lru: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+    # ── Disk tier ────────────────────────────────────────────────────────
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        if self._conn is None:
+            try:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS match_verdicts ("
+                    " key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)"
+                )
+                self._conn.commit()
+            except Exception as e:
+                logger.warning(f"[VerdictCache] Disk tier unavailable ({self.path}): {e}")
+                self.path = None
+                self._conn = None
+        return self._conn
+
+    def _disk_get_many(self, keys: List[str]) -> Dict[str, dict]:
+        conn = self._db()
+        if conn is None or not keys:
+            return {}
+        try:
+            rows = conn.execute(
+                f"SELECT key, value FROM match_verdicts WHERE updated_at > ? AND key IN ({','.join('?' * len(keys))})",
+                (time.time() - self.ttl_seconds, *keys)
+            ).fetchall()
+        except Exception as e:
+            logger.warning(f"[VerdictCache] Disk read failed: {e}")
+            return {}
+        return {key: json.loads(value) for key, value in rows}
+
+    def _disk_set_many(self, entries: Dict[str, dict]) -> None:
+        conn = self._db()
+        if conn is None or not entries:
+            return
+        now = time.time()
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO match_verdicts (key, value, updated_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(value), now) for key, value in entries.items()]
+            )
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"[VerdictCache] Disk write failed: {e}")
+
+    def _lru_put(self, key: str, value: dict) -> None:
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    # ── Public API ───────────────────────────────────────────────────────
+    def get_many(self, source_attrs: dict, candidates: List[dict]) -> Dict[int, dict]:
+        """Cached verdicts by candidate index; candidates without one are absent."""
+        if not CACHE_ENABLED or not candidates:
+            return {}
+        fingerprint = source_fingerprint(source_attrs)
+        keys = [make_verdict_key(fingerprint, c) for c in candidates]
+        found: Dict[int, dict] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[i] = dict(self._lru[key])
+            memory_hits = len(found)
+            from_disk = self._disk_get_many([k for i, k in enumerate(keys) if i not in found])
+            for i, key in enumerate(keys):
+                if i not in found and key in from_disk:
+                    self._lru_put(key, from_disk[key])
+                    found[i] = dict(from_disk[key])
+            self._memory_hits += memory_hits
+            self._disk_hits += len(found) - memory_hits
+            self._misses += len(keys) - len(found)
+        for i in range(len(keys)):
+            record_cache("match_verdicts", i in found)
+        return found
+
+    def set_many(self, source_attrs: dict, verdicts: Dict[int, dict], candidates: List[dict]) -> None:
+        """Store fresh verdicts ({candidate index: verdict}) in both tiers."""
+        if not CACHE_ENABLED or not verdicts:
+            return
+        fingerprint = source_fingerprint(source_attrs)
+        entries = {make_verdict_key(fingerprint, candidates[i]): dict(v) for i, v in verdicts.items()}
+        with self._lock:
+            for key, value in entries.items():
+                self._lru_put(key, value)
+            self._disk_set_many(entries)
+
+    def clear(self, include_disk: bool = True) -> int:
+        """Clear memory (and disk) entries. Returns count of memory items cleared."""
+        with self._lock:
+            count = len(self._lru)
+            self._lru.clear()
+            conn = self._db() if include_disk else None
+            if conn is not None:
+                try:
+                    conn.execute("DELETE FROM match_verdicts")
+                    conn.commit()
+                except Exception as e:
+                    logger.warning(f"[VerdictCache] Disk clear failed: {e}")
+        return count
+
+    def stats(self) -> dict:
+        lookups = self._memory_hits + self._disk_hits + self._misses
+        return {
+            "size": len(self._lru),
+            "max_entries": self.max_entries,
+            "memory_hits": self._memory_hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "hit_rate": (self._memory_hits + self._disk_hits) / lookups if lookups else 0
+        }
+
+
+_verdict_cache_instance = None
+
+def get_match_verdict_cache() -> MatchVerdictCache:
+    """Get the singleton match verdict cache."""
+    global _verdict_cache_instance
+    if _verdict_cache_instance is None:
+        _verdict_cache_instance = MatchVerdictCache()
+    return _verdict_cache_instance
@@ -0,0 +1,292 @@
+"""
+In-process metrics registry rendered in the Prometheus text exposition format.
+Counters, gauges and histograms with labels, plus collectors that sample
+live state (thread pools, cache sizes) at scrape time.
+
+Covers: endpoint latency, outbound SerpAPI/OpenAI/HTTP latency and errors,
+per-layer cache hit ratios, DB commit durations, thread pool saturation and
+Layer-3 LLM gate decisions.
+"""
+from typing import Callable, Dict, Iterable, List, Tuple
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Tuple, list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[-1] if state else 0
+
+    def _samples(self):
+        lines = []
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for key, state in items:
+            for i, bound in enumerate(self.buckets):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {state[i]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(round(state[-2], 6))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, fn: Callable[[], None]) -> None:
+        """`fn` runs before every render and typically sets gauges from live state."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in list(self._collectors):
+            try:
+                fn()
+            except Exception as e:
+                logger.warning(f"[Metrics] Collector {getattr(fn, '__name__', fn)} failed: {e}")
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _registry
+
+
+# ── Standard metrics ─────────────────────────────────────────────────────
+HTTP_REQUEST_SECONDS = _registry.histogram(
+    "http_request_duration_seconds", "Endpoint latency", ("method", "route", "status"))
+HTTP_IN_FLIGHT = _registry.gauge(
+    "http_requests_in_flight", "Requests currently being handled")
+OUTBOUND_SECONDS = _registry.histogram(
+    "outbound_request_duration_seconds", "Latency of outbound calls", ("target",))
+OUTBOUND_ERRORS = _registry.counter(
+    "outbound_request_errors_total", "Outbound calls that raised", ("target",))
+CACHE_REQUESTS = _registry.counter(
+    "cache_requests_total", "Cache lookups by layer and result", ("layer", "result"))
+CACHE_HIT_RATIO = _registry.gauge(
+    "cache_hit_ratio", "Hits / lookups per cache layer since start", ("layer",))
+DB_COMMIT_SECONDS = _registry.histogram(
+    "db_commit_duration_seconds", "Duration of DB commits", ("operation",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+STAGE_SECONDS = _registry.histogram(
+    "pipeline_stage_duration_seconds", "Traced pipeline stage latency", ("trace", "stage"))
+THREADPOOL_WORKERS = _registry.gauge(
+    "threadpool_workers", "Configured worker capacity", ("pool",))
+THREADPOOL_BUSY = _registry.gauge(
+    "threadpool_busy", "Workers currently busy", ("pool",))
+THREADPOOL_WAITING = _registry.gauge(
+    "threadpool_waiting", "Tasks queued for a worker", ("pool",))
+LLM_GATE_DECISIONS = _registry.counter(
+    "llm_gate_decisions_total", "Layer-3 LLM gate decisions and audit outcomes", ("decision", "reason"))
+
+
+def observe_call(target: str, fn: Callable, *args, **kwargs):
+    """Call `fn`, timing it as an outbound call to `target` and counting failures."""
+    t0 = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        OUTBOUND_ERRORS.inc(target=target)
+        raise
+    finally:
+        OUTBOUND_SECONDS.observe(time.perf_counter() - t0, target=target)
+
+
+def record_cache(layer: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(layer=layer, result="hit" if hit else "miss")
+
+
+def record_llm_gate(decision: str, reason: str) -> None:
+    LLM_GATE_DECISIONS.inc(decision=decision, reason=reason)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    HTTP_REQUEST_SECONDS.observe(seconds, method=method, route=route, status=status)
+
+
+def observe_db_commit(db, operation: str) -> None:
+    """`db.commit()` with its duration recorded under `operation`."""
+    t0 = time.perf_counter()
+    try:
+        db.commit()
+    finally:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - t0, operation=operation)
+
+
+def observe_trace(summary: dict) -> None:
+    for stage, ms in summary.get("stages_ms", {}).items():
+        STAGE_SECONDS.observe(ms / 1000, trace=summary.get("name", ""), stage=stage)
+
+
+def _collect_cache_ratios() -> None:
+    layers = {key[0] for key in list(CACHE_REQUESTS._values)}
+    for layer in layers:
+        hits = CACHE_REQUESTS.value(layer=layer, result="hit")
+        total = hits + CACHE_REQUESTS.value(layer=layer, result="miss")
+        CACHE_HIT_RATIO.set(hits / total if total else 0, layer=layer)
+
+
+def _collect_stage_executor() -> None:
+    from app.services.stage_executor import stage_pool_stats
+    stats = stage_pool_stats()
+    THREADPOOL_WORKERS.set(stats["workers"], pool="stage_executor")
+    THREADPOOL_BUSY.set(stats["busy"], pool="stage_executor")
+    THREADPOOL_WAITING.set(stats["waiting"], pool="stage_executor")
+
+
+def _collect_io_pool() -> None:
+    from app.services.io_pool import io_pool_stats
+    stats = io_pool_stats()
+    THREADPOOL_WORKERS.set(stats["workers"], pool="io")
+    THREADPOOL_BUSY.set(stats["busy"], pool="io")
+    THREADPOOL_WAITING.set(stats["waiting"], pool="io")
+
+
+def _collect_fanout_pool() -> None:
+    from app.services.io_pool import fanout_pool_stats
+    stats = fanout_pool_stats()
+    THREADPOOL_WORKERS.set(stats["workers"], pool="search_fanout")
+    THREADPOOL_BUSY.set(stats["busy"], pool="search_fanout")
+    THREADPOOL_WAITING.set(stats["waiting"], pool="search_fanout")
+
+
+_registry.add_collector(_collect_cache_ratios)
+_registry.add_collector(_collect_stage_executor)
+_registry.add_collector(_collect_io_pool)
+_registry.add_collector(_collect_fanout_pool)
@@ -0,0 +1,145 @@
+"""
+Compiled feature extraction for search queries and candidate titles.
+Brand, series, color and material detection used to loop over the registry
+and keyword tables with one substring check or re.search per entry, for the
+query and again for every candidate title. Here each table is compiled once
+into a single alternation, scanned with a lookahead so overlapping entries
+are all seen, and the earliest table entry found wins — the same answer the
+old loops gave, in one C-level scan per table.
+"""
+import re
+from typing import Dict, List, Optional
+
+from app.services.registry import BRANDS
+
+# Watch/bag series names (expand as needed); earlier entries win
+KNOWN_SERIES = [
+    "LEXINGTON", "BRADSHAW", "RUNWAY", "DARCI", "SOFIE", "PYPER", "PARKER", "SLIM", "RITZ",
+    "GEN 5", "GEN 6", "VANDERBILT", "EVEREST", "LAYTON", "TIBBY", "COREY", "EMERY", "SAGE", "LENNOX"
+]
+
+# Substring keyword -> fingerprint value; earlier entries win ("rose gold" before "gold")
+COLOR_KEYWORDS = [("rose gold", "ROSE GOLD"), ("gold", "GOLD"), ("silver", "SILVER")]
+MATERIAL_KEYWORDS = [("stainless", "STAINLESS")]
+
+# Digit-bearing tokens that are sizes/packs, not model numbers
+MODEL_STOPWORDS = frozenset([
+    "SIZE", "PACK", "WITH", "BLACK", "WHITE", "BLUE", "GOLD", "WOMEN", "MENS", "KIDS", "ROSE",
+    "WATCH", "DARCI", "1PC", "2PC", "100ML", "50ML", "500G", "1KG"
+])
+
+_NON_ALNUM_RE = re.compile(r"[^a-zA-Z0-9]")
+_DIGIT_TOKEN_RE = re.compile(r"\S*[0-9]\S*")  # ASCII digits only, as left after cleaning
+
+
+def _priority_scanner(terms: List[str], boundary: bool = False):
+    """Lookahead alternation over `terms`, tried in list order at every position."""
+    alternation = "|".join(re.escape(t) for t in terms) or "(?!)"
+    if boundary:
+        # Same as (?:^|\W)term(?:$|\W), without consuming the neighbours
+        return re.compile(r"(?<!\w)(?=(" + alternation + r")(?!\w))")
+    return re.compile(r"(?=(" + alternation + r"))")
+
+
+def _first_by_priority(scanner, text: str, priority: Dict[str, int]) -> Optional[str]:
+    """Highest-priority term occurring anywhere in `text`."""
+    best = None
+    for m in scanner.finditer(text):
+        term = m.group(1)
+        if best is None or priority[term] < priority[best]:
+            best = term
+            if priority[best] == 0:
+                break
+    return best
+
+
+class QueryAnalyzer:
+    """Built once from the brand registry and keyword tables; analyze() is thread-safe."""
+
+    def __init__(self, brands: dict = None, series: List[str] = None,
+                 colors: List[tuple] = None, materials: List[tuple] = None):
+        brands = BRANDS if brands is None else brands
+        series = KNOWN_SERIES if series is None else series
+        colors = COLOR_KEYWORDS if colors is None else colors
+        materials = MATERIAL_KEYWORDS if materials is None else materials
+
+        # Brand: registry id as a substring (first id in registry order wins)
+        self._brand_ids = {b_id.lower(): (i, data["display_name"]) for i, (b_id, data) in enumerate(brands.items())}
+        self._brand_priority = {b_id: i for b_id, (i, _) in self._brand_ids.items()}
+        self._brand_re = _priority_scanner(list(self._brand_ids))
+        # Brand search: any display name as a substring
+        self._brand_name_re = re.compile("|".join(re.escape(d["display_name"].lower()) for d in brands.values()) or "(?!)")
+
+        self._series_priority = {s: i for i, s in enumerate(series)}
+        self._series_re = _priority_scanner(series, boundary=True)
+        self._color_priority = {k: i for i, (k, _) in enumerate(colors)}
+        self._color_values = dict(colors)
+        self._color_re = _priority_scanner([k for k, _ in colors])
+        self._material_priority = {k: i for i, (k, _) in enumerate(materials)}
+        self._material_values = dict(materials)
+        self._material_re = _priority_scanner([k for k, _ in materials])
+
+    @staticmethod
+    def model_numbers(text: str) -> List[str]:
+        """
+        Alphanumeric model codes (MK6475, WH-1000XM4 -> WH1000XM4, iPhone15), upper-cased.
+        Only digit-bearing tokens qualify; a trailing India 'I' after a digit is dropped (MK7548I -> MK7548).
+        """
+        models = []
+        for token in _DIGIT_TOKEN_RE.findall(text):
+            t_clean = _NON_ALNUM_RE.sub("", token).upper()
+            if len(t_clean) <= 2:
+                continue
+            if t_clean.endswith("I") and len(t_clean) > 3 and t_clean[-2].isdigit():
+                t_clean = t_clean[:-1]
+            if t_clean not in MODEL_STOPWORDS:
+                models.append(t_clean)
+        return models
+
+    def brand(self, text: str) -> Optional[str]:
+        """Display name of the first registry brand whose id appears in `text`."""
+        b_id = _first_by_priority(self._brand_re, text.lower(), self._brand_priority)
+        return self._brand_ids[b_id][1] if b_id else None
+
+    def series(self, text: str) -> Optional[str]:
+        """First known series name appearing as a whole word (e.g. 'Michael Kors Lexington')."""
+        if not text:
+            return None
+        return _first_by_priority(self._series_re, text.upper(), self._series_priority)
+
+    def find_series(self, text: str) -> List[tuple]:
+        """(position, series, priority) for every whole-word series in upper-cased `text`."""
+        return [(m.start(), m.group(1), self._series_priority[m.group(1)]) for m in self._series_re.finditer(text)]
+
+    def analyze(self, text: str) -> dict:
+        """
+        All query features in one pass:
+        models, brand, is_brand_search, collection, color, material,
+        plus the upper-cased and alphanumeric-only forms used for title matching.
+        """
+        text = text or ""
+        lower = text.lower()
+        upper = text.upper()
+        b_id = _first_by_priority(self._brand_re, lower, self._brand_priority)
+        color = _first_by_priority(self._color_re, lower, self._color_priority)
+        material = _first_by_priority(self._material_re, lower, self._material_priority)
+        return {
+            "models": self.model_numbers(text),
+            "brand": self._brand_ids[b_id][1] if b_id else None,
+            "is_brand_search": bool(self._brand_name_re.search(lower)) or len(text.split()) < 2,
+            "collection": _first_by_priority(self._series_re, upper, self._series_priority) if text else None,
+            "color": self._color_values[color] if color else None,
+            "material": self._material_values[material] if material else None,
+            "upper": upper,
+            "clean": _NON_ALNUM_RE.sub("", upper),
+        }
+
+
+_analyzer_instance = None
+
+def get_query_analyzer() -> QueryAnalyzer:
+    """Get the singleton query analyzer."""
+    global _analyzer_instance
+    if _analyzer_instance is None:
+        _analyzer_instance = QueryAnalyzer()
+    return _analyzer_instance
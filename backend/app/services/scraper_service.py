@@ -7,9 +7,16 @@ from serpapi import GoogleSearch
 import asyncio
 import re
 import logging
+from app.services.tracing_service import record_serpapi
+from app.services.metrics_service import observe_call
+from app.services.io_pool import run_blocking
+from app.services.cache_service import get_cached_local, cache_local
 
 logger = logging.getLogger(__name__)
 
+# Google Shopping results are always fetched for this location, whatever city the client sends
+SERPAPI_LOCATION = "Mumbai, Maharashtra, India"
+
 class RealScraperService:
     def __init__(self):
         self.serpapi_key = os.environ.get("SERPAPI_API_KEY")
@@ -17,6 +24,10 @@ class RealScraperService:
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         ]
 
+    def online_location(self, location: str = None) -> str:
+        """Location that actually reaches SerpAPI for online results (used for cache keys)."""
+        return SERPAPI_LOCATION
+
     def search_serpapi(self, query: str):
         """
         Uses SerpApi to search Google Shopping.
@@ -29,7 +40,7 @@ class RealScraperService:
                 "q": query,
                 "gl": "in",
                 "hl": "en",
-                "location": "Mumbai, Maharashtra, India",
+                "location": self.online_location(),
                 "google_domain": "google.co.in",
                 "api_key": self.serpapi_key,
                 "num": 100,
@@ -37,7 +48,8 @@ class RealScraperService:
             }
             
             search = GoogleSearch(params)
-            results = search.get_dict()
+            results = observe_call("serpapi", search.get_dict)
+            record_serpapi()
             shopping_results = results.get("shopping_results", [])
             
             cleaned_results = []
@@ -177,6 +189,9 @@ class RealScraperService:
         """
         Uses SerpApi to search Local Google Shopping (tbm=lcl).
         """
+        cached = get_cached_local(query, location)
+        if cached is not None:
+            return cached
         logger.info(f"Searching Local Stores for: {query} in {location}")
         try:
             params = {
@@ -190,7 +205,8 @@ class RealScraperService:
             }
             
             search = GoogleSearch(params)
-            results = search.get_dict()
+            results = observe_call("serpapi", search.get_dict)
+            record_serpapi()
             local_results = results.get("local_results", [])
             
             cleaned_results = []
@@ -207,6 +223,7 @@ class RealScraperService:
                     "image": item.get("thumbnail"), 
                     "delivery": "In Store"
                 })
+            cache_local(query, location, cleaned_results)
             return cleaned_results
         except Exception as e:
             logger.error(f"SerpApi Local Failed: {e}")
@@ -234,7 +251,8 @@ class RealScraperService:
             }
             
             search = GoogleSearch(params)
-            results = search.get_dict()
+            results = observe_call("serpapi", search.get_dict)
+            record_serpapi()
             
             organic_results = results.get("organic_results", [])
             logger.info(f"Found {len(organic_results)} Google results for Instagram shops")
@@ -313,7 +331,8 @@ class RealScraperService:
             }
             
             search = GoogleSearch(params)
-            results = search.get_dict()
+            results = observe_call("serpapi", search.get_dict)
+            record_serpapi()
             organic_results = results.get("organic_results", [])
             
             cleaned_results = []
@@ -378,6 +397,10 @@ class RealScraperService:
             "local": [] 
         }
 
+    async def search_products_async(self, query: str):
+        """search_products for async callers; blocking I/O runs on the shared I/O pool."""
+        return await run_blocking(self.search_products, query)
+
     def fetch_direct_shopify(self, domain_url: str) -> List[Dict]:
         """
         Fetches products directly from a Shopify JSON feed.
@@ -390,7 +413,7 @@ class RealScraperService:
         
         items = []
         try:
-            resp = requests.get(products_url, timeout=10)
+            resp = observe_call("http", requests.get, products_url, timeout=10)
             if resp.status_code == 200:
                 data = resp.json()
                 product_list = data.get("products", [])
@@ -544,7 +567,7 @@ class RealScraperService:
             headers = {
                 "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
             }
-            resp = requests.get(url, headers=headers, timeout=5)
+            resp = observe_call("http", requests.get, url, headers=headers, timeout=5)
             if resp.status_code != 200:
                 logger.warning(f"Failed to fetch viewer page: {resp.status_code}")
                 return url
@@ -572,3 +595,7 @@ class RealScraperService:
         except Exception as e:
             logger.error(f"Error resolving link: {e}")
             return url
+
+    async def resolve_viewer_link_async(self, url: str) -> str:
+        """resolve_viewer_link for async callers."""
+        return await run_blocking(self.resolve_viewer_link, url)
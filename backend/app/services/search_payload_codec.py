@@ -0,0 +1,78 @@
+"""
+Compact binary form for cached smart search responses.
+The same item dict appears in `online` and again in one of the match tiers,
+each carrying long Google URLs and immersive tokens. Packing stores every
+distinct item once in a pool, keeps each tier as a list of pool indices,
+then marshals and zlib-compresses the result. Unpacking rebuilds the
+original response (tiers share item dicts, as they did before packing).
+"""
+from typing import Any, Dict, List
+import marshal
+import zlib
+
+_MAGIC = b"SP1"
+_ZLIB_LEVEL = 6
+
+
+def _identity(item: dict) -> tuple:
+    return (str(item.get("id")), item.get("url") or item.get("link"))
+
+
+def pack_search(response: Dict[str, Any]) -> bytes:
+    """Dedupe items across result tiers and return a compressed blob. Raises ValueError on non-plain data."""
+    results = response.get("results")
+    packs_results = isinstance(results, dict)
+    if not packs_results:
+        results = {}
+    pool: List[dict] = []
+    by_object: Dict[int, int] = {}
+    by_identity: Dict[tuple, List[int]] = {}
+
+    def intern(item: dict) -> int:
+        idx = by_object.get(id(item))
+        if idx is not None:
+            return idx
+        key = _identity(item)
+        for candidate in by_identity.get(key, ()):
+            if pool[candidate] == item:
+                by_object[id(item)] = candidate
+                return candidate
+        pool.append(item)
+        idx = len(pool) - 1
+        by_identity.setdefault(key, []).append(idx)
+        by_object[id(item)] = idx
+        return idx
+
+    tiers, extra = {}, {}
+    for name, value in results.items():
+        if isinstance(value, list) and all(isinstance(i, dict) for i in value):
+            tiers[name] = [intern(i) for i in value]
+        else:
+            extra[name] = value
+
+    packed = {
+        "response": {k: v for k, v in response.items() if k != "results" or not packs_results},
+        "keys": list(response),
+        "order": list(results),
+        "items": pool,
+        "tiers": tiers,
+        "extra": extra,
+    }
+    return _MAGIC + zlib.compress(marshal.dumps(packed), _ZLIB_LEVEL)
+
+
+def unpack_search(blob: bytes) -> Dict[str, Any]:
+    if not blob.startswith(_MAGIC):
+        raise ValueError("Not a packed search payload")
+    packed = marshal.loads(zlib.decompress(blob[len(_MAGIC):]))
+    rest, pool, tiers, extra = packed["response"], packed["items"], packed["tiers"], packed["extra"]
+    response = {}
+    for key in packed["keys"]:
+        if key == "results" and key not in rest:
+            response[key] = {
+                name: [pool[i] for i in tiers[name]] if name in tiers else extra[name]
+                for name in packed["order"]
+            }
+        else:
+            response[key] = rest[key]
+    return response
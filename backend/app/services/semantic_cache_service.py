@@ -0,0 +1,294 @@
+"""
+Semantic tier behind the exact-key search cache.
+Near-duplicate phrasings ("michael kors lexington watch" / "lexington
+michael kors") miss the exact key but want the same results. Every cached
+query's embedding is kept in an in-memory NumPy matrix; on an exact miss the
+new query is embedded and compared against it (one matrix-vector product),
+and the closest cached query above the similarity threshold is served from
+the exact cache with `served_from: "semantic_cache"`.
+
+The index only stores pointers (query, location) into CacheService, so
+results still expire with CACHE_TTL_SEARCH and are shared across workers.
+Embeddings rate "kurta for women" and "kurta for men" as near-identical, so
+a neighbour must also agree exactly on the attributes that change the
+product: numbers (iphone 14 / 15, 250ml / 500ml), audience (men / women /
+kids), colour, material, brand and series.
+
+Environment Variables:
+- SEMANTIC_CACHE_ENABLED: Set to 'false' to disable the semantic tier (default: true)
+- SEMANTIC_CACHE_THRESHOLD: Min cosine similarity, in percent, to serve a neighbour (default: 88)
+- SEMANTIC_CACHE_MAX_ENTRIES: Max indexed queries per process (default: 5000)
+- SEMANTIC_CACHE_EMBEDDER: 'openai' (text-embedding-3-small) or 'hashing' (local, offline).
+  Defaults to 'openai' when OPENAI_API_KEY is set, else 'hashing'.
+"""
+from collections import OrderedDict
+from typing import Callable, Optional
+import hashlib
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+
+from app.services.cache_service import _get_env_int, _get_env_bool, CACHE_ENABLED, get_cached_search
+from app.services.metrics_service import record_cache
+from app.services.query_analyzer_service import get_query_analyzer
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_ENABLED = _get_env_bool("SEMANTIC_CACHE_ENABLED", True)
+SEMANTIC_CACHE_THRESHOLD = _get_env_int("SEMANTIC_CACHE_THRESHOLD", 88) / 100
+SEMANTIC_CACHE_MAX_ENTRIES = _get_env_int("SEMANTIC_CACHE_MAX_ENTRIES", 5000)
+SEMANTIC_CACHE_EMBEDDER = os.environ.get(
+    "SEMANTIC_CACHE_EMBEDDER", "openai" if os.environ.get("OPENAI_API_KEY") else "hashing").lower()
+
+HASHING_DIMENSIONS = 512
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+# Whole-word audience and colour terms; the analyzer's colour table only covers metals
+AUDIENCE_WORDS = {
+    "men": "MEN", "mens": "MEN", "man": "MEN", "male": "MEN", "gents": "MEN",
+    "women": "WOMEN", "womens": "WOMEN", "woman": "WOMEN", "female": "WOMEN", "ladies": "WOMEN",
+    "boys": "BOYS", "boy": "BOYS", "girls": "GIRLS", "girl": "GIRLS",
+    "kids": "KIDS", "kid": "KIDS", "children": "KIDS", "baby": "KIDS", "infant": "KIDS",
+    "unisex": "UNISEX",
+}
+COLOR_WORDS = frozenset([
+    "black", "white", "red", "blue", "navy", "green", "olive", "yellow", "orange", "pink", "purple",
+    "violet", "maroon", "brown", "tan", "beige", "cream", "grey", "gray", "teal", "peach", "mustard",
+    "magenta", "lavender", "khaki", "multicolor", "multicolour",
+])
+
+
+def _normalize(query: str) -> str:
+    return re.sub(r"\s+", " ", str(query).lower()).strip()
+
+
+def _numbers(query: str) -> frozenset:
+    """Model numbers, sizes and capacities; neighbours must agree on all of them."""
+    return frozenset(_NUMBER_RE.findall(query))
+
+
+_alias_patterns = None
+
+def _brand_aliases() -> list:
+    """(pattern, display name) pairs so "h&m" and "h and m" embed identically."""
+    global _alias_patterns
+    if _alias_patterns is None:
+        from app.services.registry import BRANDS
+        _alias_patterns = [
+            (re.compile(rf"\b{re.escape(alias.lower())}\b"), brand["display_name"].lower())
+            for brand in BRANDS.values() for alias in brand.get("aliases", [])
+        ]
+    return _alias_patterns
+
+
+def _signature(query: str) -> tuple:
+    """Attributes a neighbour must match exactly: numbers, audience, colours, material, brands, series."""
+    features = get_query_analyzer().analyze(query)
+    tokens = _TOKEN_RE.findall(query)
+    brands = frozenset(name for pattern, name in _brand_aliases() if pattern.search(query))
+    return (
+        _numbers(query),
+        frozenset(AUDIENCE_WORDS[t] for t in tokens if t in AUDIENCE_WORDS),
+        frozenset(t.replace("gray", "grey") for t in tokens if t in COLOR_WORDS) | {features["color"]},
+        features["material"],
+        brands,
+        features["collection"],
+    )
+
+
+def hashing_embedding(query: str, dimensions: int = HASHING_DIMENSIONS) -> np.ndarray:
+    """Signed feature hashing of words and character trigrams; word order doesn't matter."""
+    text = _normalize(query)
+    for pattern, name in _brand_aliases():
+        text = pattern.sub(name, text)
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for token in _TOKEN_RE.findall(text):
+        padded = f"#{token}#"
+        features = [f"w:{token}"] + [f"g:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        for feature in features:
+            h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+            vector[h % dimensions] += 1.0 if h >> 63 else -1.0
+    return vector
+
+
+def openai_embedding(query: str) -> Optional[np.ndarray]:
+    embedding = _openai_matcher().generate_embedding(_normalize(query))
+    return np.asarray(embedding, dtype=np.float32) if embedding else None
+
+
+_matcher = None
+
+def _openai_matcher():
+    global _matcher
+    if _matcher is None:
+        from app.services.smart_match_service import SmartMatchService
+        _matcher = SmartMatchService()
+    return _matcher
+
+
+class SemanticQueryCache:
+    """Cosine nearest-neighbour index over cached queries, one row per (query, location)."""
+
+    def __init__(self, embed: Callable[[str], Optional[np.ndarray]] = None,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        if embed is None:
+            embed = openai_embedding if SEMANTIC_CACHE_EMBEDDER == "openai" else hashing_embedding
+        self.embed_fn = embed
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None   # (capacity, dim), L2-normalized rows
+        self._live = np.zeros(0, dtype=bool)
+        self._rows: "OrderedDict[tuple, int]" = OrderedDict()  # (query, location) -> row, oldest first
+        self._meta: dict = {}                                  # row -> (query, location, signature)
+        self._free: list = []
+        self._embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()  # recent query embeddings
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        text = _normalize(query)
+        with self._lock:
+            cached = self._embeddings.get(text)
+        if cached is not None:
+            return cached
+        try:
+            vector = self.embed_fn(text)
+        except Exception as e:
+            logger.warning(f"[SemanticCache] Embedding failed: {e}")
+            return None
+        if vector is None:
+            return None
+        norm = float(np.linalg.norm(vector))
+        if not norm:
+            return None
+        vector = (vector / norm).astype(np.float32)
+        with self._lock:
+            self._embeddings[text] = vector
+            while len(self._embeddings) > 256:
+                self._embeddings.popitem(last=False)
+        return vector
+
+    def _drop(self, key: tuple) -> None:
+        """Caller holds the lock."""
+        row = self._rows.pop(key, None)
+        if row is not None:
+            self._live[row] = False
+            self._meta.pop(row, None)
+            self._free.append(row)
+
+    def add(self, query: str, location: str) -> None:
+        """Index a query whose results were just stored in the exact cache."""
+        if not (CACHE_ENABLED and SEMANTIC_CACHE_ENABLED):
+            return
+        vector = self._embed(query)
+        if vector is None:
+            return
+        key = (_normalize(query), (location or "").lower())
+        with self._lock:
+            self._drop(key)
+            while len(self._rows) >= self.max_entries:
+                self._drop(next(iter(self._rows)))
+            if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                self._matrix = np.zeros((64, vector.shape[0]), dtype=np.float32)
+                self._live = np.zeros(64, dtype=bool)
+                self._rows.clear()
+                self._meta.clear()
+                self._free = list(range(63, -1, -1))
+            if not self._free:
+                capacity = self._matrix.shape[0]
+                self._matrix = np.vstack([self._matrix, np.zeros_like(self._matrix)])
+                self._live = np.concatenate([self._live, np.zeros(capacity, dtype=bool)])
+                self._free = list(range(2 * capacity - 1, capacity - 1, -1))
+            row = self._free.pop()
+            self._matrix[row] = vector
+            self._live[row] = True
+            self._rows[key] = row
+            self._meta[row] = (key[0], key[1], _signature(key[0]))
+
+    def lookup(self, query: str, location: str) -> Optional[dict]:
+        """Cached response of the most similar indexed query, marked with served_from/semantic_match."""
+        if not (CACHE_ENABLED and SEMANTIC_CACHE_ENABLED):
+            return None
+        with self._lock:
+            empty = not self._rows
+        if empty:
+            return None
+        vector = self._embed(query)
+        if vector is None:
+            return None
+        location = (location or "").lower()
+        signature = _signature(_normalize(query))
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                return None
+            scores = self._matrix @ vector
+            scores[~self._live] = -1.0
+            match = None
+            for row in np.argsort(scores)[::-1][:8]:
+                score = float(scores[row])
+                if score < self.threshold:
+                    break
+                cached_query, cached_location, cached_signature = self._meta[int(row)]
+                if cached_location == location and cached_signature == signature:
+                    match = (cached_query, cached_location, score)
+                    break
+        if match is None:
+            self._misses += 1
+            record_cache("semantic", False)
+            return None
+
+        cached_query, cached_location, score = match
+        result = get_cached_search(cached_query, cached_location)
+        if result is None:
+            # Expired or cleared in the exact cache; forget the pointer
+            with self._lock:
+                self._drop((cached_query, cached_location))
+                self._stale += 1
+                self._misses += 1
+            record_cache("semantic", False)
+            return None
+        self._hits += 1
+        record_cache("semantic", True)
+        logger.info(f"[SemanticCache] '{query}' served from '{cached_query}' (similarity={score:.3f})")
+        return {**result, "served_from": "semantic_cache",
+                "semantic_match": {"query": cached_query, "similarity": round(score, 4)}}
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._rows)
+            self._matrix = None
+            self._live = np.zeros(0, dtype=bool)
+            self._rows.clear()
+            self._meta.clear()
+            self._free = []
+        return count
+
+    def stats(self) -> dict:
+        lookups = self._hits + self._misses
+        return {
+            "enabled": SEMANTIC_CACHE_ENABLED,
+            "embedder": getattr(self.embed_fn, "__name__", str(self.embed_fn)),
+            "size": len(self._rows),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self._hits,
+            "misses": self._misses,
+            "stale_pointers": self._stale,
+            "hit_rate": self._hits / lookups if lookups else 0
+        }
+
+
+_semantic_cache_instance = None
+
+def get_semantic_cache() -> SemanticQueryCache:
+    """Get the singleton semantic query cache."""
+    global _semantic_cache_instance
+    if _semantic_cache_instance is None:
+        _semantic_cache_instance = SemanticQueryCache()
+    return _semantic_cache_instance
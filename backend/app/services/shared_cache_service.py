@@ -0,0 +1,191 @@
+"""
+Host-wide cache tier shared by all uvicorn workers.
+A SQLite file in WAL mode: readers never block each other or the writer, and
+every worker process on the host sees the same entries, so a result fetched
+by one worker is a hit for all of them (no per-worker warm-up, no duplicate
+SerpAPI calls). Sits behind each process's small in-memory L1.
+
+Environment Variables:
+- CACHE_SHARED_PATH: SQLite file for the shared tier (default: backend/shared_cache.db, empty disables)
+"""
+from typing import Any, Optional
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Host-wide SQLite files live next to the app package rather than in the cwd, so every
+# worker opens the same file (also used by the attribute and match verdict caches)
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_SHARED_PATH = os.environ.get("CACHE_SHARED_PATH", os.path.join(_BACKEND_DIR, "shared_cache.db"))
+
+
+_RAW_BYTES = b"\x00"  # marks values that were already bytes (codec output); JSON never starts with NUL
+
+
+def encode_value(value: Any) -> bytes:
+    if isinstance(value, (bytes, bytearray)):
+        return _RAW_BYTES + bytes(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def decode_value(blob: bytes) -> Any:
+    if blob[:1] == _RAW_BYTES:
+        return bytes(blob[1:])
+    return json.loads(blob)
+
+
+class SharedCacheStore:
+    """Key -> (value, expires_at) in SQLite/WAL; one connection per thread."""
+
+    def __init__(self, path: Optional[str] = CACHE_SHARED_PATH):
+        self.path = path or None
+        self._local = threading.local()
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+        if self.path:
+            self._conn()  # create schema / surface a bad path at startup
+
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS shared_cache ("
+                    " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._local.conn = conn
+            except Exception as e:
+                logger.warning(f"[SharedCache] Unavailable ({self.path}): {e}")
+                self.path = None
+                return None
+        return conn
+
+    def get(self, key: str) -> Optional[tuple]:
+        """(value, expires_at) if present and unexpired."""
+        conn = self._conn()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM shared_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        except Exception as e:
+            self._errors += 1
+            logger.warning(f"[SharedCache] Read failed: {e}")
+            return None
+        if row is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return decode_value(row[0]), row[1]
+
+    def expires_at(self, key: str) -> Optional[float]:
+        """Expiry timestamp of a live entry, without reading its value."""
+        conn = self._conn()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT expires_at FROM shared_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        except Exception as e:
+            logger.warning(f"[SharedCache] Read failed: {e}")
+            return None
+        return row[0] if row else None
+
+    def try_lease(self, name: str, owner: str, ttl_seconds: int) -> bool:
+        """
+        Take or renew a host-wide lease (e.g. so one worker runs a background job).
+        Succeeds if the lease is free, expired or already held by `owner`.
+        Always succeeds when the shared tier is disabled (single process).
+        """
+        conn = self._conn()
+        if conn is None:
+            return True
+        now = time.time()
+        value = encode_value(owner)
+        try:
+            cursor = conn.execute(
+                "INSERT INTO shared_cache (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+                "WHERE shared_cache.expires_at <= ? OR shared_cache.value = excluded.value",
+                (f"lease:{name}", value, now + ttl_seconds, now)
+            )
+            return cursor.rowcount > 0
+        except Exception as e:
+            logger.warning(f"[SharedCache] Lease {name} failed: {e}")
+            return False
+
+    def set(self, key: str, value: Any, ttl_seconds: int) -> None:
+        conn = self._conn()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO shared_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, encode_value(value), time.time() + ttl_seconds)
+            )
+        except Exception as e:
+            self._errors += 1
+            logger.warning(f"[SharedCache] Write failed: {e}")
+
+    def delete(self, key: str) -> bool:
+        conn = self._conn()
+        if conn is None:
+            return False
+        try:
+            return conn.execute("DELETE FROM shared_cache WHERE key = ?", (key,)).rowcount > 0
+        except Exception as e:
+            logger.warning(f"[SharedCache] Delete failed: {e}")
+            return False
+
+    def clear(self) -> int:
+        conn = self._conn()
+        if conn is None:
+            return 0
+        try:
+            return conn.execute("DELETE FROM shared_cache").rowcount
+        except Exception as e:
+            logger.warning(f"[SharedCache] Clear failed: {e}")
+            return 0
+
+    def purge_expired(self) -> int:
+        conn = self._conn()
+        if conn is None:
+            return 0
+        try:
+            return conn.execute("DELETE FROM shared_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+        except Exception as e:
+            logger.warning(f"[SharedCache] Purge failed: {e}")
+            return 0
+
+    def stats(self) -> dict:
+        size = 0
+        conn = self._conn()
+        if conn is not None:
+            try:
+                size = conn.execute("SELECT COUNT(*) FROM shared_cache").fetchone()[0]
+            except Exception:
+                pass
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self.path is not None,
+            "path": self.path,
+            "size": size,
+            "hits": self._hits,
+            "misses": self._misses,
+            "errors": self._errors,
+            "hit_rate": self._hits / lookups if lookups else 0
+        }
@@ -5,6 +5,8 @@ import logging
 import numpy as np
 from openai import OpenAI
 from typing import Dict, List, Any, Optional
+from app.services.tracing_service import record_llm
+from app.services.metrics_service import observe_call
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +42,7 @@ class SmartMatchService:
             return {}
 
         try:
-            response = client.chat.completions.create(
+            response = observe_call("openai", client.chat.completions.create,
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -56,6 +58,7 @@ class SmartMatchService:
                 temperature=0,
                 max_tokens=150
             )
+            record_llm("gpt-4o-mini", response)
             return json.loads(response.choices[0].message.content)
         except Exception as e:
             logger.error(f"Attribute Extraction Failed for '{title}': {e}")
@@ -71,10 +74,11 @@ class SmartMatchService:
             return []
 
         try:
-            response = client.embeddings.create(
+            response = observe_call("openai", client.embeddings.create,
                 model="text-embedding-3-small",
                 input=text
             )
+            record_llm("text-embedding-3-small", response)
             return response.data[0].embedding
         except Exception as e:
             logger.error(f"Embedding Generation Failed: {e}")
@@ -160,7 +164,7 @@ class SmartMatchService:
             return {"score": 0, "reason": "Missing inputs or client"}
 
         try:
-            response = client.chat.completions.create(
+            response = observe_call("openai", client.chat.completions.create,
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -189,6 +193,7 @@ class SmartMatchService:
                 response_format={"type": "json_object"},
                 max_tokens=150
             )
+            record_llm("gpt-4o-mini", response, vision=True)
             return json.loads(response.choices[0].message.content)
         except Exception as e:
             logger.error(f"Visual Verification Failed: {e}")
@@ -4,15 +4,27 @@ import json
 import logging
 import os
 import re
+from concurrent.futures import as_completed
 from app.services.scraper_service import RealScraperService
 from app.services.url_scraper_service import URLScraperService
 from app.services.trust_service import TrustService
 from app.services.registry import BRANDS, STORES
 from app.services.cache_service import get_cached_search, cache_search, get_cached_brand, cache_brand
+from app.services.semantic_cache_service import get_semantic_cache
+from app.services.query_analyzer_service import get_query_analyzer
+from app.services.match_scoring_service import get_match_scorer
+from app.services.llm_gate_service import get_llm_gate
+from app.services.match_verdict_cache_service import get_match_verdict_cache
 from app.services.smart_match_service import SmartMatchService
+from app.services.io_pool import run_blocking, submit_fanout
+from app.services.tracing_service import traced, trace_span, current_trace, record_llm
+from app.services.metrics_service import observe_call
 
 logger = logging.getLogger(__name__)
 
+# Hosts whose links carry an ASIN (amazon.in, amazon.com, amzn.in, ...)
+_AMAZON_HOST = re.compile(r'(?:^|\.)(?:amazon|amzn)\.')
+
 class SmartSearchService:
     def __init__(self):
         try:
@@ -30,6 +42,10 @@ class SmartSearchService:
         self.url_service = URLScraperService()
         self.trust_service = TrustService()
         self.matcher = SmartMatchService()
+        self.analyzer = get_query_analyzer()
+        self.match_scorer = get_match_scorer()
+        self.llm_gate = get_llm_gate()
+        self.verdict_cache = get_match_verdict_cache()
 
     def _get_client(self):
         """Lazy load client"""
@@ -81,7 +97,7 @@ class SmartSearchService:
         if not client:
             return {"category": "General", "optimized_term": query, "needs_local": True}
         try:
-            response = client.chat.completions.create(
+            response = observe_call("openai", client.chat.completions.create,
                 model="gpt-3.5-turbo", # Using 3.5 for speed/cost, can upgrade to gpt-4
                 messages=[
                     {"role": "system", "content": "You are a Shopping Assistant. Analyze the query. Return JSON with: 'category' (e.g., Electronics, Fashion), 'optimized_term' (better search keywords), 'needs_local' (boolean, true if user might want to buy offline e.g. appliances, false for digital goods)."},
@@ -89,6 +105,7 @@ class SmartSearchService:
                 ],
                 response_format={"type": "json_object"}
             )
+            record_llm("gpt-3.5-turbo", response)
             return json.loads(response.choices[0].message.content)
         except Exception as e:
             logger.error(f"LLM Analysis Failed: {e}")
@@ -298,7 +315,7 @@ class SmartSearchService:
         }
         
         try:
-            response = client.chat.completions.create(
+            response = observe_call("openai", client.chat.completions.create,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": """You are a Pricing Expert. Analyze the provided product data.
@@ -319,6 +336,7 @@ class SmartSearchService:
                 ],
                 response_format={"type": "json_object"}
             )
+            record_llm("gpt-3.5-turbo", response)
             return json.loads(response.choices[0].message.content)
         except Exception as e:
             logger.error(f"LLM Synthesis Failed: {e}")
@@ -339,18 +357,30 @@ class SmartSearchService:
             VARIANT — same style but different color/size/material
             SIMILAR — same category but different product
 
+        Verdicts are cached per candidate (match_verdict_cache_service); only
+        candidates without one are sent, numbered within the smaller prompt.
+
         Returns: {candidate_index: {classification, confidence, reason}}
         """
-        client = self._get_client()
-        if not client or not candidates:
+        candidates = candidates[:20]
+        if not candidates:
             return {}
+        cached = self.verdict_cache.get_many(source_attrs, candidates)
+        pending = [i for i in range(len(candidates)) if i not in cached]
+        if not pending:
+            logger.info(f"[LLMScore] All {len(candidates)} verdicts cached")
+            return cached
+        client = self._get_client()
+        if not client:
+            return cached
 
         candidate_lines = []
-        for i, c in enumerate(candidates[:20]):
+        for n, i in enumerate(pending):
+            c = candidates[i]
             title = (c.get("title") or "")[:80]
             source = c.get("source", "")
             price = c.get("price", 0)
-            candidate_lines.append(f"{i+1}. [{source}] {title} (₹{price})")
+            candidate_lines.append(f"{n+1}. [{source}] {title} (₹{price})")
 
         source_desc = (
             f"Brand: {source_attrs.get('brand', 'Unknown')}, "
@@ -376,7 +406,7 @@ class SmartSearchService:
         )
 
         try:
-            response = client.chat.completions.create(
+            response = observe_call("openai", client.chat.completions.create,
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -391,28 +421,31 @@ class SmartSearchService:
                 max_tokens=800,
                 temperature=0
             )
+            record_llm("gpt-4o-mini", response)
             raw = response.choices[0].message.content.strip()
             if raw.startswith("```"):
                 raw = re.sub(r"```[a-z]*\n?", "", raw).strip().rstrip("```").strip()
             scored = json.loads(raw)
-            result = {}
+            fresh = {}
             for item in scored:
-                idx = item.get("id", 0) - 1  # Convert 1-indexed to 0-indexed
-                if 0 <= idx < len(candidates):
-                    result[idx] = {
+                n = item.get("id", 0) - 1  # Convert 1-indexed prompt line to pending position
+                if 0 <= n < len(pending):
+                    fresh[pending[n]] = {
                         "classification": item.get("classification", "SIMILAR"),
                         "confidence": item.get("confidence", 0.5),
                         "reason": item.get("reason", "")
                     }
+            self.verdict_cache.set_many(source_attrs, fresh, candidates)
+            result = {i: (cached.get(i) or fresh[i]) for i in range(len(candidates)) if i in cached or i in fresh}
             logger.info(
-                f"[LLMScore] Scored {len(result)} candidates. "
+                f"[LLMScore] Scored {len(fresh)} candidates ({len(cached)} cached). "
                 f"EXACT: {sum(1 for v in result.values() if v['classification']=='EXACT')}, "
                 f"VARIANT: {sum(1 for v in result.values() if v['classification']=='VARIANT')}"
             )
             return result
         except Exception as e:
             logger.warning(f"[LLMScore] Batch scoring failed: {e}")
-            return {}
+            return cached
 
     def _image_match_score(self, source_image_url: str, candidate_image_url: str) -> int:
         """
@@ -428,7 +461,7 @@ class SmartSearchService:
             return 50  # Neutral score if unavailable
 
         try:
-            response = client.chat.completions.create(
+            response = observe_call("openai", client.chat.completions.create,
                 model="gpt-4o",
                 messages=[
                     {
@@ -453,6 +486,7 @@ class SmartSearchService:
                 max_tokens=100,
                 temperature=0
             )
+            record_llm("gpt-4o", response, vision=True)
             result = json.loads(response.choices[0].message.content)
             score = int(result.get("score", 50))
             logger.info(f"[ImageMatch] Score={score}, reason={result.get('reason', '')[:60]}")
@@ -740,29 +774,7 @@ class SmartSearchService:
         Extracts alphanumeric model codes (e.g., MK6475, WH-1000XM4, iPhone15)
         Ignores generic terms like 'Women', 'Watch', 'Size', 'Pack'
         """
-        # Look for tokens with mixed alpha+digits OR pure digits of specific length (e.g. 501)
-        tokens = text.split()
-        models = []
-        for t in tokens:
-            # CLEAN: Remove all non-alphanumeric characters (including hyphens) for standardization
-            # MK-7548 -> MK7548
-            t_clean = re.sub(r'[^a-zA-Z0-9]', '', t).upper()
-            
-            # Strict Rule: Model numbers MUST have at least one digit (e.g. MK3192, iphone15)
-            # Pure alpha words (MICHAEL, ROSE, GOLD) are almost never unique model IDs in this context.
-            if any(c.isdigit() for c in t_clean) and len(t_clean) > 2:
-                 # Check for India/International suffix "I" (e.g. MK7548I -> MK7548)
-                 # Only strip if it ends with digit+I to avoid stripping valid models ending in I
-                 if t_clean.endswith('I') and len(t_clean) > 3 and t_clean[-2].isdigit():
-                     logger.info(f"Stripping 'I' suffix from model: {t_clean} -> {t_clean[:-1]}")
-                     t_clean = t_clean[:-1]
-
-                 # Filter out common false positives
-                 if t_clean not in ["SIZE", "PACK", "WITH", "BLACK", "WHITE", "BLUE", "GOLD", "WOMEN", "MENS", "KIDS", "ROSE", "GOLD", "WATCH", "DARCI", "1PC", "2PC", "100ML", "50ML", "500G", "1KG"]:
-                    models.append(t_clean)
-        return models
-
-        return models
+        return self.analyzer.model_numbers(text)
 
     def _calculate_match_score(self, target_model: str, target_brand: str, target_fingerprint: dict, candidate_title: str, candidate_source: str, candidate_image_url: str = None) -> dict:
         """
@@ -772,55 +784,38 @@ class SmartSearchService:
           - Tier 2: Fingerprint Match (Score 70-89)
           - Tier 3: Similar/Fuzzy (Score < 70)
         """
-        score = 0
-        reasons = []
-        # Normalize title for matching: Remove hyphens/spaces for loose check
-        title_upper = candidate_title.upper()
-        title_clean = re.sub(r'[^a-zA-Z0-9]', '', title_upper)
-        
-        # 1. MODEL MATCH (+90 pts) - The "Gold Standard" in absence of GTIN
-        # Handle Alias: MK7548I == MK7548
-        # We assume target_model is already stripped/normalized (e.g. "MK7548")
-        if target_model:
-            # Check in raw title OR cleaned title (handles "MK-7548" in title matching "MK7548" target)
-            if target_model in title_upper or target_model in title_clean:
-                score += 90
-                reasons.append("Model Match")
-        
-        # 2. BRAND MATCH (+20 pts)
-        if target_brand and target_brand.upper() in title_upper:
-            score += 20
-            reasons.append("Brand Match")
-            
-        # 3. FINGERPRINT MATCH (+10 pts per attribute)
-        # Collection (e.g. "COREY", "PARKER", "LEXINGTON")
-        if target_fingerprint.get("collection"):
-            coll = target_fingerprint["collection"].upper()
-            if coll in title_upper:
-                score += 15 # Stronger signal
-                reasons.append(f"Collection: {coll}")
-            else:
-                 # CONFLICT: Target is "Corey" but Candidate is "Parker"
-                 # We need to extract candidate's collection to know for sure
-                 candidate_series = self._extract_series_name(candidate_title)
-                 if candidate_series and candidate_series != coll:
-                     score -= 30 
-                     reasons.append(f"Conflict: Series {candidate_series}")
-        
-        # Color (e.g. "ROSE GOLD")
-        if target_fingerprint.get("color"):
-            color = target_fingerprint["color"].upper()
-            if color in title_upper:
-                score += 10
-                reasons.append(f"Color: {color}")
-                
-        # Material (e.g. "STAINLESS")
-        if target_fingerprint.get("material"):
-            mat = target_fingerprint["material"].upper()
-            if mat in title_upper:
-                score += 10
-                reasons.append(f"Material: {mat}")
+        return self._score_candidates(target_model, target_brand, target_fingerprint,
+                                      [{"title": candidate_title, "source": candidate_source, "image": candidate_image_url}])[0]
+
+    def _score_candidates(self, target_model: str, target_brand: str, target_fingerprint: dict, candidates: List[dict]) -> List[dict]:
+        """
+        _calculate_match_score for a whole result list: the text signals
+        (model, brand, collection / series conflict, color, material; weights
+        in MATCH_WEIGHTS) are scored in one batch by BatchMatchScorer, then
+        visual verification runs for the candidates that qualify.
+        """
+        titles = [c.get("title") or "" for c in candidates]
+        sources = [c.get("source") or "" for c in candidates]
+        scores, reasons = self.match_scorer.score(target_model, target_brand, target_fingerprint, titles, sources)
+        results = []
+        for candidate, score, candidate_reasons in zip(candidates, scores.tolist(), reasons):
+            score = self._visual_adjustment(score, candidate_reasons, target_fingerprint, candidate.get("title") or "",
+                                            candidate.get("source") or "", candidate.get("thumbnail") or candidate.get("image"))
+            results.append({"score": score, "reasons": candidate_reasons})
+        return results
+
+    def _official_score(self, item: dict, target_model: str) -> int:
+        """Fuzzy score used for tiering: official-store results get a boost."""
+        score = item.get("match_score", 0)
+        if item.get("is_official") or item.get("source") == "Official Site":
+            if target_model and target_model in item.get("title", "").upper():
+                score += 100
+            elif score > 50:
+                score = 95
+        return score
 
+    def _visual_adjustment(self, score: int, reasons: List[str], target_fingerprint: dict, candidate_title: str, candidate_source: str, candidate_image_url: str = None) -> int:
+        """Applies Phase 4 visual verification to a text score; appends to `reasons`."""
         # 4. VISUAL VERIFICATION (Phase 4) 👁️
         # Trigger if:
         # a) We have a Target Image (from URL or Upload) AND Candidate Image
@@ -859,31 +854,40 @@ class SmartSearchService:
                      score -= 50 # Penalize False Positives (Item looks different despite text match)
                      reasons.append("Visual Mismatch")
 
-        return {"score": score, "reasons": reasons}
+        return score
 
     def _extract_series_name(self, text: str) -> Optional[str]:
         """
         Extracts known series/collection names for watches and accessories.
         Helps when no specific model number is present (e.g. 'Michael Kors Lexington')
         """
-        if not text: return None
-        
-        # Common Watch/Bag Series (Expand as needed)
-        known_series = [
-            "LEXINGTON", "BRADSHAW", "RUNWAY", "DARCI", "SOFIE", "PYPER", "PARKER", "SLIM", "RITZ", 
-            "GEN 5", "GEN 6", "VANDERBILT", "EVEREST", "LAYTON", "TIBBY", "COREY", "EMERY", "SAGE", "LENNOX"
-        ]
-        
-        text_upper = text.upper()
-        for series in known_series:
-            # check for word boundary to avoid partial matches
-            pattern = r'(?:^|\W)' + re.escape(series) + r'(?:$|\W)'
-            if re.search(pattern, text_upper):
-                return series
-                
-        return None
+        return self.analyzer.series(text)
+
+    def _cache_query(self, query: str) -> str:
+        """
+        Cache key text for a query. A pasted product URL is replaced by a
+        canonical form: `host/type:id` when an Amazon URL carries a stable
+        product ID (ASIN), else host + path + non-tracking params. The same link shared
+        with different utm_*/srsltid/ref params or fragments maps to one key.
+        """
+        url_match = re.search(r'https?://\S+', query)
+        if not url_match:
+            return query
+        raw_url = url_match.group(0)
+        host, path, params = self.url_service._normalize_url_for_match(raw_url)
+        if not host:
+            return query
+        if host.startswith("m."):
+            host = host[2:]
+        # The ASIN patterns are Amazon's; on other hosts a 10-char segment is just part of the path
+        product_id = self.url_service._extract_id_from_url(raw_url) if _AMAZON_HOST.search(host) else None
+        if product_id:
+            canonical = f"{host}/{product_id['type']}:{product_id['value']}"
+        else:
+            canonical = f"{host}{path}" + (f"?{params}" if params else "")
+        return query.replace(raw_url, canonical)
 
-    def smart_search(self, query: str, location: str = "Mumbai", db=None, image_url: str = None):
+    def smart_search(self, query: str, location: str = "Mumbai", db=None, image_url: str = None, refresh: bool = False):
 
         """
         Orchestrates the search:
@@ -892,14 +896,58 @@ class SmartSearchService:
         3. Searches Google/SerpAPI
         4. Ranks Results
         5. (Passive) Saves results to DB for History
+        `refresh=True` skips the cache lookup but still stores the result (cache warming).
+        """
+        with traced("smart_search", query=query, location=location):
+            final_response = None
+            for event in self._smart_search_events(query, location, db, image_url, refresh):
+                if event["event"] == "final":
+                    final_response = event["data"]
+            return final_response
+
+    async def smart_search_async(self, query: str, location: str = "Mumbai", db=None, image_url: str = None):
+        """
+        smart_search for async endpoints. The pipeline itself is blocking
+        (SerpAPI, requests, sync OpenAI), so it runs on the shared I/O pool
+        rather than holding one of FastAPI's request threads.
         """
+        return await run_blocking(self.smart_search, query, location, db, image_url)
+
+    def smart_search_stream(self, query: str, location: str = "Mumbai", db=None, image_url: str = None):
+        """
+        Same pipeline as smart_search, yielded as events while it runs:
+        - {"event": "results", "marketplace", "items"}: raw SerpAPI results per sub-query
+        - {"event": "classified", "exact_matches", "variant_matches", "similar_count"}: after Layer 3
+        - {"event": "final", "data"}: the full smart_search response (image-verified tiers)
+        A cache hit yields only the final event.
+        """
+        with traced("smart_search", query=query, location=location, streamed=True):
+            yield from self._smart_search_events(query, location, db, image_url)
+
+    def _smart_search_events(self, query: str, location: str, db=None, image_url: str = None, refresh: bool = False):
         logger.info(f"Smart Search Analysis for: {query}")
         
         # CACHE CHECK - Return cached results if available (huge speed boost)
-        cached_result = get_cached_search(query, location)
+        # Keyed by the upstream location, not the client's city (online results don't vary by city),
+        # and by the canonical form of any pasted URL; `query` itself is rewritten below.
+        cache_location = self.scraper.online_location(location)
+        cache_query = self._cache_query(query)
+        semantic_eligible = not image_url and cache_query == query  # URL and image searches stay exact
+        with trace_span("cache_lookup"):
+            cached_result = None if refresh else get_cached_search(cache_query, cache_location, image_url=image_url)
+            if cached_result:
+                cached_result = {**cached_result, "served_from": "cache"}
+            elif semantic_eligible and not refresh:
+                # Near-duplicate phrasing of a cached query
+                cached_result = get_semantic_cache().lookup(cache_query, cache_location)
         if cached_result:
-            logger.info(f"Returning CACHED results for '{query}'")
-            return cached_result
+            trace = current_trace()
+            if trace is not None:
+                trace.tags["cache_hit"] = True
+                trace.tags["served_from"] = cached_result["served_from"]
+            logger.info(f"Returning CACHED results for '{query}' ({cached_result['served_from']})")
+            yield {"event": "final", "data": cached_result}
+            return
         
         # 1. Check if query contains a URL (anywhere in text)
         url_pattern = re.compile(r'https?://\S+')
@@ -912,7 +960,8 @@ class SmartSearchService:
             raw_url = url_match.group(0)
             logger.info(f"Detected URL in query: {raw_url}")
             
-            extracted_data = self.url_service.extract_product_from_url(raw_url)
+            with trace_span("url_extraction"):
+                extracted_data = self.url_service.extract_product_from_url(raw_url)
             
             # capture best available URL for matching
             target_url = (
@@ -927,40 +976,32 @@ class SmartSearchService:
         logger.info(f"Fetching Data for: {query}, Target URL: {target_url}")
         
         # Detect Model Numbers in Query (Critical for "Compare Prices" exact match)
-        query_models = self._extract_model_numbers(query)
-        logger.info(f"Detected Model Numbers in Query: {query_models}")
-
-        # Extract Fingerprint (Collection, Brand, etc.)
-        # We use simple extraction first, can fallback to LLM matcher if needed
-        # Assuming Brand is usually first word or we can look it up
-        target_brand = None
-        for b_name in BRANDS:
-             if b_name.lower() in query.lower():
-                 target_brand = BRANDS[b_name]["display_name"]
-                 break
-        
-        target_fingerprint = {
-            "collection": self._extract_series_name(query),
-            "color": None, # complex to extract without LLM, skipping for now or using simple logic
-            "material": "STAINLESS" if "stainless" in query.lower() else None
-        }
-        if "rose gold" in query.lower(): target_fingerprint["color"] = "ROSE GOLD"
-        elif "gold" in query.lower(): target_fingerprint["color"] = "GOLD"
-        elif "silver" in query.lower(): target_fingerprint["color"] = "SILVER"
-
-        # Populate Target Image for Visual Verification (Phase 4)
-        if extracted_data and extracted_data.get("image"):
-            target_fingerprint["image_url"] = extracted_data["image"]
-            target_fingerprint["is_image_search"] = True 
-            logger.info(f"Visual Verification Enabled. Target Image: {extracted_data['image']}")
-        elif "http" in query and (".jpg" in query or ".png" in query or ".webp" in query):
-             # Direct Image URL search
-             target_fingerprint["image_url"] = query
-             target_fingerprint["is_image_search"] = True
-
-        # 2. FETCH RESULTS (Multi-Query for Marketplace Mix)
-        # Check if this is a Brand Search to trigger Marketplace Spread
-        is_brand_search = any(b['display_name'].lower() in query.lower() for b in BRANDS.values()) or len(query.split()) < 2
+        with trace_span("query_analysis"):
+            # One compiled pass: model numbers, registry brand, series, color, material
+            query_features = self.analyzer.analyze(query)
+            query_models = query_features["models"]
+            logger.info(f"Detected Model Numbers in Query: {query_models}")
+
+            target_brand = query_features["brand"]
+            target_fingerprint = {
+                "collection": query_features["collection"],
+                "color": query_features["color"],
+                "material": query_features["material"]
+            }
+
+            # Populate Target Image for Visual Verification (Phase 4)
+            if extracted_data and extracted_data.get("image"):
+                target_fingerprint["image_url"] = extracted_data["image"]
+                target_fingerprint["is_image_search"] = True 
+                logger.info(f"Visual Verification Enabled. Target Image: {extracted_data['image']}")
+            elif "http" in query and (".jpg" in query or ".png" in query or ".webp" in query):
+                 # Direct Image URL search
+                 target_fingerprint["image_url"] = query
+                 target_fingerprint["is_image_search"] = True
+
+            # 2. FETCH RESULTS (Multi-Query for Marketplace Mix)
+            # Check if this is a Brand Search to trigger Marketplace Spread
+            is_brand_search = query_features["is_brand_search"]
 
         
         all_serp_results = []
@@ -993,24 +1034,41 @@ class SmartSearchService:
             
             logger.info(f"Executing Multi-Marketplace Search for: {query}")
             
-            for marketplace in marketplaces:
-                if marketplace:
-                    sub_query = f"{query} {marketplace}"
-                else:
-                    sub_query = query
+            with trace_span("serpapi_fanout"):
+                # Sub-queries run concurrently; each is emitted as it returns, but
+                # merged in marketplace order so ranking matches the serial version
+                futures = {}
+                for idx, marketplace in enumerate(marketplaces):
+                    if marketplace:
+                        sub_query = f"{query} {marketplace}"
+                    else:
+                        sub_query = query
                     
-                logger.info(f"  Searching: {sub_query}")
-                res = self.scraper.search_products(sub_query)
-                all_serp_results.extend(res.get("online", []))
+                    logger.info(f"  Searching: {sub_query}")
+                    futures[submit_fanout(self.scraper.search_products, sub_query)] = idx
+
+                per_marketplace = [[] for _ in marketplaces]
+                for future in as_completed(futures):
+                    idx = futures[future]
+                    try:
+                        per_marketplace[idx] = future.result().get("online", [])
+                    except Exception as e:
+                        logger.error(f"Marketplace search failed for '{marketplaces[idx] or query}': {e}")
+                    yield {"event": "results", "marketplace": marketplaces[idx] or "all", "items": per_marketplace[idx]}
+                for items in per_marketplace:
+                    all_serp_results.extend(items)
         else:
             # Standard single query
             # ── Layer 2: Extract structured attrs + use brand-neutral search query ──
-            source_attrs = self.url_service._extract_structured_attributes(query, image_url=image_url)
+            with trace_span("layer2_attributes"):
+                source_attrs = self.url_service._extract_structured_attributes(query, image_url=image_url)
             search_query = source_attrs.get("search_query") or query
             if search_query != query:
                 logger.info(f"[Layer2] Brand-neutral query: '{query}' → '{search_query}'")
-            scraper_response = self.scraper.search_products(search_query)
-            all_serp_results = scraper_response.get("online", [])
+            with trace_span("serpapi_fanout"):
+                scraper_response = self.scraper.search_products(search_query)
+                all_serp_results = scraper_response.get("online", [])
+            yield {"event": "results", "marketplace": "all", "items": all_serp_results}
 
         # TIERED RESULT CLASSIFICATION
         exact_matches = []
@@ -1022,22 +1080,16 @@ class SmartSearchService:
 
         # ── Layer 3: LLM batch scoring on top 20 candidates ──────────────────
         # Pre-sort by fuzzy score first, then LLM re-classifies the top 20
-        for item in all_serp_results:
-            calc = self._calculate_match_score(
-                target_model=target_model_clean,
-                target_brand=target_brand,
-                target_fingerprint=target_fingerprint,
-                candidate_title=item.get("title", ""),
-                candidate_source=item.get("source", ""),
-                candidate_image_url=item.get("thumbnail") or item.get("image")
-            )
-            item["match_score"] = calc["score"]
-            item["match_reasons"] = calc["reasons"]
+        with trace_span("fuzzy_scoring"):
+            scored = self._score_candidates(target_model_clean, target_brand, target_fingerprint, all_serp_results)
+            for item, calc in zip(all_serp_results, scored):
+                item["match_score"] = calc["score"]
+                item["match_reasons"] = calc["reasons"]
 
-        # Sort all results by fuzzy score descending
-        all_serp_results.sort(key=lambda x: x.get("match_score", 0), reverse=True)
-        top20 = all_serp_results[:20]
-        rest = all_serp_results[20:]
+            # Sort all results by fuzzy score descending
+            all_serp_results.sort(key=lambda x: x.get("match_score", 0), reverse=True)
+            top20 = all_serp_results[:20]
+            rest = all_serp_results[20:]
 
         # LLM scores the top 20 (one API call)
         # source_attrs may not exist if marketplace mix was used — build minimal fallback
@@ -1054,7 +1106,21 @@ class SmartSearchService:
                 "match_keywords": [w for w in (target_brand or "").split() + list(fp.values()) if isinstance(w, str) and len(w) > 2]
             }
 
-        llm_scores = self._llm_score_matches(source_attrs, top20)
+        with trace_span("layer3_llm_scoring"):
+            llm_scores = {}
+            if top20 and self._get_client():
+                # Skip the GPT round-trip when the fuzzy scores already decide the tiers
+                fuzzy_scores = [self._official_score(item, target_model_clean) for item in top20]
+                gate = self.llm_gate.decide(top20, fuzzy_scores)
+                trace = current_trace()
+                if trace is not None:
+                    trace.tags["llm_gate"] = gate["reason"] or "called"
+                if not gate["skip"] or gate["audit"]:
+                    llm_scores = self._llm_score_matches(source_attrs, top20)
+                    if gate["audit"] and llm_scores:
+                        self.llm_gate.record_audit(gate, fuzzy_scores, llm_scores)
+                else:
+                    logger.info(f"[LLMGate] Skipped Layer-3 scoring ({gate['reason']})")
 
         for i, item in enumerate(top20):
             llm = llm_scores.get(i, {})
@@ -1062,15 +1128,9 @@ class SmartSearchService:
             llm_conf = llm.get("confidence", 0.5)
             item["llm_reason"] = llm.get("reason", "")
 
-            # Official store boost (keep existing logic)
-            score = item["match_score"]
-            if item.get("is_official") or item.get("source") == "Official Site":
-                if target_model_clean and target_model_clean in item.get("title", "").upper():
-                    score += 100
-                    item["match_score"] += 100
-                elif score > 50:
-                    score = 95
-                    item["match_score"] = 95
+            # Official store boost (same scores the LLM gate decided on)
+            score = self._official_score(item, target_model_clean)
+            item["match_score"] = score
 
             # LLM classification takes priority for top 20
             if llm_class == "EXACT":
@@ -1098,12 +1158,7 @@ class SmartSearchService:
 
         # Items outside top 20 — fuzzy threshold only
         for item in rest:
-            score = item.get("match_score", 0)
-            if item.get("is_official") or item.get("source") == "Official Site":
-                if target_model_clean and target_model_clean in item.get("title", "").upper():
-                    score += 100
-                elif score > 50:
-                    score = 95
+            score = self._official_score(item, target_model_clean)
             if score >= 85:
                 item["match_classification"] = "EXACT_MATCH"
                 exact_matches.append(item)
@@ -1114,32 +1169,6 @@ class SmartSearchService:
                 item["match_classification"] = "SIMILAR"
                 similar_matches.append(item)
 
-        # ── Layer 4: Image matching on top EXACT/VARIANT candidates (max 5) ──
-        source_image_url = (source_attrs.get("images") or [None])[0]
-        if source_image_url:
-            image_checks = 0
-            for item in list(exact_matches):  # iterate copy so we can modify
-                if image_checks >= 5:
-                    break
-                cand_img = item.get("thumbnail") or item.get("image")
-                if cand_img:
-                    img_score = self._image_match_score(source_image_url, cand_img)
-                    item["image_match_score"] = img_score
-                    if img_score < 40:
-                        # Downgrade: not the same product visually
-                        exact_matches.remove(item)
-                        item["match_classification"] = "VARIANT_MATCH"
-                        variant_matches.append(item)
-                    image_checks += 1
-
-        # 4. Synthesize with LLM (Optional, mostly for "Top Pick" text)
-        # We skip this for raw search speed usually, but if needed:
-        recommendation_data = {
-            "best_value": None,
-            "authenticity_note": "Ensure seller has good ratings.",
-            "recommendation_text": "Found these matches based on your search."
-        }
-        
         # Deduping (Simple ID/URL check)
         # Note: We should dedupe WITHIN lists to avoid duplicates across tiers if logic was loose
         # But here we partitioned them so they are unique sets logic-wise. 
@@ -1154,6 +1183,43 @@ class SmartSearchService:
                      unique.append(i)
              return unique
 
+        yield {
+            "event": "classified",
+            "exact_matches": _dedupe(exact_matches),
+            "variant_matches": _dedupe(variant_matches),
+            "similar_count": len(similar_matches)
+        }
+
+        # ── Layer 4: Image matching on top EXACT/VARIANT candidates (max 5) ──
+        source_image_url = (source_attrs.get("images") or [None])[0]
+        with trace_span("layer4_image_verification"):
+            if source_image_url:
+                image_checks = 0
+                for item in list(exact_matches):  # iterate copy so we can modify
+                    if image_checks >= 5:
+                        break
+                    cand_img = item.get("thumbnail") or item.get("image")
+                    if cand_img:
+                        img_score = self._image_match_score(source_image_url, cand_img)
+                        item["image_match_score"] = img_score
+                        if img_score < 40:
+                            # Downgrade: not the same product visually
+                            exact_matches.remove(item)
+                            item["match_classification"] = "VARIANT_MATCH"
+                            variant_matches.append(item)
+                        image_checks += 1
+
+        # 4. Synthesize with LLM (Optional, mostly for "Top Pick" text)
+        # We skip this for raw search speed usually, but if needed:
+        recommendation_data = {
+            "best_value": None,
+            "authenticity_note": "Ensure seller has good ratings.",
+            "recommendation_text": "Found these matches based on your search."
+        }
+
+        with trace_span("registry_injection"):
+            clean_brands = self._inject_registry_cards(query, all_serp_results)
+
         final_response = {
             "original_query": query,
             "query_type": "product", # or 'brand'
@@ -1166,13 +1232,16 @@ class SmartSearchService:
                 "similar_matches": _dedupe(similar_matches)
             },
             "recommendation": recommendation_data,
-            "clean_brands": self._inject_registry_cards(query, all_serp_results)
+            "clean_brands": clean_brands
         }
         
         # Cache the result
-        cache_search(query, location, final_response)
+        with trace_span("cache_store"):
+            cache_search(cache_query, cache_location, final_response, image_url=image_url)
+            if semantic_eligible:
+                get_semantic_cache().add(cache_query, cache_location)
         
-        return final_response                         # Fuzzy brand check
+        yield {"event": "final", "data": {**final_response, "served_from": "pipeline"}}                         # Fuzzy brand check
 
     def _deduplicate_results(self, items: List[Dict]) -> List[Dict]:
         """
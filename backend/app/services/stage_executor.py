@@ -0,0 +1,155 @@
+"""
+Tiny DAG executor for I/O-bound pipeline stages.
+Runs every stage as soon as its dependencies have finished, records per-stage
+timings, and stops as soon as an `accept` callback says the answer is good
+enough (pending stages are cancelled, running ones are abandoned).
+
+Environment Variables:
+- STAGE_EXECUTOR_WORKERS: Shared worker threads for all pipelines (default: 16)
+"""
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, Optional
+import logging
+import threading
+import time
+
+from app.services.cache_service import _get_env_int
+from app.services.io_pool import TrackedPool
+
+logger = logging.getLogger(__name__)
+
+STAGE_EXECUTOR_WORKERS = _get_env_int("STAGE_EXECUTOR_WORKERS", 16)
+
+# Shared pool: stages never block on each other inside the pool, so sharing it is deadlock-free
+_pool = TrackedPool(STAGE_EXECUTOR_WORKERS, "stage")
+
+def submit_in_context(fn: Callable, *args, **kwargs) -> Future:
+    """Submit to the shared pool, carrying the caller's context (active trace)."""
+    return _pool.submit_in_context(fn, *args, **kwargs)
+
+
+def stage_pool_stats() -> dict:
+    return _pool.stats()
+
+
+# Sentinel returned by a hedged stage that never ran
+_SKIPPED = object()
+
+
+class _Stage:
+    def __init__(self, name: str, fn: Callable[[dict], Any], deps: Iterable[str], hedge_on: Optional[str], hedge_seconds: float):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.hedge_on = hedge_on
+        self.hedge_seconds = hedge_seconds
+
+
+class StageExecutor:
+    """
+    Usage:
+        ex = StageExecutor("url_extract")
+        ex.add("resolve", lambda r: resolve(url))
+        ex.add("meta", lambda r: fetch(r["resolve"]), deps=["resolve"])
+        run = ex.run(accept=lambda name, value, results: ..., timeout=10)
+        run["results"], run["timings_ms"], run["status"]
+    """
+
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self._stages: Dict[str, _Stage] = {}
+
+    def add(self, name: str, fn: Callable[[dict], Any], deps: Iterable[str] = (), hedge_on: str = None, hedge_seconds: float = 0.0) -> "StageExecutor":
+        """
+        Register a stage. `fn` receives the dict of results finished so far.
+        With `hedge_on`, the stage waits up to `hedge_seconds` for that stage
+        to finish before starting (and is skipped if the pipeline was accepted
+        meanwhile) - useful to avoid paid calls a cheaper stage may make moot.
+        """
+        self._stages[name] = _Stage(name, fn, deps, hedge_on, hedge_seconds)
+        return self
+
+    def run(self, accept: Callable[[str, Any, dict], bool] = None, timeout: float = None) -> dict:
+        results: Dict[str, Any] = {}
+        status: Dict[str, str] = {name: "pending" for name in self._stages}
+        timings: Dict[str, float] = {}
+        done_events = {name: threading.Event() for name in self._stages}
+        stopped = threading.Event()
+        futures = {}
+        started = time.perf_counter()
+        deadline = started + timeout if timeout else None
+
+        def _call(stage: _Stage):
+            if stage.hedge_on and stage.hedge_on in done_events:
+                done_events[stage.hedge_on].wait(stage.hedge_seconds)
+            if stopped.is_set():
+                return _SKIPPED
+            t0 = time.perf_counter()
+            try:
+                return stage.fn(results)
+            finally:
+                timings[stage.name] = round((time.perf_counter() - t0) * 1000, 1)
+
+        def _schedule_ready():
+            for name, stage in self._stages.items():
+                if status[name] != "pending":
+                    continue
+                dep_states = [status.get(d) for d in stage.deps]
+                if any(s in ("error", "skipped", "cancelled") for s in dep_states):
+                    status[name] = "skipped"
+                    done_events[name].set()
+                elif all(s == "ok" for s in dep_states):
+                    status[name] = "running"
+                    futures[submit_in_context(_call, stage)] = name
+
+        _schedule_ready()
+        accepted_by = None
+        while futures:
+            remaining = None
+            if deadline:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+            finished, _ = wait(list(futures), timeout=remaining, return_when=FIRST_COMPLETED)
+            if not finished:
+                break
+            for future in finished:
+                name = futures.pop(future)
+                try:
+                    value = future.result()
+                    if value is _SKIPPED:
+                        status[name] = "skipped"
+                    else:
+                        results[name] = value
+                        status[name] = "ok"
+                except Exception as e:
+                    logger.warning(f"[{self.name}] Stage '{name}' failed: {e}")
+                    status[name] = "error"
+                if not accepted_by and status[name] == "ok" and accept and accept(name, results[name], results):
+                    accepted_by = name
+                    # Before waking hedged stages, so they see the stop
+                    stopped.set()
+                done_events[name].set()
+            if accepted_by:
+                break
+            _schedule_ready()
+
+        # Stop: cancel what hasn't started, abandon what is running
+        stopped.set()
+        for future, name in futures.items():
+            future.cancel()
+            status[name] = "cancelled"
+        for name, state in status.items():
+            if state == "pending":
+                status[name] = "cancelled"
+        for event in done_events.values():
+            event.set()
+
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"[{self.name}] total={total_ms}ms accepted_by={accepted_by} stages={timings} status={status}")
+        return {
+            "results": results,
+            "status": status,
+            "timings_ms": dict(timings, total=total_ms),
+            "accepted_by": accepted_by
+        }
@@ -0,0 +1,191 @@
+"""
+In-memory prefix index for /discovery/suggest (typeahead).
+Completions come from the brand registry (display names, aliases and their
+popular_searches) and from the most frequent logged searches. Each phrase is
+indexed under its full text and under every word start ("jordan" finds
+"nike air jordan"), in one sorted array; a lookup is two bisects plus a
+top-K over the matching slice, memoized per prefix (short prefixes match
+large slices). New searches are added as they are logged,
+and the logged-search part is rebuilt from the counters every
+SUGGEST_REFRESH_SECONDS so workers converge.
+
+Environment Variables:
+- SUGGEST_MAX_QUERIES: Logged searches loaded into the index (default: 5000)
+- SUGGEST_MIN_COUNT: Times a logged search must occur before it is suggested (default: 2)
+- SUGGEST_REFRESH_SECONDS: Rebuild interval for logged searches (default: 600)
+"""
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import heapq
+import logging
+import math
+import threading
+import time
+
+from app.services.cache_service import _get_env_int
+from app.services.graph_service import normalize_search_term
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_MAX_QUERIES = _get_env_int("SUGGEST_MAX_QUERIES", 5000)
+SUGGEST_MIN_COUNT = _get_env_int("SUGGEST_MIN_COUNT", 2)
+SUGGEST_REFRESH_SECONDS = _get_env_int("SUGGEST_REFRESH_SECONDS", 600)
+
+# Score boosts for registry entries; a logged search scores 10 * ln(1 + count)
+BRAND_WEIGHT = 50
+BRAND_SEARCH_WEIGHT = 20
+MEMO_SIZE = 4096
+
+
+class SuggestIndex:
+    """Sorted (key, phrase) array with per-phrase scores; safe for concurrent reads and updates."""
+
+    def __init__(self):
+        self._keys: List[tuple] = []             # (indexed text, phrase), sorted
+        self._phrases: Dict[str, dict] = {}      # phrase -> {"text", "type", "count", "boost"}
+        self._lock = threading.Lock()
+        self._pending: Dict[str, int] = {}      # logged searches below SUGGEST_MIN_COUNT
+        self._memo: "OrderedDict[tuple, list]" = OrderedDict()  # (prefix, limit) -> suggestions
+        self.built_at: Optional[float] = None
+        self._refreshing = False
+
+    @staticmethod
+    def _index_keys(phrase: str) -> List[str]:
+        words = phrase.split(" ")
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    @staticmethod
+    def _merge(phrases: Dict[str, dict], phrase: str, text: str, kind: str, count: int = 0, boost: int = 0) -> None:
+        entry = phrases.get(phrase)
+        if entry is None:
+            phrases[phrase] = {"text": text, "type": kind, "count": count, "boost": boost}
+            return
+        entry["count"] = max(entry["count"], count)
+        if boost > entry["boost"]:
+            entry.update(type=kind, boost=boost, text=text)
+
+    def build(self, brands: dict, searches: List[dict]) -> None:
+        """Replace the index with registry entries plus logged searches ({"term", "count"})."""
+        phrases: Dict[str, dict] = {}
+
+        def add(text, kind, count=0, boost=0):
+            phrase = normalize_search_term(text)
+            if phrase is not None:
+                self._merge(phrases, phrase, " ".join(text.split()), kind, count, boost)
+
+        for brand in brands.values():
+            add(brand["display_name"], "brand", boost=BRAND_WEIGHT)
+            for alias in brand.get("aliases", []):
+                add(alias, "brand", boost=BRAND_WEIGHT - 1)
+            for search in brand.get("popular_searches", []):
+                add(search, "query", boost=BRAND_SEARCH_WEIGHT)
+        for search in searches:
+            if search["count"] >= SUGGEST_MIN_COUNT:
+                add(search["term"], "query", count=search["count"])
+
+        keys = sorted((key, phrase) for phrase in phrases for key in self._index_keys(phrase))
+        with self._lock:
+            self._phrases, self._keys = phrases, keys
+            self._memo.clear()
+            self.built_at = time.time()
+        for first in {key[0] for key, _ in keys}:
+            self.suggest(first)  # the slowest lookups, precomputed
+        logger.info(f"[Suggest] Index built: {len(phrases)} phrases, {len(keys)} keys")
+
+    def record(self, query: str) -> None:
+        """Count one logged search; it becomes suggestible at SUGGEST_MIN_COUNT."""
+        phrase = normalize_search_term(query)
+        if phrase is None:
+            return
+        with self._lock:
+            entry = self._phrases.get(phrase)
+            if entry is not None:
+                entry["count"] += 1  # memoized rankings pick this up at the next rebuild
+                return
+            pending = self._pending.pop(phrase, 0) + 1
+            if pending < SUGGEST_MIN_COUNT:
+                self._pending[phrase] = pending
+                return
+            self._merge(self._phrases, phrase, " ".join(str(query).split()), "query", count=pending)
+            for key in self._index_keys(phrase):
+                insort(self._keys, (key, phrase))
+            self._memo.clear()
+
+    @staticmethod
+    def _score(entry: dict) -> float:
+        return entry["boost"] + math.log1p(entry["count"]) * 10
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[dict]:
+        """Ranked completions for `prefix` (whole-phrase matches before word-start matches at equal score)."""
+        prefix = " ".join(str(prefix or "").lower().split())
+        if not prefix or limit <= 0:
+            return []
+        with self._lock:
+            memo_key = (prefix, limit)
+            cached = self._memo.get(memo_key)
+            if cached is not None:
+                self._memo.move_to_end(memo_key)
+                return list(cached)
+            lo = bisect_left(self._keys, (prefix,))
+            hi = bisect_left(self._keys, (prefix + "\uffff",))
+            best: Dict[str, tuple] = {}
+            for key, phrase in self._keys[lo:hi]:
+                entry = self._phrases[phrase]
+                rank = (self._score(entry), key == phrase, -len(phrase))
+                if phrase not in best or rank > best[phrase][0]:
+                    best[phrase] = (rank, entry)
+            top = heapq.nlargest(limit, best.values(), key=lambda item: item[0])
+            result = [{"text": entry["text"], "type": entry["type"], "count": entry["count"]} for _, entry in top]
+            self._memo[memo_key] = result
+            while len(self._memo) > MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return list(result)
+
+    def stats(self) -> dict:
+        return {"phrases": len(self._phrases), "keys": len(self._keys), "built_at": self.built_at}
+
+    # ── Loading ──────────────────────────────────────────────────────────
+    def load(self, session_factory=None) -> None:
+        """Build from the brand registry and the all-time search counters."""
+        from app.services.registry import BRANDS
+        from app.services.graph_service import GraphService
+        if session_factory is None:
+            from app.database import SessionLocal
+            session_factory = SessionLocal
+        db = session_factory()
+        try:
+            searches = GraphService().get_top_searches(db, "all", SUGGEST_MAX_QUERIES)
+        finally:
+            db.close()
+        self.build(BRANDS, searches)
+
+    def refresh_if_stale(self) -> None:
+        """Rebuild in a background thread once SUGGEST_REFRESH_SECONDS have passed."""
+        if self.built_at is not None and time.time() - self.built_at < SUGGEST_REFRESH_SECONDS:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _run():
+            try:
+                self.load()
+            except Exception as e:
+                logger.warning(f"[Suggest] Rebuild failed: {e}")
+                self.built_at = time.time()  # retry after the next interval, not on every keystroke
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=_run, name="suggest-refresh", daemon=True).start()
+
+
+_suggest_index_instance = None
+
+def get_suggest_index() -> SuggestIndex:
+    """Get the singleton suggest index."""
+    global _suggest_index_instance
+    if _suggest_index_instance is None:
+        _suggest_index_instance = SuggestIndex()
+    return _suggest_index_instance
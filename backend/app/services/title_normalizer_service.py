@@ -0,0 +1,174 @@
+"""
+Rule-based product title normalizer.
+Handles the common URL-search case locally (brand prefix from the registry,
+filler/site-suffix stripping, size & pack extraction) and reports a confidence
+so callers only fall back to the LLM clean-up when the rules are unsure.
+"""
+import logging
+import re
+from typing import Optional
+
+from app.services.registry import BRANDS, STORES
+
+logger = logging.getLogger(__name__)
+
+# Marketing filler that never helps a shopping query
+_FILLER_PATTERNS = [
+    r"\bbuy\b",
+    r"\bonline\b",
+    r"\bat (?:the )?(?:best|lowest) prices?(?: in india)?\b",
+    r"\b(?:best|lowest) prices?(?: in india)?\b",
+    r"\bin india\b",
+    r"\bshop now\b",
+    r"\bfree (?:shipping|delivery)\b",
+    r"\bcash on delivery\b",
+    r"\bcod\b",
+    r"\bwith offers?\b",
+    r"\bnew arrivals?\b",
+    r"\b(?:100% )?(?:original|genuine|authentic)\b",
+]
+_FILLER_RE = re.compile("|".join(_FILLER_PATTERNS), re.IGNORECASE)
+
+_SIZE_RE = re.compile(r"\b(\d+(?:\.\d+)?)\s?(ml|l|ltr|litre|g|gm|gms|grams?|kg|mg|oz)\b", re.IGNORECASE)
+_PACK_RE = re.compile(r"\b(?:pack of|set of)\s?(\d+)\b|\b(\d+)\s?(?:pcs|pieces|pack|count)\b", re.IGNORECASE)
+
+
+def _store_suffix_terms() -> set:
+    terms = set()
+    for store in STORES:
+        terms.add(store["display_name"].lower())
+        for domain in store.get("domains", []):
+            terms.add(domain.lower())
+            terms.add(domain.split(".")[0].lower())
+    terms.update({"amazon.in", "amazon", "flipkart.com", "flipkart", "myntra", "ajio", "nykaa"})
+    return terms
+
+
+def _brand_aliases() -> list:
+    """(alias, display_name) pairs, longest alias first so 'old school rituals' beats 'old'."""
+    pairs = []
+    for data in BRANDS.values():
+        for term in set(data.get("aliases", []) + [data["display_name"].lower()]):
+            pairs.append((term.lower(), data["display_name"]))
+    pairs.sort(key=lambda p: len(p[0]), reverse=True)
+    return pairs
+
+
+class TitleNormalizerService:
+    """Local replacement for the GPT-3.5 title clean-up in the common case."""
+
+    def __init__(self):
+        self._store_re = re.compile(
+            r"(?:^|\W)(?:" + "|".join(re.escape(t) for t in sorted(_store_suffix_terms(), key=len, reverse=True)) + r")(?:$|\W)"
+        )
+        self._brand_aliases = _brand_aliases()
+        # One alternation over all aliases; word-boundary anchored like _inject_registry_cards
+        self._brand_re = re.compile(
+            r"(?:^|\W)(" + "|".join(re.escape(a) for a, _ in self._brand_aliases) + r")(?:$|\W)",
+            re.IGNORECASE
+        )
+        self._alias_to_display = {a: d for a, d in self._brand_aliases}
+
+    def _strip_site_suffix(self, title: str) -> str:
+        """Drop trailing ' | Amazon.in' / ' - Buy Online at Nykaa' style segments."""
+        parts = re.split(r"\s+[|:\-–—]\s+", title)
+        while len(parts) > 1:
+            tail = parts[-1].lower().strip()
+            tail_clean = _FILLER_RE.sub(" ", tail).strip(" .")
+            if not tail_clean or self._store_re.search(tail):
+                parts.pop()
+            else:
+                break
+        return " - ".join(parts)
+
+    def detect_brand(self, title: str) -> tuple:
+        """Returns (display_name, is_prefix) for a registry brand found in the title."""
+        match = self._brand_re.search(title or "")
+        if not match:
+            return None, False
+        display = self._alias_to_display.get(match.group(1).lower())
+        is_prefix = match.start(1) <= 1
+        return display, is_prefix
+
+    def normalize(self, title: str, brand_hint: Optional[str] = None, source: str = "title") -> dict:
+        """
+        Normalizes a scraped product title.
+
+        Args:
+            title: Raw title (JSON-LD name, OG title, page title, ...)
+            brand_hint: Brand from structured data, if any
+            source: Where the title came from ('json_ld', 'og', 'serpapi', 'path', 'title')
+
+        Returns:
+            {product_name, brand, search_query, size, pack, confidence (0-1), reasons}
+        """
+        raw = " ".join(str(title or "").split())
+        reasons = []
+        if not raw:
+            return {"product_name": "", "brand": brand_hint or "Unknown", "search_query": "",
+                    "size": None, "pack": None, "confidence": 0.0, "reasons": ["empty"]}
+
+        name = self._strip_site_suffix(raw)
+        name = _FILLER_RE.sub(" ", name)
+        name = re.sub(r"\s+", " ", name).strip(" -|,.:")
+
+        # Size / pack (kept in product_name, reported separately)
+        size_match = _SIZE_RE.search(name)
+        size = f"{size_match.group(1)}{size_match.group(2).lower()}" if size_match else None
+        pack_match = _PACK_RE.search(name)
+        pack = int(pack_match.group(1) or pack_match.group(2)) if pack_match else None
+
+        # Brand: structured hint wins, else registry prefix/anywhere
+        brand = None
+        confidence = 0.0
+        registry_brand, is_prefix = self.detect_brand(name)
+        if brand_hint and brand_hint != "Unknown":
+            brand = brand_hint
+            confidence += 0.35
+            reasons.append("structured_brand")
+            if not name.lower().startswith(brand.lower()):
+                name = f"{brand} {name}"
+        elif registry_brand:
+            brand = registry_brand
+            confidence += 0.35 if is_prefix else 0.2
+            reasons.append("registry_brand_prefix" if is_prefix else "registry_brand")
+
+        # Title source quality
+        source_weight = {"json_ld": 0.35, "serpapi": 0.25, "og": 0.2, "title": 0.15, "path": 0.05}
+        confidence += source_weight.get(source, 0.1)
+        reasons.append(f"source:{source}")
+
+        # Shape: concise names are already "clean"
+        word_count = len(name.split())
+        if 2 <= word_count <= 12:
+            confidence += 0.3
+            reasons.append("concise")
+        elif word_count <= 20:
+            confidence += 0.1
+            reasons.append("long")
+        else:
+            reasons.append("very_long")
+
+        # Cap product_name like the rest of the pipeline (words, not chars, to avoid cut tokens)
+        words = name.split()
+        product_name = " ".join(words[:15])
+        # Query: drop pack phrases, sizes, brackets and separators; size is re-appended compactly
+        query_text = _PACK_RE.sub(" ", name)
+        query_text = _SIZE_RE.sub(" ", query_text)
+        query_text = re.sub(r"[()\[\]]", " ", query_text)
+        query_words = [w for w in query_text.split() if w not in ("-", "|", "–", "—", "/", "+")]
+        search_query = " ".join(query_words[:8])
+        if size:
+            search_query = f"{search_query} {size}"
+
+        result = {
+            "product_name": product_name,
+            "brand": brand or "Unknown",
+            "search_query": search_query,
+            "size": size,
+            "pack": pack,
+            "confidence": round(min(confidence, 1.0), 2),
+            "reasons": reasons
+        }
+        logger.info(f"[TitleNormalizer] '{raw[:60]}' -> '{search_query}' (conf={result['confidence']})")
+        return result
@@ -0,0 +1,194 @@
+"""
+Lightweight request tracing for the search pipeline.
+Records span timings per stage, counts external calls by type and estimates
+their cost. The active trace lives in a contextvar, so any service on the
+request's call path can record into it without threading state through.
+
+Environment Variables:
+- TRACE_BUFFER_SIZE: Number of recent traces kept for /metrics aggregation (default: 500)
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+import logging
+import threading
+import time
+
+from app.services.cache_service import _get_env_int
+from app.services.metrics_service import observe_trace
+
+logger = logging.getLogger(__name__)
+
+TRACE_BUFFER_SIZE = _get_env_int("TRACE_BUFFER_SIZE", 500)
+
+# USD per 1M tokens (input, output); per-call fallback when usage is missing
+LLM_PRICING = {
+    "gpt-4o-mini": (0.15, 0.60, 0.0003),
+    "gpt-4o": (2.50, 10.00, 0.003),
+    "gpt-4o-vision": (2.50, 10.00, 0.004),
+    "gpt-3.5-turbo": (0.50, 1.50, 0.0005),
+    "embeddings": (0.02, 0.0, 0.00001),
+}
+SERPAPI_COST_PER_SEARCH = 0.01
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """Span timings + external call accounting for one request."""
+
+    def __init__(self, name: str, **tags):
+        self.name = name
+        self.tags = tags
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.spans: dict = {}
+        self.calls: dict = {}
+        self.tokens: dict = {}
+        self.cost_usd = 0.0
+        self._lock = threading.Lock()
+
+    def add_span(self, stage: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.spans[stage] = round(self.spans.get(stage, 0) + elapsed_ms, 1)
+
+    def add_call(self, call_type: str, cost_usd: float = 0.0, tokens: int = 0) -> None:
+        with self._lock:
+            self.calls[call_type] = self.calls.get(call_type, 0) + 1
+            if tokens:
+                self.tokens[call_type] = self.tokens.get(call_type, 0) + tokens
+            self.cost_usd += cost_usd
+
+    def finish(self) -> None:
+        if self.duration_ms is None:
+            self.duration_ms = round((time.perf_counter() - self._t0) * 1000, 1)
+
+    def summary(self) -> dict:
+        return {
+            "name": self.name,
+            "tags": self.tags,
+            "started_at": self.started_at,
+            "total_ms": self.duration_ms if self.duration_ms is not None else round((time.perf_counter() - self._t0) * 1000, 1),
+            "stages_ms": dict(self.spans),
+            "calls": dict(self.calls),
+            "tokens": dict(self.tokens),
+            "estimated_cost_usd": round(self.cost_usd, 5)
+        }
+
+
+_recent = deque(maxlen=TRACE_BUFFER_SIZE)
+_recent_lock = threading.Lock()
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def traced(name: str, **tags):
+    """
+    Start a trace for this request, or join the one already active.
+    Only the outermost `traced` block finalizes and stores the trace.
+    """
+    existing = _current_trace.get()
+    if existing is not None:
+        existing.tags.update({k: v for k, v in tags.items() if k not in existing.tags})
+        yield existing
+        return
+    trace = Trace(name, **tags)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.finish()
+        summary = trace.summary()
+        with _recent_lock:
+            _recent.append(summary)
+        observe_trace(summary)
+
+
+@contextmanager
+def trace_span(stage: str):
+    """Time a pipeline stage into the active trace (no-op without one)."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(stage, (time.perf_counter() - t0) * 1000)
+
+
+def record_serpapi() -> None:
+    """Count one SerpAPI search."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_call("serpapi", SERPAPI_COST_PER_SEARCH)
+
+
+def record_llm(model: str, response=None, vision: bool = False) -> None:
+    """Count one OpenAI call; cost from response.usage when present."""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    call_type = "embeddings" if model.startswith("text-embedding") else model
+    if vision and model == "gpt-4o":
+        call_type = "gpt-4o-vision"
+    price_in, price_out, flat = LLM_PRICING.get(call_type, LLM_PRICING["gpt-4o-mini"])
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    if prompt_tokens or completion_tokens:
+        cost = (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+    else:
+        cost = flat
+    trace.add_call(call_type, cost, prompt_tokens + completion_tokens)
+
+
+def recent_traces(limit: int = None) -> list:
+    with _recent_lock:
+        items = list(_recent)
+    return items[-limit:] if limit else items
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def aggregate_traces(name: str = None) -> dict:
+    """Per-stage latency percentiles, call counts and cost over recent traces."""
+    traces = [t for t in recent_traces() if name is None or t["name"] == name]
+    stage_values: dict = {}
+    calls: dict = {}
+    cost = 0.0
+    cache_hits = 0
+    for t in traces:
+        for stage, ms in t["stages_ms"].items():
+            stage_values.setdefault(stage, []).append(ms)
+        for call_type, n in t["calls"].items():
+            calls[call_type] = calls.get(call_type, 0) + n
+        cost += t["estimated_cost_usd"]
+        if t["tags"].get("cache_hit"):
+            cache_hits += 1
+    totals = [t["total_ms"] for t in traces]
+    return {
+        "traces": len(traces),
+        "cache_hit_ratio": round(cache_hits / len(traces), 3) if traces else 0,
+        "total_ms": {"p50": _percentile(totals, 50), "p95": _percentile(totals, 95), "max": max(totals) if totals else 0},
+        "stages_ms": {
+            stage: {"count": len(v), "p50": _percentile(v, 50), "p95": _percentile(v, 95), "max": max(v)}
+            for stage, v in stage_values.items()
+        },
+        "calls": calls,
+        "estimated_cost_usd": round(cost, 4),
+        "avg_cost_per_trace_usd": round(cost / len(traces), 5) if traces else 0
+    }
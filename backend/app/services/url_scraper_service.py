@@ -8,10 +8,27 @@ from typing import Dict, Any
 from urllib.parse import urlparse, unquote, parse_qs, urlsplit, urlencode, parse_qsl
 import requests
 from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
+from app.services.browser_pool_service import get_browser_pool
+from app.services.attr_cache_service import get_attr_cache
+from app.services.cache_service import _get_env_int, _get_env_bool
+from app.services.title_normalizer_service import TitleNormalizerService
+from app.services.stage_executor import StageExecutor
+from app.services.tracing_service import record_serpapi, record_llm, current_trace
+from app.services.metrics_service import observe_call
+from app.services.io_pool import run_blocking
 
 logger = logging.getLogger(__name__)
 
+# Local title normalizer confidence (0-100) at or above which the GPT clean-up is skipped
+URL_LOCAL_CLEANUP_THRESHOLD = _get_env_int("URL_LOCAL_CLEANUP_THRESHOLD", 75) / 100
+# The paid indexed-URL lookup starts URL_SERPAPI_HEDGE_MS after the HTML fetch if that
+# hasn't answered with JSON-LD yet, so a slow site costs max(), not sum(), of the two.
+# Set to false to run it only after the HTML fetch (cheaper, but serial again).
+URL_SERPAPI_HEDGE = _get_env_bool("URL_SERPAPI_HEDGE", True)
+URL_SERPAPI_HEDGE_MS = _get_env_int("URL_SERPAPI_HEDGE_MS", 800)
+# Overall budget for resolve + metadata + lookup stages
+URL_PIPELINE_TIMEOUT = _get_env_int("URL_PIPELINE_TIMEOUT", 12)
+
 class URLScraperService:
     def __init__(self):
         try:
@@ -56,6 +73,7 @@ class URLScraperService:
         # And if `RealScraperService` was intended, it's missing.
         # I will stick to the original `self.serpapi_key` line.
         self.serpapi_key = os.environ.get("SERPAPI_API_KEY")
+        self.title_normalizer = TitleNormalizerService()
 
     def _resolve_url(self, url: str) -> str:
         """
@@ -65,12 +83,12 @@ class URLScraperService:
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
         try:
             # Use HEAD to follow redirects without downloading body
-            response = requests.head(url, allow_redirects=True, timeout=5, headers=headers)
+            response = observe_call("http", requests.head, url, allow_redirects=True, timeout=5, headers=headers)
             if response.status_code < 400:
                 logger.info(f"Resolved URL: {url} -> {response.url}")
                 return response.url
             # Fallback to GET if HEAD fails (some servers deny HEAD)
-            response = requests.get(url, allow_redirects=True, timeout=5, stream=True, headers=headers)
+            response = observe_call("http", requests.get, url, allow_redirects=True, timeout=5, stream=True, headers=headers)
             logger.info(f"Resolved URL (GET): {url} -> {response.url}")
             return response.url
         except Exception as e:
@@ -140,7 +158,7 @@ class URLScraperService:
         """
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
         try:
-            resp = requests.get(url, headers=headers, timeout=3)
+            resp = observe_call("http", requests.get, url, headers=headers, timeout=3)
             if resp.status_code >= 400: return {}
             
             soup = BeautifulSoup(resp.content, 'html.parser')
@@ -274,46 +292,17 @@ class URLScraperService:
         """
         Uses Playwright to scrape the actual title from the page DOM.
         Useful for Amazon URLs that don't have the product name in the path.
+        Runs on the shared warm browser pool instead of launching Chromium per call.
         """
         try:
             logger.info(f"DOM Scraping fallback initiated for: {url}")
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                # Desktop viewport and User-Agent to avoid mobile/accessibility views
-                context = browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                )
-                page = context.new_page()
-                
-                # Navigate
-                page.goto(url, timeout=45000, wait_until="domcontentloaded")
-                
-                title = ""
-                # Priority selectors for Amazon/Flipkart
-                selectors = ["#productTitle", "h1#title", "#title", "h1", ".B_NuCI"] # .B_NuCI is Flipkart
-                
-                for selector in selectors:
-                    try:
-                        if page.locator(selector).count() > 0:
-                            # Verify visibility or text content quality
-                            text = page.locator(selector).first.inner_text().strip()
-                            # Filter garbage
-                            if text and "keyboard shortcut" not in text.lower() and "product summary" not in text.lower():
-                                title = text
-                                break
-                    except:
-                        continue
-                
-                browser.close()
-                return title
+            # Priority selectors for Amazon/Flipkart
+            selectors = ["#productTitle", "h1#title", "#title", "h1", ".B_NuCI"] # .B_NuCI is Flipkart
+            return get_browser_pool().scrape_title(url, selectors)
         except Exception as e:
             logger.error(f"Playwright scraping failed: {e}")
             return ""
 
-    # ── Structured Attribute Extraction Cache (class-level, shared across instances) ──
-    _attr_cache: dict = {}
-
     def _extract_structured_attributes(self, title: str, image_url: str = None) -> dict:
         """
         Layer 1: Extract a full structured product representation from a title + optional image.
@@ -336,14 +325,13 @@ class URLScraperService:
 
         Uses GPT-4o-mini (text) for title parsing.
         Uses GPT-4o Vision (optional) to confirm color/pattern/length/type from image.
-        Cached by hash of title+image_url to avoid repeat API calls.
+        Cached by normalized title + image_url (bounded LRU + disk tier) to avoid repeat API calls.
         """
-        import hashlib
-
-        cache_key = hashlib.md5(f"{title}|{image_url or ''}".encode()).hexdigest()
-        if cache_key in URLScraperService._attr_cache:
+        attr_cache = get_attr_cache()
+        cached = attr_cache.get(title, image_url)
+        if cached is not None:
             logger.info(f"[StructuredExtract] Cache hit for: {title[:60]}")
-            return URLScraperService._attr_cache[cache_key]
+            return cached
 
         # ── Fallback (no OpenAI client) ───────────────────────────────────────
         if not self.client:
@@ -363,7 +351,8 @@ class URLScraperService:
                 "match_keywords": [w.lower() for w in words if len(w) > 3],
                 "source": "fallback"
             }
-            URLScraperService._attr_cache[cache_key] = fallback
+            # Memory only: don't persist degraded results across restarts
+            attr_cache.set(title, image_url, fallback, persist=False)
             return fallback
 
         # ── Step 1: GPT-4o-mini text extraction ──────────────────────────────
@@ -387,7 +376,7 @@ class URLScraperService:
             "price is always null. search_query must NOT contain the brand name."
         )
         try:
-            text_response = self.client.chat.completions.create(
+            text_response = observe_call("openai", self.client.chat.completions.create,
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -397,6 +386,7 @@ class URLScraperService:
                 max_tokens=350,
                 temperature=0
             )
+            record_llm("gpt-4o-mini", text_response)
             attrs = json.loads(text_response.choices[0].message.content)
             attrs["price"] = None  # Always null — we don't know from title
             attrs["images"] = [image_url] if image_url else []
@@ -424,7 +414,7 @@ class URLScraperService:
         # ── Step 2: GPT-4o Vision confirmation (only if image_url provided) ──
         if image_url and self.client:
             try:
-                vision_response = self.client.chat.completions.create(
+                vision_response = observe_call("openai", self.client.chat.completions.create,
                     model="gpt-4o",
                     messages=[
                         {
@@ -447,6 +437,7 @@ class URLScraperService:
                     max_tokens=120,
                     temperature=0
                 )
+                record_llm("gpt-4o", vision_response, vision=True)
                 vision_attrs = json.loads(vision_response.choices[0].message.content)
                 for key in ["color", "pattern", "length", "type"]:
                     if vision_attrs.get(key):
@@ -459,32 +450,120 @@ class URLScraperService:
             except Exception as e:
                 logger.warning(f"[StructuredExtract] Vision confirmation failed (non-critical): {e}")
 
-        URLScraperService._attr_cache[cache_key] = attrs
+        attr_cache.set(title, image_url, attrs, persist=attrs.get("source") != "fallback")
         return attrs
 
+    def warm_attribute_cache(self, titles: list, compute_missing: bool = False) -> dict:
+        """
+        Bulk-load cached attributes for frequent queries (e.g. popular SearchQuery texts).
+        With compute_missing, runs the extractor for queries not yet on disk.
+        """
+        compute = self._extract_structured_attributes if (compute_missing and self.client) else None
+        return get_attr_cache().warm(titles, compute=compute)
+
+    def _is_homepage(self, url: str) -> bool:
+        try:
+            _, u_path, _ = self._normalize_url_for_match(url)
+            return u_path in ["", "/"]
+        except Exception:
+            return False
+
+    def _lookup_indexed_url(self, clean_url: str) -> Dict[str, Any]:
+        """
+        SerpAPI lookup: check if Google has indexed this exact URL.
+        Returns {"product_name": ...} or {} if nothing useful came back.
+        """
+        params = {
+            "engine": "google",
+            "q": clean_url,
+            "api_key": self.serpapi_key,
+            "num": 2
+        }
+        search = GoogleSearch(params)
+        results = observe_call("serpapi", search.get_dict)
+        record_serpapi()
+        organic_results = results.get("organic_results", [])
+        if organic_results:
+            first_result = organic_results[0]
+            title = first_result.get("title", "")
+            snippet = first_result.get("snippet", "")
+            if title or snippet:
+                return {"product_name": title if title else snippet.split('.')[0]}
+        return {}
+
+    def _run_extraction_stages(self, url: str) -> dict:
+        """
+        Runs resolve → {html_meta, serpapi, path} concurrently via StageExecutor.
+        The paid SerpAPI stage is hedged: it waits up to URL_SERPAPI_HEDGE_MS for
+        html_meta and is skipped if JSON-LD already answered (or the URL is a
+        homepage). Its result is used whenever JSON-LD is missing. Lookups are
+        tagged on the trace, including hedges that JSON-LD made moot afterwards.
+        """
+        def _has_json_ld_name(meta) -> bool:
+            return bool(meta and (meta.get("json_ld") or {}).get("name"))
+
+        def _serpapi_stage(r):
+            clean_url = r["resolve"]
+            if self._is_homepage(clean_url) or _has_json_ld_name(r.get("html_meta")):
+                return {}
+            trace = current_trace()
+            if trace is not None:
+                trace.tags["url_serpapi"] = "hedge" if URL_SERPAPI_HEDGE else "after_html"
+            return self._lookup_indexed_url(clean_url)
+
+        pipeline = StageExecutor("url_extract")
+        pipeline.add("resolve", lambda r: self._resolve_url(url))
+        pipeline.add("html_meta", lambda r: self._extract_metadata_from_html(r["resolve"]), deps=["resolve"])
+        pipeline.add("path", lambda r: self._extract_from_url_path(r["resolve"]), deps=["resolve"])
+        if self.serpapi_key and URL_SERPAPI_HEDGE:
+            pipeline.add(
+                "serpapi", _serpapi_stage, deps=["resolve"],
+                hedge_on="html_meta", hedge_seconds=URL_SERPAPI_HEDGE_MS / 1000
+            )
+        elif self.serpapi_key:
+            # html_meta never raises (failures and timeouts come back as {}), so this always runs after it
+            pipeline.add("serpapi", _serpapi_stage, deps=["resolve", "html_meta"])
+
+        def _accept(name, value, results):
+            meta = results.get("html_meta")
+            if name == "html_meta":
+                # JSON-LD product (or a homepage) needs nothing else
+                return _has_json_ld_name(value) or self._is_homepage(results["resolve"])
+            if name == "serpapi":
+                # Indexed title is enough once HTML metadata (canonical URL) is in
+                return bool(value) and meta is not None
+            return False
+
+        run = pipeline.run(accept=_accept, timeout=URL_PIPELINE_TIMEOUT)
+        trace = current_trace()
+        if trace is not None and trace.tags.get("url_serpapi") and _has_json_ld_name(run["results"].get("html_meta")):
+            trace.tags["url_serpapi"] = "hedge_unused"  # paid for, but JSON-LD answered
+        return run
+
     def extract_product_from_url(self, url: str) -> dict:
 
         """
         Robust URL Extraction Pipeline:
         1. Resolve Redirects
-        2. HTML Metadata (Canonical/OG/JSON-LD)
-        3. Stable ID Extraction
-        4. SerpAPI (if needed)
-        5. Path Parsing Fallback
-        6. AI Clean-up
+        2. HTML Metadata (Canonical/OG/JSON-LD)     ┐
+        3. Stable ID Extraction                     │ concurrent after 1,
+        4. SerpAPI (if needed)                      │ first confident answer wins
+        5. Path Parsing Fallback                    ┘
+        6. Local title normalization, AI Clean-up only if low confidence
         """
+        # 1-5 run as a small DAG: the HTML fetch, indexed-URL lookup and path
+        # parsing only need the resolved URL, so they run concurrently and the
+        # pipeline stops as soon as the answer is confident enough.
+        run = self._run_extraction_stages(url)
+        stage_results = run["results"]
+
         # 1. Resolve Short URLs
-        clean_url = self._resolve_url(url)
+        clean_url = stage_results.get("resolve") or url
         logger.info(f"Extracting product from URL: {clean_url}")
         
         # Check for Homepage (to avoid specific "Buy X" queries)
-        is_homepage = False
-        try:
-            u_host, u_path, _ = self._normalize_url_for_match(clean_url)
-            if u_path in ["", "/"]:
-                is_homepage = True
-        except:
-             pass
+        is_homepage = self._is_homepage(clean_url)
+        u_host = self._normalize_url_for_match(clean_url)[0]
 
         extracted_info = {
             "original_url": url,
@@ -495,11 +574,13 @@ class URLScraperService:
             "product_name": "",
             "search_query": "",
             "brand": "Unknown",
-            "confidence": "low"
+            "confidence": "low",
+            "stage_timings_ms": run["timings_ms"]
         }
+        title_source = None
         
         # 2. HTML Metadata (Lightweight)
-        html_meta = self._extract_metadata_from_html(clean_url)
+        html_meta = stage_results.get("html_meta") or {}
         if html_meta.get('canonical_url'):
             extracted_info['canonical_url'] = html_meta['canonical_url']
             
@@ -509,6 +590,7 @@ class URLScraperService:
             extracted_info['search_query'] = html_meta['title'][:50]
             extracted_info['confidence'] = "medium"
             extracted_info['url_type'] = "product_page" # Heuristic: has title
+            title_source = "og"
             
         # JSON-LD is gold standard
         if html_meta.get('json_ld'):
@@ -518,6 +600,7 @@ class URLScraperService:
                 extracted_info['search_query'] = ld['name']
                 extracted_info['confidence'] = "high"
                 extracted_info['url_type'] = "product_page"
+                title_source = "json_ld"
             if ld.get('brand'):
                 branch_val = ld['brand'] if isinstance(ld['brand'], str) else ld['brand'].get('name', 'Unknown')
                 extracted_info['brand'] = branch_val
@@ -560,45 +643,50 @@ class URLScraperService:
 
         # 3. SerpAPI (Fallback if Metadata weak)
         # Skip if we already have High Confidence JSON-LD
-        if extracted_info['confidence'] != "high" and self.serpapi_key:
-            try:
-                # Optimized query: simple URL lookup first
-                params = {
-                    "engine": "google",
-                    "q": clean_url, # Check if Google has indexed this exact URL
-                    "api_key": self.serpapi_key,
-                    "num": 2
-                }
-                search = GoogleSearch(params)
-                results = search.get_dict()
-                organic_results = results.get("organic_results", [])
-                
-                if organic_results:
-                    first_result = organic_results[0]
-                    title = first_result.get("title", "")
-                    snippet = first_result.get("snippet", "")
-                    if title or snippet:
-                        # Update extracted_info
-                        extracted_info['product_name'] = title if title else snippet.split('.')[0]
-                        extracted_info['search_query'] = extracted_info['product_name']
-                        extracted_info['confidence'] = "high"
-            except Exception as e:
-                logger.warning(f"SerpAPI fallback failed: {e}")
-                pass # Fail silently, use existing data
-            except Exception as e:
-                logger.warning(f"SerpAPI fetch failed: {e}")
-                serpapi_failed = True
+        indexed = stage_results.get("serpapi") or {}
+        if extracted_info['confidence'] != "high" and indexed.get("product_name"):
+            extracted_info['product_name'] = indexed["product_name"]
+            extracted_info['search_query'] = extracted_info['product_name']
+            extracted_info['confidence'] = "high"
+            title_source = "serpapi"
+
         # 5. Fallback Path Parsing (if still empty)
         if not extracted_info['product_name']:
              # Last resort: Try to read the URL path
-             p_query, p_name = self._extract_from_url_path(clean_url)
+             p_query, p_name = stage_results.get("path") or self._extract_from_url_path(clean_url)
              extracted_info['product_name'] = p_name
              extracted_info['search_query'] = p_query
              extracted_info['confidence'] = "medium" if p_name else "low"
+             title_source = "path"
+
+        # 6a. Local Clean-up (rules: registry brand prefix, filler stripping, size/pack)
+        # Handles most JSON-LD / indexed titles without the serial LLM round-trip.
+        needs_ai_cleanup = bool(extracted_info['product_name'])
+        if extracted_info['product_name']:
+            local = self.title_normalizer.normalize(
+                extracted_info['product_name'],
+                brand_hint=extracted_info['brand'],
+                source=title_source or "title"
+            )
+            extracted_info['normalizer_confidence'] = local['confidence']
+            confident = local['confidence'] >= URL_LOCAL_CLEANUP_THRESHOLD
+            if local['product_name'] and (confident or not self.client):
+                extracted_info['product_name'] = local['product_name']
+                extracted_info['search_query'] = local['search_query']
+                if local['brand'] != "Unknown":
+                    extracted_info['brand'] = local['brand']
+                if local['size']:
+                    extracted_info['size'] = local['size']
+                if local['pack']:
+                    extracted_info['pack'] = local['pack']
+                extracted_info['cleanup'] = "rules"
+                if confident:
+                    extracted_info['confidence'] = "high"
+                    needs_ai_cleanup = False
 
-        # 6. AI Clean-up (If client available and we have a name)
+        # 6b. AI Clean-up (only when the local normalizer is unsure)
         # This step refines "dirty" titles like "BRUTON Shoes for Men Running..." to "BRUTON Shoes"
-        if self.client and extracted_info['product_name']:
+        if self.client and needs_ai_cleanup:
             try:
                 # Construct text for AI
                 text_context = f"Product Title: {extracted_info['product_name']}\nURL: {clean_url}"
@@ -607,7 +695,7 @@ class URLScraperService:
                 
                 logger.info(f"Refining with AI: {text_context}")
                 
-                ai_response = self.client.chat.completions.create(
+                ai_response = observe_call("openai", self.client.chat.completions.create,
                     model="gpt-3.5-turbo",
                     messages=[
                         {"role": "system", "content": "You are a product data cleaner. Extract/Clean: 'product_name' (concise, no filler), 'brand', 'search_query' (optimized for shopping). Return JSON."},
@@ -616,6 +704,7 @@ class URLScraperService:
                     response_format={"type": "json_object"},
                     max_tokens=200
                 )
+                record_llm("gpt-3.5-turbo", ai_response)
                 result = json.loads(ai_response.choices[0].message.content)
                 
                 if result.get('product_name'):
@@ -626,9 +715,14 @@ class URLScraperService:
                 
                 # Mark as AI refined
                 extracted_info['confidence'] = "high"
+                extracted_info['cleanup'] = "llm"
                     
             except Exception as e:
                 logger.warning(f"AI cleanup failed: {e}")
                 # Fallback to what we have
  
         return extracted_info
+
+    async def extract_product_from_url_async(self, url: str) -> dict:
+        """extract_product_from_url for async callers; the stage pipeline runs off the event loop."""
+        return await run_blocking(self.extract_product_from_url, url)
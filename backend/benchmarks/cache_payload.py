@@ -0,0 +1,138 @@
+"""
+Memory and hit-latency benchmark for cached smart search payloads.
+
+Compares the plain form (live dicts in L1, JSON in the shared tier) against
+the compact form from search_payload_codec (items deduped across tiers,
+marshal + zlib). Payloads are synthesized in the shape RealScraperService
+and SmartSearchService produce: every item appears in `online` and again in
+one match tier, with Google redirect URLs and immersive tokens.
+
+Usage (from backend/):
+    python -m benchmarks.cache_payload --queries 200 --items 40
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+import tracemalloc
+
+
+def _token(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice(string.ascii_letters + string.digits + "-_") for _ in range(n))
+
+
+def synth_response(rng: random.Random, query: str, items: int) -> dict:
+    online = []
+    for i in range(items):
+        pid = str(rng.randrange(10**18, 10**19))
+        merchant = f"https://www.{rng.choice(['amazon.in', 'flipkart.com', 'myntra.com', 'nykaa.com'])}/p/{_token(rng, 24)}"
+        online.append({
+            "id": pid,
+            "source": rng.choice(["Amazon.in", "Flipkart", "Myntra", "Nykaa"]),
+            "title": f"{query} {_token(rng, 8)} variant {i}",
+            "price": float(rng.randrange(299, 99999)),
+            "url": merchant,
+            "google_url": f"https://www.google.com/url?url={merchant}&rct=j&q=&esrc=s&opi={_token(rng, 10)}&sa=U&ved={_token(rng, 60)}&usg={_token(rng, 28)}",
+            "merchant_url": merchant,
+            "product_id": {"value": pid, "type": "google_shopping_id"},
+            "immersive_token": _token(rng, 300),
+            "image": f"https://encrypted-tbn0.gstatic.com/shopping?q=tbn:{_token(rng, 120)}",
+            "rating": round(rng.uniform(3, 5), 1),
+            "reviews": rng.randrange(0, 20000),
+            "delivery": "Free delivery",
+            "match_score": rng.randrange(0, 3000),
+            "match_reasons": ["brand_match", "title_overlap"],
+            "match_classification": rng.choice(["EXACT_MATCH", "VARIANT_MATCH", "SIMILAR"]),
+        })
+    tiers = {"EXACT_MATCH": "exact_matches", "VARIANT_MATCH": "variant_matches", "SIMILAR": "similar_matches"}
+    results = {"online": online, "local": [], "instagram": [], "exact_matches": [], "variant_matches": [], "similar_matches": []}
+    for item in online:
+        results[tiers[item["match_classification"]]].append(item)
+    return {
+        "original_query": query,
+        "query_type": "product",
+        "results": results,
+        "recommendation": {"best_value": None, "authenticity_note": "Ensure seller has good ratings.",
+                           "recommendation_text": "Found these matches based on your search."},
+        "clean_brands": [],
+    }
+
+
+def _retained_bytes(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return after - before
+
+
+def _median_us(fn, keys, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        for key in keys:
+            t0 = time.perf_counter()
+            fn(key)
+            samples.append((time.perf_counter() - t0) * 1e6)
+    return round(statistics.median(samples), 1)
+
+
+def run(queries: int, items: int, rounds: int) -> dict:
+    from app.services.cache_service import CacheService
+    from app.services.search_payload_codec import pack_search, unpack_search
+    from app.services.shared_cache_service import SharedCacheStore
+
+    rng = random.Random(42)
+    payloads = {f"search:query {i}:mumbai": synth_response(rng, f"query {i}", items) for i in range(queries)}
+    wire = {k: json.dumps(v) for k, v in payloads.items()}
+    for key, value in payloads.items():
+        assert unpack_search(pack_search(value)) == value, key
+
+    report = {"queries": queries, "items_per_query": items}
+    # Memory per cached query held in L1 (plain copies keep tiers sharing item dicts, as live responses do)
+    report["l1_plain_bytes_per_query"] = _retained_bytes(lambda: [unpack_search(pack_search(v)) for v in payloads.values()]) // queries
+    report["l1_compact_bytes_per_query"] = _retained_bytes(lambda: [pack_search(json.loads(w)) for w in wire.values()]) // queries
+    # Bytes per cached query in the shared tier
+    report["shared_json_bytes_per_query"] = sum(len(w.encode()) for w in wire.values()) // queries
+    report["shared_compact_bytes_per_query"] = sum(len(pack_search(v)) for v in payloads.values()) // queries
+
+    keys = list(payloads)
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = CacheService(shared=SharedCacheStore(os.path.join(tmp, "plain.db")), max_entries=queries)
+        compact = CacheService(shared=SharedCacheStore(os.path.join(tmp, "compact.db")), max_entries=queries)
+        compact.register_codec("search", pack_search, unpack_search)
+        for key, value in payloads.items():
+            plain.set(key, value, 3600)
+            compact.set(key, value, 3600)
+        report["l1_hit_plain_us"] = _median_us(plain.get, keys, rounds)
+        report["l1_hit_compact_us"] = _median_us(compact.get, keys, rounds)
+        plain.l1_ttl = compact.l1_ttl = 0  # every lookup goes to the shared tier
+        plain._cache.clear()
+        compact._cache.clear()
+        report["shared_hit_plain_us"] = _median_us(plain.get, keys, rounds)
+        report["shared_hit_compact_us"] = _median_us(compact.get, keys, rounds)
+    return report
+
+
+def main(argv=None):
+    import logging
+    logging.disable(logging.INFO)
+    parser = argparse.ArgumentParser(description="Cached search payload size / hit latency")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--items", type=int, default=40, help="Items in `online` per query")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args(argv)
+    report = run(args.queries, args.items, args.rounds)
+    width = max(len(k) for k in report)
+    for key, value in report.items():
+        print(f"{key:{width}s}  {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,138 @@
+"""
+Fuzzy match scoring benchmark: per-candidate loop vs BatchMatchScorer.
+
+The per-candidate baseline is the text part of _calculate_match_score as it
+was before batching (regex clean-up, substring checks and the per-series
+re.search loop for every title). Result sets are synthesized the way the
+marketplace mix returns them: 8 sub-queries of mixed listings for a watch
+query, with model-number variants, other series, straps and unrelated items.
+Both paths must produce identical scores, reasons and ranking.
+
+Usage (from backend/):
+    python -m benchmarks.match_scoring --items 800 --rounds 20
+"""
+import argparse
+import random
+import re
+import statistics
+import time
+
+_SERIES = [
+    "LEXINGTON", "BRADSHAW", "RUNWAY", "DARCI", "SOFIE", "PYPER", "PARKER", "SLIM", "RITZ",
+    "GEN 5", "GEN 6", "VANDERBILT", "EVEREST", "LAYTON", "TIBBY", "COREY", "EMERY", "SAGE", "LENNOX"
+]
+
+TARGET = {
+    "model": "MK7548",
+    "brand": "Michael Kors",
+    "fingerprint": {"collection": "LEXINGTON", "color": "ROSE GOLD", "material": "STAINLESS"},
+}
+
+
+def legacy_score(target_model, target_brand, target_fingerprint, candidate_title):
+    score = 0
+    reasons = []
+    title_upper = candidate_title.upper()
+    title_clean = re.sub(r'[^a-zA-Z0-9]', '', title_upper)
+    if target_model and (target_model in title_upper or target_model in title_clean):
+        score += 90
+        reasons.append("Model Match")
+    if target_brand and target_brand.upper() in title_upper:
+        score += 20
+        reasons.append("Brand Match")
+    if target_fingerprint.get("collection"):
+        coll = target_fingerprint["collection"].upper()
+        if coll in title_upper:
+            score += 15
+            reasons.append(f"Collection: {coll}")
+        else:
+            candidate_series = None
+            for series in _SERIES:
+                if re.search(r'(?:^|\W)' + re.escape(series) + r'(?:$|\W)', title_upper):
+                    candidate_series = series
+                    break
+            if candidate_series and candidate_series != coll:
+                score -= 30
+                reasons.append(f"Conflict: Series {candidate_series}")
+    if target_fingerprint.get("color"):
+        color = target_fingerprint["color"].upper()
+        if color in title_upper:
+            score += 10
+            reasons.append(f"Color: {color}")
+    if target_fingerprint.get("material"):
+        mat = target_fingerprint["material"].upper()
+        if mat in title_upper:
+            score += 10
+            reasons.append(f"Material: {mat}")
+    return {"score": score, "reasons": reasons}
+
+
+def synth_results(rng: random.Random, items: int) -> list:
+    brands = ["Michael Kors", "MICHAEL KORS", "Fossil", "Titan", "Casio", "Armani Exchange", ""]
+    models = ["MK7548", "MK-7548", "MK7548I", "MK6475", "MK3192", "MK4556", "FS5380", ""]
+    series = ["Lexington", "Parker", "Darci", "Slim Runway", "Gen 6", "Bradshaw", "Corey", ""]
+    colors = ["Rose Gold", "Gold", "Silver", "Black", "Two-Tone", ""]
+    extras = ["Stainless Steel", "Analog Watch for Women", "Chronograph", "Leather Strap", "Watch Strap 20mm",
+              "Replacement Band", "Gift Box", "(Pack of 1)", "- Amazon.in", "| Flipkart.com"]
+    sources = ["Amazon.in", "Flipkart", "Myntra", "Tata CLiQ", "Ajio", "Nykaa Fashion", "Official Site", "eBay"]
+    results = []
+    for _ in range(items):
+        parts = [rng.choice(brands), rng.choice(series), rng.choice(models), rng.choice(colors)]
+        parts += rng.sample(extras, rng.randrange(1, 4))
+        rng.shuffle(parts[1:])
+        results.append({"title": " ".join(p for p in parts if p), "source": rng.choice(sources)})
+    return results
+
+
+def _median_ms(fn, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1e3)
+    return round(statistics.median(samples), 3)
+
+
+def run(items: int, rounds: int) -> dict:
+    from app.services.match_scoring_service import BatchMatchScorer
+
+    results = synth_results(random.Random(42), items)
+    titles = [r["title"] for r in results]
+    sources = [r["source"] for r in results]
+    scorer = BatchMatchScorer()
+
+    def loop():
+        return [legacy_score(TARGET["model"], TARGET["brand"], TARGET["fingerprint"], t) for t in titles]
+
+    def batch():
+        return scorer.score(TARGET["model"], TARGET["brand"], TARGET["fingerprint"], titles, sources)
+
+    expected = loop()
+    scores, reasons = batch()
+    assert [e["score"] for e in expected] == scores.tolist()
+    assert [e["reasons"] for e in expected] == reasons
+    ranking = lambda s: sorted(range(items), key=lambda i: s[i], reverse=True)
+    assert ranking([e["score"] for e in expected]) == ranking(scores.tolist())
+
+    report = {"items": items}
+    report["loop_ms"] = _median_ms(loop, rounds)
+    report["batch_ms"] = _median_ms(batch, rounds)
+    report["speedup"] = round(report["loop_ms"] / report["batch_ms"], 1)
+    return report
+
+
+def main(argv=None):
+    import logging
+    logging.disable(logging.INFO)
+    parser = argparse.ArgumentParser(description="Per-candidate vs batch fuzzy match scoring")
+    parser.add_argument("--items", type=int, nargs="+", default=[200, 800, 2400])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args(argv)
+    for n in args.items:
+        report = run(n, args.rounds)
+        print("  ".join(f"{k}={v}" for k, v in report.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,229 @@
+"""
+Record/replay layer for outbound calls made by the search pipeline.
+Patches SerpAPI (SerpApiClient.get_dict), OpenAI (chat completions and
+embeddings) and `requests` at the class level, so every service instance is
+covered without changing application code.
+
+Modes:
+- record: call the real API and store the response in the fixture file
+- replay: serve responses from the fixture file only (never touches the network)
+
+Fixtures are keyed by a hash of the request (API keys stripped) and store the
+observed latency, which replay can optionally re-simulate. HTTP made from
+inside a patched SerpAPI/OpenAI call (SerpApiClient uses `requests` itself)
+is neither recorded nor counted again, and secrets are stripped from any
+URL or params that are stored.
+"""
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Callable, Dict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+from openai.resources.chat.completions import Completions
+from openai.resources.embeddings import Embeddings
+from serpapi.serp_api_client import SerpApiClient
+
+logger = logging.getLogger(__name__)
+
+_SECRET_KEYS = {"api_key", "key", "authorization"}
+
+
+class ReplayMiss(Exception):
+    """Raised in replay mode when a request has no recorded fixture."""
+
+
+def _redact_params(params: Any) -> Any:
+    if isinstance(params, dict):
+        return {k: v for k, v in params.items() if str(k).lower() not in _SECRET_KEYS}
+    if isinstance(params, (list, tuple)):
+        return [p for p in params if not (isinstance(p, (list, tuple)) and str(p[0]).lower() in _SECRET_KEYS)]
+    return params
+
+
+def _redact_url(url: str) -> str:
+    """`url` without secret query params (api_key=..., key=...)."""
+    parts = urlsplit(str(url))
+    if not parts.query:
+        return str(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in _SECRET_KEYS]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _fingerprint(kind: str, payload: Any) -> str:
+    blob = json.dumps(payload, sort_keys=True, default=str)
+    return f"{kind}:{hashlib.sha256(blob.encode()).hexdigest()[:24]}"
+
+
+class RecordReplay:
+    def __init__(self, fixture_path: str, mode: str = "replay", simulate_latency: bool = False, on_miss: str = "error"):
+        """
+        Args:
+            fixture_path: JSON file holding recorded responses
+            mode: 'record' or 'replay'
+            simulate_latency: in replay, sleep for the recorded latency
+            on_miss: in replay, 'error' raises ReplayMiss, 'empty' returns an empty response
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.fixture_path = fixture_path
+        self.mode = mode
+        self.simulate_latency = simulate_latency
+        self.on_miss = on_miss
+        self.fixtures: Dict[str, dict] = {}
+        self.calls: Dict[str, int] = {}
+        self.latency_ms: Dict[str, float] = {}
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()  # depth of patched API calls on this thread
+        if os.path.exists(fixture_path):
+            with open(fixture_path) as f:
+                self.fixtures = json.load(f)
+
+    # ── Accounting ───────────────────────────────────────────────────────
+    def _count(self, call_type: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.calls[call_type] = self.calls.get(call_type, 0) + 1
+            self.latency_ms[call_type] = round(self.latency_ms.get(call_type, 0) + elapsed_ms, 1)
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.calls = {}
+            self.latency_ms = {}
+            self.misses = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"calls": dict(self.calls), "external_ms": dict(self.latency_ms), "replay_misses": self.misses}
+
+    # ── Core ─────────────────────────────────────────────────────────────
+    def _handle(self, call_type: str, key: str, live: Callable[[], Any], encode: Callable[[Any], Any], decode: Callable[[Any], Any], empty: Callable[[], Any]):
+        if self.mode == "record":
+            t0 = time.perf_counter()
+            self._local.depth = self.inside_api_call() + 1
+            try:
+                result = live()
+            finally:
+                self._local.depth -= 1
+            elapsed = (time.perf_counter() - t0) * 1000
+            with self._lock:
+                self.fixtures[key] = {"type": call_type, "latency_ms": round(elapsed, 1), "response": encode(result)}
+            self._count(call_type, elapsed)
+            return result
+
+        entry = self.fixtures.get(key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            if self.on_miss == "error":
+                raise ReplayMiss(f"No fixture for {call_type} ({key})")
+            self._count(call_type, 0)
+            return empty()
+        if self.simulate_latency:
+            time.sleep(entry.get("latency_ms", 0) / 1000)
+        self._count(call_type, entry.get("latency_ms", 0) if self.simulate_latency else 0)
+        return decode(entry["response"])
+
+    def inside_api_call(self) -> int:
+        return getattr(self._local, "depth", 0)
+
+    def save(self) -> None:
+        if self.mode != "record":
+            return
+        os.makedirs(os.path.dirname(self.fixture_path) or ".", exist_ok=True)
+        with open(self.fixture_path, "w") as f:
+            json.dump(self.fixtures, f, indent=1, sort_keys=True)
+        logger.info(f"Saved {len(self.fixtures)} fixtures to {self.fixture_path}")
+
+    # ── Patches ──────────────────────────────────────────────────────────
+    @contextmanager
+    def active(self):
+        """Patch SerpAPI, OpenAI and requests for the duration of the block."""
+        rr = self
+        orig_get_dict = SerpApiClient.get_dict
+        orig_chat = Completions.create
+        orig_embed = Embeddings.create
+        orig_request = requests.sessions.Session.request
+
+        def get_dict(client_self):
+            params = {k: v for k, v in client_self.params_dict.items() if k not in _SECRET_KEYS}
+            return rr._handle(
+                "serpapi", _fingerprint("serpapi", params),
+                live=lambda: orig_get_dict(client_self),
+                encode=lambda r: r, decode=lambda r: r, empty=dict
+            )
+
+        def chat_create(comp_self, *args, **kwargs):
+            model = kwargs.get("model", "unknown")
+            key = _fingerprint("openai", {"model": model, "messages": kwargs.get("messages"), "format": kwargs.get("response_format")})
+            return rr._handle(
+                f"openai:{model}", key,
+                live=lambda: orig_chat(comp_self, *args, **kwargs),
+                encode=lambda r: {"content": r.choices[0].message.content,
+                                  "usage": r.usage.model_dump() if getattr(r, "usage", None) else None},
+                decode=lambda d: SimpleNamespace(
+                    choices=[SimpleNamespace(message=SimpleNamespace(content=d["content"]))],
+                    usage=SimpleNamespace(**d["usage"]) if d.get("usage") else None,
+                    model=model
+                ),
+                empty=lambda: SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="{}"))], usage=None, model=model)
+            )
+
+        def embed_create(emb_self, *args, **kwargs):
+            model = kwargs.get("model", "unknown")
+            key = _fingerprint("embeddings", {"model": model, "input": kwargs.get("input")})
+            return rr._handle(
+                f"embeddings:{model}", key,
+                live=lambda: orig_embed(emb_self, *args, **kwargs),
+                encode=lambda r: [d.embedding for d in r.data],
+                decode=lambda d: SimpleNamespace(data=[SimpleNamespace(embedding=e, index=i) for i, e in enumerate(d)]),
+                empty=lambda: SimpleNamespace(data=[])
+            )
+
+        def request(session_self, method, url, *args, **kwargs):
+            if rr.inside_api_call():
+                # Transport of a SerpAPI/OpenAI call that is already being recorded
+                return orig_request(session_self, method, url, *args, **kwargs)
+            params = kwargs.get("params", args[0] if args else None)
+            key = _fingerprint("http", {"method": method.upper(), "url": _redact_url(url), "params": _redact_params(params)})
+
+            def encode(resp):
+                return {"status": resp.status_code, "url": _redact_url(resp.url), "content": resp.text,
+                        "headers": {"Content-Type": resp.headers.get("Content-Type", "")}}
+
+            def decode(d):
+                resp = requests.Response()
+                resp.status_code = d["status"]
+                resp.url = d["url"]
+                resp._content = d["content"].encode("utf-8")
+                resp.encoding = "utf-8"
+                resp.headers.update(d.get("headers") or {})
+                return resp
+
+            def empty():
+                return decode({"status": 404, "url": _redact_url(url), "content": ""})
+
+            return rr._handle(
+                "http", key,
+                live=lambda: orig_request(session_self, method, url, *args, **kwargs),
+                encode=encode, decode=decode, empty=empty
+            )
+
+        SerpApiClient.get_dict = get_dict
+        Completions.create = chat_create
+        Embeddings.create = embed_create
+        requests.sessions.Session.request = request
+        try:
+            yield self
+        finally:
+            SerpApiClient.get_dict = orig_get_dict
+            Completions.create = orig_chat
+            Embeddings.create = orig_embed
+            requests.sessions.Session.request = orig_request
+            self.save()
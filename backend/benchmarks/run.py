@@ -0,0 +1,202 @@
+"""
+Offline benchmark for the smart search pipeline.
+
+Runs SmartSearchService.smart_search, URLScraperService.extract_product_from_url
+and the /product/compare handler over a corpus of real queries, with all
+SerpAPI / OpenAI / HTTP traffic served by the record/replay layer.
+
+Usage (from backend/):
+    # 1. Record fixtures once (needs real API keys, spends quota)
+    python -m benchmarks.run --mode record
+
+    # 2. Replay offline, write a report for this commit
+    python -m benchmarks.run --out bench_results.json
+
+    # 3. Compare against a previous report
+    python -m benchmarks.run --compare bench_baseline.json
+
+Each case reports wall time, CPU time, Python allocations (tracemalloc),
+external call counts by type and, where the pipeline exposes them, per-stage
+timings. Cache layers are cleared before each case so runs are comparable.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(BENCH_DIR, "corpus.json")
+DEFAULT_FIXTURES = os.path.join(BENCH_DIR, "fixtures", "recorded.json")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def _clear_caches():
+    from app.services.cache_service import clear_all_cache
+    from app.services.attr_cache_service import get_attr_cache
+    from app.services.semantic_cache_service import get_semantic_cache
+    from app.services.match_verdict_cache_service import get_match_verdict_cache
+    clear_all_cache()
+    get_attr_cache().clear(include_disk=False)
+    get_semantic_cache().clear()
+    get_match_verdict_cache().clear(include_disk=False)
+
+
+def _run_case(case: dict, services: dict):
+    kind = case["kind"]
+    if kind == "search":
+        return services["search"].smart_search(case["query"], case.get("location", "Mumbai"))
+    if kind == "url":
+        return services["url"].extract_product_from_url(case["url"])
+    if kind == "compare":
+        return asyncio.run(services["compare"](title=case["title"], location=case.get("location", "Mumbai"), x_debug_trace=None))
+    raise ValueError(f"Unknown case kind: {kind}")
+
+
+def _stage_timings(result, trace) -> dict:
+    if isinstance(result, dict) and result.get("stage_timings_ms"):
+        return result["stage_timings_ms"]
+    return trace.summary()["stages_ms"]
+
+
+def run_benchmark(corpus: list, recorder, repeat: int = 1) -> dict:
+    from app.services.smart_search_service import SmartSearchService
+    from app.services.url_scraper_service import URLScraperService
+    from app.main import compare_prices
+    from app.services.tracing_service import traced
+
+    services = {"search": SmartSearchService(), "url": URLScraperService(), "compare": compare_prices}
+    cases = []
+    for case in corpus:
+        label = f"{case['kind']}:{case.get('query') or case.get('url') or case.get('title')}"
+        runs = []
+        for _ in range(repeat):
+            _clear_caches()
+            recorder.reset_counters()
+            tracemalloc.start()
+            wall0, cpu0 = time.perf_counter(), time.process_time()
+            error = None
+            result = None
+            with traced("benchmark", case=label) as trace:
+                try:
+                    result = _run_case(case, services)
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+            wall_ms = (time.perf_counter() - wall0) * 1000
+            cpu_ms = (time.process_time() - cpu0) * 1000
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            runs.append({
+                "wall_ms": round(wall_ms, 1),
+                "cpu_ms": round(cpu_ms, 1),
+                "alloc_peak_kb": round(peak / 1024, 1),
+                "alloc_retained_kb": round(current / 1024, 1),
+                "stages_ms": _stage_timings(result, trace),
+                "error": error,
+                **recorder.snapshot()
+            })
+        cases.append({
+            "case": label,
+            "wall_ms": round(statistics.median(r["wall_ms"] for r in runs), 1),
+            "cpu_ms": round(statistics.median(r["cpu_ms"] for r in runs), 1),
+            "alloc_peak_kb": max(r["alloc_peak_kb"] for r in runs),
+            "calls": runs[-1]["calls"],
+            "external_ms": runs[-1]["external_ms"],
+            "stages_ms": runs[-1]["stages_ms"],
+            "replay_misses": runs[-1]["replay_misses"],
+            "error": runs[-1]["error"]
+        })
+
+    totals = {
+        "wall_ms": round(sum(c["wall_ms"] for c in cases), 1),
+        "cpu_ms": round(sum(c["cpu_ms"] for c in cases), 1),
+        "calls": {},
+        "replay_misses": sum(c["replay_misses"] for c in cases)
+    }
+    for c in cases:
+        for k, v in c["calls"].items():
+            totals["calls"][k] = totals["calls"].get(k, 0) + v
+    return {"commit": _git_commit(), "mode": recorder.mode, "repeat": repeat, "cases": cases, "totals": totals}
+
+
+def compare_reports(baseline: dict, current: dict) -> str:
+    def pct(old, new):
+        if not old:
+            return "   n/a"
+        return f"{(new - old) / old * 100:+6.1f}%"
+
+    lines = [f"Baseline {baseline.get('commit')} → current {current.get('commit')}"]
+    base_cases = {c["case"]: c for c in baseline.get("cases", [])}
+    for c in current["cases"]:
+        b = base_cases.get(c["case"])
+        if not b:
+            lines.append(f"  {c['case'][:50]:50s}  (new case)")
+            continue
+        lines.append(
+            f"  {c['case'][:50]:50s}  wall {pct(b['wall_ms'], c['wall_ms'])}  cpu {pct(b['cpu_ms'], c['cpu_ms'])}  "
+            f"alloc {pct(b['alloc_peak_kb'], c['alloc_peak_kb'])}  calls {sum(b['calls'].values())}→{sum(c['calls'].values())}"
+        )
+    bt, ct = baseline["totals"], current["totals"]
+    lines.append(f"  {'TOTAL':50s}  wall {pct(bt['wall_ms'], ct['wall_ms'])}  cpu {pct(bt['cpu_ms'], ct['cpu_ms'])}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline smart search benchmark")
+    parser.add_argument("--mode", choices=["record", "replay"], default="replay")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--simulate-latency", action="store_true", help="Replay recorded upstream latency")
+    parser.add_argument("--on-miss", choices=["error", "empty"], default="error",
+                        help="error: fail the case on an unrecorded call; empty: serve an empty response")
+    parser.add_argument("--out", help="Write JSON report here")
+    parser.add_argument("--compare", help="Baseline JSON report to diff against")
+    args = parser.parse_args(argv)
+
+    if args.mode == "replay":
+        # Services only build API clients when keys are present; replay never uses them
+        os.environ.setdefault("OPENAI_API_KEY", "replay")
+        os.environ.setdefault("SERPAPI_API_KEY", "replay")
+    # Keep benchmark runs off the host's persistent state: _clear_caches() would wipe the
+    # shared cache tier the workers serve from, and searches write to the app database
+    scratch = tempfile.TemporaryDirectory(prefix="bench_")
+    os.environ.setdefault("CACHE_SHARED_PATH", os.path.join(scratch.name, "shared_cache.db"))
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(scratch.name, 'bench.db')}")
+    os.environ.setdefault("ATTR_CACHE_PATH", "")
+    os.environ.setdefault("MATCH_VERDICT_CACHE_PATH", "")
+    # Query embeddings for the semantic cache aren't part of the recorded fixtures
+    os.environ.setdefault("SEMANTIC_CACHE_EMBEDDER", "hashing")
+
+    from benchmarks.replay import RecordReplay
+    recorder = RecordReplay(args.fixtures, mode=args.mode, simulate_latency=args.simulate_latency, on_miss=args.on_miss)
+    with scratch, recorder.active():
+        report = run_benchmark(json.load(open(args.corpus)), recorder, repeat=1 if args.mode == "record" else args.repeat)
+
+    for c in report["cases"]:
+        calls = ", ".join(f"{k}={v}" for k, v in sorted(c["calls"].items())) or "-"
+        print(f"{c['case'][:55]:55s} wall={c['wall_ms']:8.1f}ms cpu={c['cpu_ms']:8.1f}ms peak={c['alloc_peak_kb']:8.1f}KB calls[{calls}]"
+              + (f" ERROR {c['error']}" if c["error"] else ""))
+    print(f"TOTAL wall={report['totals']['wall_ms']}ms cpu={report['totals']['cpu_ms']}ms calls={report['totals']['calls']} misses={report['totals']['replay_misses']}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        print(compare_reports(json.load(open(args.compare)), report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+import os
+import tempfile
+from unittest import mock
+
+from app.services.cache_service import CacheService
+from app.services.search_payload_codec import pack_search, unpack_search
+from app.services.shared_cache_service import SharedCacheStore
+
+
+def use_temp_cache(test_case) -> CacheService:
+    """
+    Install a CacheService backed by a throwaway SharedCacheStore as the
+    get_cache() singleton for the rest of `test_case`, so tests never touch
+    the host's shared_cache.db. Undone by the test's cleanups.
+    """
+    tmpdir = tempfile.TemporaryDirectory()
+    test_case.addCleanup(tmpdir.cleanup)
+    cache = CacheService(shared=SharedCacheStore(os.path.join(tmpdir.name, "shared.db")))
+    cache.register_codec("search", pack_search, unpack_search)
+    patcher = mock.patch("app.services.cache_service._cache_instance", cache)
+    patcher.start()
+    test_case.addCleanup(patcher.stop)
+    return cache
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from app.services.attr_cache_service import AttributeCache
+
+class TestAttributeCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "attr_cache.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_lru_evicts_oldest(self):
+        cache = AttributeCache(max_entries=2, path=None)
+        cache.set("a", None, {"brand": "A"})
+        cache.set("b", None, {"brand": "B"})
+        cache.get("a")  # a becomes most recent
+        cache.set("c", None, {"brand": "C"})
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {"brand": "A"})
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_key_normalizes_title(self):
+        cache = AttributeCache(path=None)
+        cache.set("Michael  Kors Lexington", "img.jpg", {"brand": "Michael Kors"})
+        self.assertIsNotNone(cache.get("michael kors lexington", "img.jpg"))
+        self.assertIsNone(cache.get("michael kors lexington"))
+
+    def test_disk_tier_survives_restart(self):
+        AttributeCache(path=self.path).set("fabindia kurta", None, {"brand": "Fabindia"})
+        AttributeCache(path=self.path).set("degraded", None, {"source": "fallback"}, persist=False)
+
+        fresh = AttributeCache(path=self.path)
+        self.assertEqual(fresh.get("fabindia kurta"), {"brand": "Fabindia"})
+        self.assertIsNone(fresh.get("degraded"))
+        stats = fresh.stats()
+        self.assertEqual(stats["disk_hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_warm_loads_and_computes(self):
+        AttributeCache(path=self.path).set("on disk", None, {"brand": "X"})
+        cache = AttributeCache(path=self.path)
+        computed = []
+        result = cache.warm(["on disk", "new query"], compute=computed.append)
+
+        self.assertEqual(result, {"loaded": 1, "computed": 1, "missing": 0})
+        self.assertEqual(computed, ["new query"])
+        self.assertEqual(cache.stats()["size"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import asyncio
+import concurrent.futures
+import sys
+import types
+import unittest
+from unittest import mock
+
+from app.services import browser_pool_service
+from app.services.browser_pool_service import BrowserPoolService
+
+PRODUCT_URL = "https://shop.example/p/blue-kurta"
+
+
+class _PlaywrightTimeout(Exception):
+    pass
+
+
+class _FakeLocator:
+    def __init__(self, texts):
+        self.texts = texts
+        self.first = self
+
+    async def count(self):
+        return len(self.texts)
+
+    async def inner_text(self):
+        return self.texts[0]
+
+
+class _FakePage:
+    async def goto(self, url, timeout, wait_until):
+        if url.endswith("/timeout"):
+            raise _PlaywrightTimeout(f"Timeout {timeout}ms exceeded")
+        if url.endswith("/hang"):
+            await asyncio.sleep(30)
+
+    def locator(self, selector):
+        return _FakeLocator(["  Blue Kurta "] if selector == "#title" else [])
+
+    async def close(self):
+        pass
+
+
+class _FakeContext:
+    def __init__(self):
+        self.routes = []
+        self.pages = 0
+        self.closed = False
+
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+    async def new_page(self):
+        self.pages += 1
+        return _FakePage()
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    async def new_context(self, **kwargs):
+        self.contexts.append(_FakeContext())
+        return self.contexts[-1]
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakePlaywright:
+    def __init__(self):
+        self.browsers = []
+        self.stopped = False
+        self.chromium = self
+
+    async def start(self):
+        return self
+
+    async def launch(self, headless):
+        self.browsers.append(_FakeBrowser())
+        return self.browsers[-1]
+
+    async def stop(self):
+        self.stopped = True
+
+
+class _FakeRoute:
+    def __init__(self, resource_type):
+        self.request = types.SimpleNamespace(resource_type=resource_type)
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = "abort"
+
+    async def continue_(self):
+        self.outcome = "continue"
+
+
+class TestBrowserPool(unittest.TestCase):
+    def setUp(self):
+        self.playwright = _FakePlaywright()
+        async_api = types.ModuleType("playwright.async_api")
+        async_api.async_playwright = lambda: self.playwright
+        patcher = mock.patch.dict(sys.modules, {"playwright": types.ModuleType("playwright"),
+                                                "playwright.async_api": async_api})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = BrowserPoolService(pool_size=1)
+        self.addCleanup(self.pool.shutdown)
+
+    def _contexts(self):
+        return [c for b in self.playwright.browsers for c in b.contexts]
+
+    def test_contexts_are_reused_then_recycled(self):
+        with mock.patch.object(browser_pool_service, "BROWSER_PAGES_PER_CONTEXT", 2):
+            titles = [self.pool.scrape_title(PRODUCT_URL, ["h1", "#title"]) for _ in range(5)]
+        self.assertEqual(titles, ["Blue Kurta"] * 5)
+        self.assertEqual([c.pages for c in self._contexts()], [2, 2, 1])
+        self.assertEqual([c.closed for c in self._contexts()], [True, True, False])
+        self.assertEqual(self.pool.stats()["context_recycles"], 2)
+        self.assertEqual(self.pool.stats()["browser_launches"], 1)
+
+    def test_browser_is_relaunched_after_its_page_budget(self):
+        with mock.patch.object(browser_pool_service, "BROWSER_PAGES_PER_BROWSER", 2):
+            for _ in range(3):
+                self.pool.scrape_title(PRODUCT_URL, ["#title"])
+        self.assertEqual(len(self.playwright.browsers), 2)
+        self.assertTrue(self.playwright.browsers[0].closed)
+        self.assertEqual(self.pool.stats()["generation"], 2)
+
+    def test_heavy_resources_are_blocked(self):
+        self.pool.scrape_title(PRODUCT_URL, ["#title"])
+        [(pattern, handler)] = self._contexts()[0].routes
+        self.assertEqual(pattern, "**/*")
+
+        routes = {kind: _FakeRoute(kind) for kind in ["image", "font", "media", "document", "script"]}
+        for route in routes.values():
+            asyncio.run(handler(route))
+        self.assertEqual({kind: r.outcome for kind, r in routes.items()}, {
+            "image": "abort", "font": "abort", "media": "abort", "document": "continue", "script": "continue"})
+        self.assertEqual(self.pool.stats()["blocked_requests"], 3)
+
+    def test_navigation_timeout_discards_the_context(self):
+        with self.assertRaises(_PlaywrightTimeout):
+            self.pool.scrape_title("https://shop.example/timeout", ["#title"])
+        self.assertEqual(self.pool.stats()["errors"], 1)
+        self.assertTrue(self._contexts()[0].closed)
+
+        self.assertEqual(self.pool.scrape_title(PRODUCT_URL, ["#title"]), "Blue Kurta")
+        self.assertEqual(len(self._contexts()), 2)
+
+    def test_caller_timeout_frees_the_slot(self):
+        with self.assertRaises(concurrent.futures.TimeoutError):
+            self.pool._submit(self.pool._scrape_title("https://shop.example/hang", ["#title"], 1000), timeout=0.2)
+        # pool_size=1: this would block forever if the cancelled scrape kept its slot
+        self.assertEqual(self.pool.scrape_title(PRODUCT_URL, ["#title"], timeout_ms=1000), "Blue Kurta")
+
+    def test_shutdown_closes_browser_and_stops_thread(self):
+        self.pool.scrape_title(PRODUCT_URL, ["#title"])
+        self.pool.shutdown()
+        self.assertTrue(self.playwright.browsers[0].closed)
+        self.assertTrue(self._contexts()[0].closed)
+        self.assertTrue(self.playwright.stopped)
+        self.assertFalse(self.pool.stats()["running"])
+        self.pool.shutdown()  # idempotent
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from unittest import mock
+
+from app.services import cache_warmer_service
+from app.services.cache_service import cache_search
+from app.services.cache_warmer_service import CacheWarmerService
+from app.services.tracing_service import record_serpapi
+from _cache_fixture import use_temp_cache
+
+
+class _StubScraper:
+    def online_location(self, location=None):
+        return "Mumbai, Maharashtra, India"
+
+
+class _StubSearcher:
+    scraper = _StubScraper()
+
+    def __init__(self):
+        self.calls = []
+
+    def _cache_query(self, query):
+        return query
+
+    def smart_search(self, query, refresh=False):
+        self.calls.append((query, refresh))
+        for _ in range(8):
+            record_serpapi()
+        cache_search(query, self.scraper.online_location(), {"original_query": query})
+        return {"original_query": query}
+
+
+class _StubGraph:
+    def get_popular_searches(self, db, limit):
+        return [{"term": t, "count": 10} for t in ["nike air jordan", "fabindia kurta", "boat airdopes"]]
+
+    def get_trending_searches(self, db, hours, limit):
+        return [{"term": "Nike  Air Jordan", "count": 4}, {"term": "mamaearth onion oil", "count": 3}]
+
+
+class TestCacheWarmer(unittest.TestCase):
+    def setUp(self):
+        self.cache = use_temp_cache(self)
+        self.store = self.cache.shared
+        self.searcher = _StubSearcher()
+        self.warmer = CacheWarmerService(self.searcher, _StubGraph(), session_factory=mock.MagicMock)
+
+    def test_warms_missing_queries_within_budget_then_skips_fresh_ones(self):
+        with mock.patch.object(cache_warmer_service, "CACHE_WARM_SERPAPI_PER_HOUR", 24):
+            first = self.warmer.run_once()
+            self.assertEqual(first["warmed"], 3)  # 3 x 8 SerpAPI calls fills the budget
+            self.assertEqual(first["over_budget"], 1)
+            self.assertEqual(self.warmer.warm_set, ["nike air jordan", "fabindia kurta", "boat airdopes", "mamaearth onion oil"])
+            self.assertTrue(all(refresh for _, refresh in self.searcher.calls))
+            self.assertEqual(self.warmer.stats()["spent_last_hour"]["serpapi"], 24)
+
+        second = self.warmer.run_once()  # already-warm queries aren't re-run
+        self.assertEqual(second["warmed"], 1)
+        self.assertEqual(self.searcher.calls[-1][0], "mamaearth onion oil")
+
+    def test_entries_near_expiry_are_rewarmed(self):
+        self.warmer.run_once()
+        cache_search("fabindia kurta", "Mumbai, Maharashtra, India", {"original_query": "x"}, ttl=60)
+        self.searcher.calls.clear()
+        self.warmer.run_once()
+        self.assertEqual([q for q, _ in self.searcher.calls], ["fabindia kurta"])
+
+    def test_only_one_worker_holds_the_lease(self):
+        self.assertTrue(self.store.try_lease("cache_warmer", "host:1", 60))
+        self.assertTrue(self.store.try_lease("cache_warmer", "host:1", 60))
+        self.assertFalse(self.store.try_lease("cache_warmer", "host:2", 60))
+        self.assertEqual(self.warmer.run_once()["warmed"], 0)
+
+    def test_lease_is_renewed_between_searches(self):
+        smart_search = self.searcher.smart_search
+
+        def slow_search(query, refresh=False):
+            # The pass has outlived the lease TTL; another worker tries to take over
+            taken.append(self.store.try_lease("cache_warmer", "host:2", 60))
+            return smart_search(query, refresh)
+
+        taken = []
+        self.searcher.smart_search = slow_search
+        with mock.patch.object(cache_warmer_service, "_LEASE_TTL", 0):
+            self.assertEqual(self.warmer.run_once()["warmed"], 1)
+        self.assertEqual(taken, [True])  # lease lost, so the pass stopped instead of running twice
+
+        self.store.try_lease("cache_warmer", "host:2", -1)  # host:2 lets it lapse
+        self.assertEqual(self.warmer.run_once()["warmed"], 3)
+        self.assertFalse(self.store.try_lease("cache_warmer", "host:2", 60))
+
+
+if __name__ == "__main__":
+    unittest.main()
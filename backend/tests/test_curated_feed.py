@@ -0,0 +1,110 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from app.services import curated_feed_service
+from app.services.curated_feed_service import CuratedFeedService
+from _cache_fixture import use_temp_cache
+
+
+class _SlowScraper:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def search_products(self, query):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return {"online": [{"title": f"{query} item", "price": 299, "rating": 4.6, "reviews": 120}]}
+
+
+class _DownScraper:
+    def __init__(self):
+        self.calls = 0
+
+    def search_products(self, query):
+        self.calls += 1
+        raise RuntimeError("SerpAPI quota exceeded")
+
+
+class TestCuratedFeed(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        use_temp_cache(self)
+        self._orig_file = curated_feed_service.CACHE_FILE
+        curated_feed_service.CACHE_FILE = os.path.join(self.tmpdir, "feed.json")
+        self.service = CuratedFeedService()
+        self.service.scraper = _SlowScraper()
+
+    def tearDown(self):
+        # Let any background refresh finish before CACHE_FILE points back at the real file
+        self.service._refresh_lock.acquire(timeout=5)
+        self.service._refresh_lock.release()
+        curated_feed_service.CACHE_FILE = self._orig_file
+
+    def test_refresh_fetches_concurrently_and_swaps_file(self):
+        self.assertTrue(self.service.refresh())
+        self.assertGreater(self.service.scraper.peak, 1)
+        with open(curated_feed_service.CACHE_FILE) as f:
+            data = json.load(f)
+        self.assertEqual(len(data["feed"]), 11)  # 3-2-2-3 slots + wildcard
+        self.assertEqual(os.listdir(self.tmpdir), ["feed.json"])  # no temp files left behind
+
+    def test_stale_feed_is_served_while_refreshing(self):
+        with open(curated_feed_service.CACHE_FILE, "w") as f:
+            json.dump({"timestamp": 0, "feed": [{"title": "old"}]}, f)
+        self.service.scraper.delay = 0.3
+        started = time.perf_counter()
+        feed = self.service.get_landing_feed()
+        self.assertLess(time.perf_counter() - started, 0.2)
+        self.assertEqual(feed, [{"title": "old"}])
+
+    def test_one_worker_refreshes_and_failures_back_off(self):
+        other = CuratedFeedService()
+        other._owner = "other-host:1"
+        other.scraper = _SlowScraper()
+        self.service.scraper = _DownScraper()
+
+        self.assertFalse(self.service.refresh())
+        failed_calls = self.service.scraper.calls
+        self.assertEqual(failed_calls, 12)
+
+        # Requests seeing the missing feed don't retry during the backoff...
+        for _ in range(5):
+            self.service.get_landing_feed()
+        self.assertEqual(self.service.scraper.calls, failed_calls)
+        # ...and neither does another worker, while the failed refresh holds the lease
+        self.assertFalse(other.refresh())
+        self.assertEqual(other.scraper.active + other.scraper.peak, 0)
+
+        self.service._retry_after = 0
+        self.service.scraper = _SlowScraper()
+        self.assertTrue(self.service.refresh())
+        self.assertEqual(len(other.get_landing_feed()), 11)  # picked up from the file
+
+    def test_snapshot_reloads_only_when_file_changes(self):
+        path = curated_feed_service.CACHE_FILE
+        with open(path, "w") as f:
+            json.dump({"timestamp": time.time(), "feed": [{"title": "a"}]}, f)
+        first = self.service.get_landing_snapshot()
+        self.assertIs(self.service.get_landing_snapshot(), first)
+        self.assertEqual(json.loads(first.body), {"feed": [{"title": "a"}]})
+
+        with open(path, "w") as f:
+            json.dump({"timestamp": time.time(), "feed": [{"title": "b"}, {"title": "c"}]}, f)
+        second = self.service.get_landing_snapshot()
+        self.assertEqual(len(second.feed), 2)
+        self.assertNotEqual(second.etag, first.etag)
+
+
+if __name__ == "__main__":
+    unittest.main()
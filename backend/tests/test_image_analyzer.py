@@ -0,0 +1,93 @@
+import asyncio
+import io
+import unittest
+
+from PIL import Image, ImageDraw
+
+from app.services.image_analyzer_service import ImageAnalyzerService, preprocess_image, IMAGE_MAX_DIMENSION
+from app.services.image_cache_service import get_image_cache
+from _cache_fixture import use_temp_cache
+
+
+def _photo(size=(800, 600)):
+    img = Image.new("RGB", size, (240, 240, 240))
+    draw = ImageDraw.Draw(img)
+    w, h = size
+    for i in range(8):
+        draw.rectangle([i * w // 8, (i % 3) * h // 4, (i + 1) * w // 8, h - (i % 2) * h // 3], fill=(30 * i, 200 - 20 * i, 90))
+    return img
+
+
+def _garment(fill, size=(800, 600)):
+    """Same layout in a given colour; red (255,0,0) and blue (0,81,250) have the same luminance."""
+    img = Image.new("RGB", size, (240, 240, 240))
+    draw = ImageDraw.Draw(img)
+    w, h = size
+    for i in range(8):
+        shade = fill if i % 2 else (30 * i,) * 3
+        draw.rectangle([i * w // 8, (i % 3) * h // 4, (i + 1) * w // 8, h - (i % 2) * h // 3], fill=shade)
+    return img
+
+
+def _encode(img, fmt="PNG", **kwargs):
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **kwargs)
+    return buf.getvalue()
+
+
+class TestImageAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.cache = use_temp_cache(self)
+        get_image_cache().clear()
+        self.service = ImageAnalyzerService()
+        self.calls = []
+
+        def fake_analyze(b64):
+            self.calls.append(b64)
+            return {"search_query": "striped poster", "confidence": "high"}
+
+        self.service.analyze_product_image = fake_analyze
+
+    def test_preprocess_downscales_to_jpeg(self):
+        out = preprocess_image(_encode(Image.new("RGBA", (3000, 2000), (200, 30, 30, 128))))
+        img = Image.open(io.BytesIO(out))
+        self.assertEqual(img.format, "JPEG")
+        self.assertEqual(img.mode, "RGB")
+        self.assertEqual(max(img.size), IMAGE_MAX_DIMENSION)
+
+    def test_repeat_upload_skips_vision_call(self):
+        raw = _encode(_photo())
+        first = asyncio.run(self.service.analyze_image_bytes_async(raw))
+        second = self.service.analyze_image_bytes(raw)
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_near_duplicate_reuses_analysis_and_linked_search(self):
+        original = self.service.analyze_image_bytes(_encode(_photo((1600, 1200))))
+        get_image_cache().link_search(original["image_hash"], "Mumbai", {"results": {"online": []}})
+
+        recompressed = _encode(_photo((1600, 1200)).resize((700, 525)), "JPEG", quality=60)
+        again = self.service.analyze_image_bytes(recompressed)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(again["image_hash"], original["image_hash"])
+        self.assertIsNotNone(get_image_cache().get_search(again["image_hash"], "mumbai"))
+        self.assertIsNone(get_image_cache().get_search(again["image_hash"], "Delhi"))
+
+        # Linked in the shared tier, packed by the search codec, so other workers reuse it
+        stored, _ = self.cache.shared.get(get_image_cache()._search_key(original["image_hash"], "Mumbai"))
+        self.assertIsInstance(stored, bytes)
+
+    def test_colour_variants_are_not_near_duplicates(self):
+        red = self.service.analyze_image_bytes(_encode(_garment((255, 0, 0))))
+        blue = self.service.analyze_image_bytes(_encode(_garment((0, 81, 250))))
+        self.assertEqual(len(self.calls), 2)
+        self.assertNotEqual(blue["image_hash"], red["image_hash"])
+
+        # A recompressed copy of the red one still hits the red entry
+        again = self.service.analyze_image_bytes(_encode(_garment((255, 0, 0)).resize((600, 450)), "JPEG", quality=60))
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(again["image_hash"], red["image_hash"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import asyncio
+import contextvars
+import threading
+import unittest
+
+from app.services.io_pool import TrackedPool, run_blocking
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+
+class TestTrackedPool(unittest.TestCase):
+    def test_counts_busy_waiting_and_cancelled(self):
+        pool = TrackedPool(1, "test")
+        release = threading.Event()
+        started = threading.Event()
+
+        running = pool.submit(lambda: started.set() or release.wait(5))
+        started.wait(5)
+        queued = pool.submit(lambda: "later")
+        cancelled = pool.submit(lambda: "never")
+        self.assertEqual(pool.stats(), {"workers": 1, "busy": 1, "waiting": 2, "submitted": 3})
+
+        self.assertTrue(cancelled.cancel())
+        self.assertEqual(pool.stats()["waiting"], 1)
+
+        release.set()
+        self.assertTrue(running.result(5))
+        self.assertEqual(queued.result(5), "later")
+        self.assertEqual(pool.stats(), {"workers": 1, "busy": 0, "waiting": 0, "submitted": 3})
+
+    def test_run_blocking_carries_context(self):
+        async def call():
+            _request_id.set("req-1")
+            return await run_blocking(_request_id.get)
+
+        self.assertEqual(asyncio.run(call()), "req-1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import random
+import unittest
+
+from app.services.llm_gate_service import LLMGate
+from app.services.scraper_service import RealScraperService
+from app.services.smart_search_service import SmartSearchService
+from _cache_fixture import use_temp_cache
+
+
+def _candidates(*scores, model=False):
+    return [{"match_score": s, "match_reasons": ["Model Match"] if model else []} for s in scores]
+
+
+class _WatchScraper(RealScraperService):
+    def search_products(self, query):
+        titles = ["Michael Kors MK7548 Lexington", "Michael Kors MK-7548 Rose Gold", "MK7548I Michael Kors Watch"]
+        return {"online": [{"title": t, "source": "Stub", "price": 100, "url": f"https://stub.example/{query}/{i}"}
+                           for i, t in enumerate(titles)], "local": []}
+
+
+class TestLLMGate(unittest.TestCase):
+    def setUp(self):
+        self.gate = LLMGate(enabled=True, high_score=90, min_model_matches=3, low_score=30, audit_percent=0)
+
+    def test_decisive_scores_skip(self):
+        high = _candidates(110, 110, 90, 20, model=True)
+        self.assertEqual(self.gate.decide(high, [110, 110, 90, 20])["reason"], "high")
+        self.assertEqual(self.gate.decide(_candidates(25, 10), [25, 10])["reason"], "low")
+
+        ambiguous = self.gate.decide(_candidates(90, 90, 55, model=True), [90, 90, 55])
+        self.assertEqual(ambiguous, {"skip": False, "reason": None, "audit": False})
+        self.assertFalse(self.gate.decide(_candidates(95, 95, 95), [95, 95, 95])["skip"])  # no model number
+
+        stats = self.gate.stats()
+        self.assertEqual((stats["skipped_high"], stats["skipped_low"], stats["called"]), (1, 1, 2))
+        self.assertEqual(stats["skip_rate"], 0.5)
+
+    def test_audit_measures_disagreement(self):
+        gate = LLMGate(enabled=True, audit_percent=100, rng=random.Random(0))
+        decision = gate.decide(_candidates(20, 10), [20, 10])
+        self.assertTrue(decision["skip"] and decision["audit"])
+
+        self.assertFalse(gate.record_audit(decision, [20, 10], {0: {"classification": "SIMILAR"}}))
+        self.assertTrue(gate.record_audit(decision, [20, 10], {1: {"classification": "VARIANT"}}))
+        stats = gate.stats()
+        self.assertEqual((stats["audit_disagreed"], stats["audit_candidates_changed"]), (1, 1))
+
+    def test_search_skips_llm_on_model_matches(self):
+        use_temp_cache(self)
+        service = SmartSearchService()
+        service.scraper = _WatchScraper()
+        service.llm_gate = self.gate
+        service._get_client = lambda: object()
+        calls = []
+        service._llm_score_matches = lambda attrs, top: calls.append(len(top)) or {}
+
+        result = service.smart_search("Michael Kors MK7548")
+        self.assertEqual(calls, [])
+        self.assertTrue(all(i["match_classification"] == "EXACT_MATCH" for i in result["results"]["online"]))
+        self.assertEqual(self.gate.stats()["skipped_high"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
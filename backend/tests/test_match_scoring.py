@@ -0,0 +1,43 @@
+import random
+import unittest
+
+from app.services.match_scoring_service import BatchMatchScorer
+from app.services.smart_search_service import SmartSearchService
+from benchmarks.match_scoring import TARGET, legacy_score, synth_results
+
+
+class TestMatchScoring(unittest.TestCase):
+    def setUp(self):
+        self.scorer = BatchMatchScorer()
+        self.results = synth_results(random.Random(7), 400)
+        self.titles = [r["title"] for r in self.results]
+        self.sources = [r["source"] for r in self.results]
+
+    def test_batch_matches_per_candidate_scores_and_ranking(self):
+        targets = [
+            (TARGET["model"], TARGET["brand"], TARGET["fingerprint"]),
+            (None, "Fossil", {"collection": "GEN 6", "color": "SILVER", "material": None}),
+            (None, None, {}),
+        ]
+        for model, brand, fingerprint in targets:
+            expected = [legacy_score(model, brand, fingerprint, t) for t in self.titles]
+            scores, reasons = self.scorer.score(model, brand, fingerprint, self.titles, self.sources)
+            self.assertEqual(scores.tolist(), [e["score"] for e in expected])
+            self.assertEqual(reasons, [e["reasons"] for e in expected])
+
+    def test_weights_are_configurable(self):
+        scorer = BatchMatchScorer(weights={"brand": 5, "trusted": 7})
+        scores, reasons = scorer.score(None, "Michael Kors", {}, ["Michael Kors Parker", "Parker"],
+                                       ["Official Site", "Amazon.in"])
+        self.assertEqual(scores.tolist(), [12, 0])
+        self.assertEqual(reasons[0], ["Brand Match", "Trusted Source"])
+
+    def test_single_candidate_wrapper(self):
+        service = SmartSearchService()
+        calc = service._calculate_match_score("MK7548", "Michael Kors", {"collection": "LEXINGTON"},
+                                              "Michael Kors Parker MK-7548 Watch", "Amazon.in")
+        self.assertEqual(calc, {"score": 80, "reasons": ["Model Match", "Brand Match", "Conflict: Series PARKER"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import os
+import re
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from app.services.match_verdict_cache_service import MatchVerdictCache
+from app.services.smart_search_service import SmartSearchService
+
+SOURCE = {"brand": "Michael Kors", "category": "Watch", "color": "Rose Gold", "match_keywords": ["lexington"]}
+
+
+class _FakeClient:
+    """Classifies every prompt line as EXACT and records the prompts it saw."""
+
+    def __init__(self):
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        prompt = kwargs["messages"][-1]["content"]
+        self.prompts.append(prompt)
+        ids = [int(n) for n in re.findall(r"^(\d+)\. ", prompt, re.M)]
+        content = json.dumps([{"id": i, "classification": "EXACT", "confidence": 0.9, "reason": "r"} for i in ids])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+class TestMatchVerdictCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "match_verdicts.db")
+        self.service = SmartSearchService()
+        self.service.verdict_cache = MatchVerdictCache(path=self.path)
+        self.client = _FakeClient()
+        self.service._get_client = lambda: self.client
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _candidates(self, *titles):
+        return [{"title": t, "source": "Amazon.in", "price": 100 + i} for i, t in enumerate(titles)]
+
+    def test_only_uncached_candidates_are_sent(self):
+        first = self.service._llm_score_matches(SOURCE, self._candidates("MK Lexington A", "MK Lexington B"))
+        self.assertEqual(sorted(first), [0, 1])
+
+        # Same listings at new prices, plus one new listing in the middle
+        second = self.service._llm_score_matches(SOURCE, self._candidates("MK Lexington A", "MK Parker C", "MK Lexington B"))
+        self.assertEqual(list(second), [0, 1, 2])
+        self.assertEqual(len(self.client.prompts), 2)
+        self.assertIn("1. [Amazon.in] MK Parker C", self.client.prompts[1])
+        self.assertNotIn("Lexington A", self.client.prompts[1])
+
+        self.service._llm_score_matches(SOURCE, self._candidates("MK Lexington B", "MK Parker C"))
+        self.assertEqual(len(self.client.prompts), 2)  # fully cached, no call
+
+        # A different source product is a different verdict
+        self.service._llm_score_matches({**SOURCE, "color": "Silver"}, self._candidates("MK Lexington A"))
+        self.assertEqual(len(self.client.prompts), 3)
+
+    def test_disk_tier_is_shared(self):
+        candidates = self._candidates("Fossil Gen 6")
+        MatchVerdictCache(path=self.path).set_many(SOURCE, {0: {"classification": "VARIANT", "confidence": 0.7, "reason": ""}}, candidates)
+
+        other = MatchVerdictCache(path=self.path)
+        self.assertEqual(other.get_many(SOURCE, candidates)[0]["classification"], "VARIANT")
+        self.assertEqual(other.stats()["disk_hits"], 1)
+        self.assertEqual(other.get_many(SOURCE, self._candidates("Fossil Gen 5")), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
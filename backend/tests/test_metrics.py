@@ -0,0 +1,36 @@
+import unittest
+
+from app.services.metrics_service import MetricsRegistry, observe_call, OUTBOUND_ERRORS, OUTBOUND_SECONDS
+
+
+class TestMetrics(unittest.TestCase):
+    def test_text_exposition(self):
+        registry = MetricsRegistry()
+        hits = registry.counter("unit_hits_total", "Hits", ("layer",))
+        latency = registry.histogram("unit_latency_seconds", "Latency", buckets=(0.1, 1.0))
+        hits.inc(layer="search")
+        hits.inc(2, layer="search")
+        latency.observe(0.05)
+        latency.observe(0.5)
+        text = registry.render()
+        self.assertIn("# TYPE unit_hits_total counter", text)
+        self.assertIn('unit_hits_total{layer="search"} 3', text)
+        self.assertIn('unit_latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('unit_latency_seconds_bucket{le="1"} 2', text)
+        self.assertIn('unit_latency_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn("unit_latency_seconds_count 2", text)
+
+    def test_observe_call_counts_errors(self):
+        def boom():
+            raise ValueError("down")
+
+        before = OUTBOUND_SECONDS.count(target="unit_target")
+        with self.assertRaises(ValueError):
+            observe_call("unit_target", boom)
+        self.assertEqual(observe_call("unit_target", lambda x: x * 2, 21), 42)
+        self.assertEqual(OUTBOUND_ERRORS.value(target="unit_target"), 1)
+        self.assertEqual(OUTBOUND_SECONDS.count(target="unit_target"), before + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
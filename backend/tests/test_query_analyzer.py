@@ -0,0 +1,67 @@
+import re
+import unittest
+
+from app.services.query_analyzer_service import QueryAnalyzer, KNOWN_SERIES
+from app.services.registry import BRANDS
+
+
+def _reference_series(text):
+    """The per-series re.search loop the analyzer replaced."""
+    for series in KNOWN_SERIES:
+        if re.search(r'(?:^|\W)' + re.escape(series) + r'(?:$|\W)', text.upper()):
+            return series
+    return None
+
+
+def _reference_brand(text):
+    for b_name in BRANDS:
+        if b_name.lower() in text.lower():
+            return BRANDS[b_name]["display_name"]
+    return None
+
+
+TEXTS = [
+    "Michael Kors Lexington Rose Gold Stainless Steel Watch MK7548I",
+    "michael kors parker corey watch",          # two series: list order wins, not position
+    "Fossil Gen 6 Smartwatch 44mm silver",
+    "Fossil GEN 5E golden",                     # no whole-word series, substring color
+    "Mamaearth Onion Hair Oil 250ml pack of 2",
+    "Sony WH-1000XM4 Wireless Headphones",
+    "Slimline sage-green kurta",                # 'SLIM' is not a word here, 'SAGE' is
+    "nike air jordan 1 low",
+    "",
+]
+
+
+class TestQueryAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.analyzer = QueryAnalyzer()
+
+    def test_matches_previous_per_entry_checks(self):
+        for text in TEXTS:
+            features = self.analyzer.analyze(text)
+            lower = text.lower()
+            self.assertEqual(features["collection"], _reference_series(text) if text else None, text)
+            self.assertEqual(features["brand"], _reference_brand(text), text)
+            self.assertEqual(features["is_brand_search"],
+                             any(b["display_name"].lower() in lower for b in BRANDS.values()) or len(text.split()) < 2)
+            expected_color = "ROSE GOLD" if "rose gold" in lower else "GOLD" if "gold" in lower else \
+                "SILVER" if "silver" in lower else None
+            self.assertEqual(features["color"], expected_color, text)
+            self.assertEqual(features["material"], "STAINLESS" if "stainless" in lower else None)
+            self.assertEqual(features["clean"], re.sub(r"[^a-zA-Z0-9]", "", text.upper()))
+
+    def test_model_numbers(self):
+        self.assertEqual(self.analyzer.model_numbers("Michael Kors MK-7548I Watch 1PC"), ["MK7548"])
+        self.assertEqual(self.analyzer.model_numbers("Sony WH-1000XM4 100ml 2 in 1"), ["WH1000XM4"])
+        self.assertEqual(self.analyzer.analyze("Michael Kors Parker")["models"], [])
+        self.assertEqual(self.analyzer.model_numbers("abc\u096a"), [])  # Devanagari digit is cleaned away
+
+    def test_series_priority_and_boundaries(self):
+        self.assertEqual(self.analyzer.series("corey or lexington"), "LEXINGTON")
+        self.assertEqual(self.analyzer.series("Slimline sage-green kurta"), "SAGE")
+        self.assertIsNone(self.analyzer.series("Parkerson"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+from serpapi import GoogleSearch
+
+from benchmarks.replay import RecordReplay
+
+SECRET = "sk-serp-test-secret"
+
+
+def _fake_send(adapter_self, request, **kwargs):
+    """Stand-in for the network: echo back a small JSON body."""
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.url = request.url
+    resp._content = b'{"shopping_results": []}'
+    resp.encoding = "utf-8"
+    resp.request = request
+    return resp
+
+
+class TestRecordReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "fixtures.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_record_keeps_secrets_off_disk_and_counts_serpapi_once(self):
+        recorder = RecordReplay(self.path, mode="record")
+        with mock.patch.object(requests.adapters.HTTPAdapter, "send", _fake_send), recorder.active():
+            GoogleSearch({"q": "kurta", "api_key": SECRET}).get_dict()
+            requests.get("https://example.com/p", params={"id": "1", "key": SECRET})
+
+        with open(self.path) as f:
+            saved = f.read()
+        self.assertNotIn(SECRET, saved)
+        self.assertEqual(recorder.snapshot()["calls"], {"serpapi": 1, "http": 1})
+        urls = [e["response"]["url"] for e in json.loads(saved).values() if e["type"] == "http"]
+        self.assertEqual(urls, ["https://example.com/p?id=1"])
+
+        replay = RecordReplay(self.path, mode="replay")
+        with replay.active():
+            self.assertEqual(GoogleSearch({"q": "kurta", "api_key": "other"}).get_dict(), {"shopping_results": []})
+            self.assertEqual(requests.get("https://example.com/p", params={"id": "1", "key": "x"}).status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
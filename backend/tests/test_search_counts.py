@@ -0,0 +1,66 @@
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import SearchQuery, SearchQueryCount
+from app.services.graph_service import GraphService
+from _cache_fixture import use_temp_cache
+
+
+class TestSearchCounts(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.graph = GraphService()
+        self.cache = use_temp_cache(self)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_record_search_updates_counters(self):
+        for q in ["Nike Air Jordan", "nike  air jordan", "fabindia kurta", "https://amzn.in/d/abc"]:
+            self.graph.record_search(self.db, q)
+
+        top = self.graph.get_popular_searches(self.db, 5)
+        self.assertEqual(top, [{"term": "nike air jordan", "count": 2}, {"term": "fabindia kurta", "count": 1}])
+        self.assertEqual(self.graph.get_top_searches(self.db, "today", 1)[0]["count"], 2)
+        self.assertEqual(self.graph.get_trending_searches(self.db, hours=24, limit=5)[0]["count"], 2)
+        with self.assertRaises(ValueError):
+            self.graph.get_top_searches(self.db, "fortnight")
+
+    def test_sliding_window_excludes_old_buckets_and_backfill(self):
+        old = datetime.utcnow() - timedelta(days=3)
+        self.db.add_all([SearchQuery(query_text="boat airdopes", timestamp=old) for _ in range(5)]
+                        + [SearchQuery(query_text="mamaearth onion oil", timestamp=datetime.utcnow())])
+        self.db.commit()
+
+        self.assertGreater(self.graph.backfill_search_counts(self.db), 0)
+        self.assertEqual(self.graph.backfill_search_counts(self.db), 0)  # only once
+        self.assertEqual(self.graph.get_top_searches(self.db, "all", 1)[0], {"term": "boat airdopes", "count": 5})
+        self.assertEqual([t["term"] for t in self.graph.get_top_searches(self.db, "24h")], ["mamaearth onion oil"])
+        self.assertEqual(self.graph.get_top_searches(self.db, "7d")[0]["count"], 5)
+
+        self.graph.prune_search_counts(self.db, hour_days=1)
+        self.assertEqual(self.db.query(SearchQueryCount).filter_by(granularity="hour").count(), 1)
+
+    def test_window_shows_latest_spelling(self):
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        self.graph._increment_counts(self.db, "nike air jordan", yesterday)
+        self.graph._increment_counts(self.db, "Nike Air Jordan", datetime.utcnow())
+        self.db.commit()
+        self.assertEqual(self.graph.get_top_searches(self.db, "7d"), [{"term": "Nike Air Jordan", "count": 2}])
+
+    def test_backfill_waits_for_the_worker_holding_the_lease(self):
+        self.db.add(SearchQuery(query_text="boat airdopes", timestamp=datetime.utcnow()))
+        self.db.commit()
+        self.assertTrue(self.cache.shared.try_lease("search_counts_backfill", "other-host:1", 60))
+        self.assertEqual(self.graph.backfill_search_counts(self.db), 0)
+        self.assertEqual(self.db.query(SearchQueryCount).count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import threading
+import unittest
+
+from app.services.cache_service import clear_all_cache
+from app.services.scraper_service import RealScraperService
+from app.services.smart_search_service import SmartSearchService
+from app.services.tracing_service import current_trace, traced
+from _cache_fixture import use_temp_cache
+
+
+class _StubScraper(RealScraperService):
+    def search_products(self, query):
+        slug = query.lower().replace(" ", "-")
+        return {"online": [{"title": query, "source": "Stub", "price": 100, "url": f"https://stub.example/{slug}"}], "local": []}
+
+
+class TestSearchStream(unittest.TestCase):
+    def setUp(self):
+        use_temp_cache(self)
+        self.service = SmartSearchService()
+        self.service.client = None
+        self.service.matcher.client = None
+        self.service.scraper = _StubScraper()
+
+    def test_event_order_and_final_matches_blocking_search(self):
+        events = list(self.service.smart_search_stream("Mamaearth", "Mumbai"))
+        kinds = [e["event"] for e in events]
+        self.assertEqual(kinds.count("results"), 8)  # one per marketplace sub-query
+        self.assertEqual(kinds[-2:], ["classified", "final"])
+
+        clear_all_cache()
+        blocking = self.service.smart_search("Mamaearth", "Mumbai")
+        streamed_urls = [i["url"] for i in events[-1]["data"]["results"]["online"]]
+        self.assertEqual(streamed_urls, [i["url"] for i in blocking["results"]["online"]])
+
+    def test_cache_hit_yields_only_final(self):
+        self.service.smart_search("Mamaearth", "Mumbai")
+        # Online results don't depend on the client's city, so Delhi shares Mumbai's entry
+        events = list(self.service.smart_search_stream("Mamaearth", "Delhi"))
+        self.assertEqual([e["event"] for e in events], ["final"])
+
+    def test_fanout_runs_on_its_own_pool_inside_the_trace(self):
+        seen = []
+        search = self.service.scraper.search_products
+        self.service.scraper.search_products = lambda q: seen.append(
+            (threading.current_thread().name, current_trace())) or search(q)
+
+        with traced("fanout_test") as trace:
+            self.service.smart_search("Mamaearth", "Mumbai")
+        self.assertEqual(len(seen), 8)
+        self.assertTrue(all(name.startswith("fanout") for name, _ in seen), seen)
+        self.assertTrue(all(t is trace for _, t in seen))
+
+    def test_cache_query_canonicalizes_shared_links(self):
+        shared = [
+            "https://www.amazon.in/Boat-Airdopes/dp/B0CHX1W1XY/ref=sr_1_1?utm_source=whatsapp&srsltid=AfmB#reviews",
+            "https://m.amazon.in/dp/B0CHX1W1XY?th=1",
+        ]
+        self.assertEqual({self.service._cache_query(u) for u in shared}, {"amazon.in/asin:B0CHX1W1XY"})
+        self.assertEqual(
+            self.service._cache_query("https://www.myntra.com/kurtas/fabindia/123/buy?utm_medium=ig&igshid=x"),
+            self.service._cache_query("https://myntra.com/kurtas/fabindia/123/buy/"))
+        self.assertEqual(self.service._cache_query("boat airdopes"), "boat airdopes")
+
+        # ASIN-looking segments only count on Amazon hosts
+        self.assertEqual(self.service._cache_query("https://www.myntra.com/kurtas/B0CHX1W1XY/buy?utm_source=x"),
+                         "myntra.com/kurtas/B0CHX1W1XY/buy")
+
+
+if __name__ == "__main__":
+    unittest.main()
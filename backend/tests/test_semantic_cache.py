@@ -0,0 +1,68 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app.services.cache_service import cache_search, clear_all_cache
+from app.services.semantic_cache_service import SemanticQueryCache, hashing_embedding
+from _cache_fixture import use_temp_cache
+
+
+class TestSemanticCache(unittest.TestCase):
+    def setUp(self):
+        use_temp_cache(self)
+        self.cache = SemanticQueryCache(embed=hashing_embedding, threshold=0.85)
+
+    def _store(self, query, location="mumbai"):
+        cache_search(query, location, {"original_query": query, "results": {"online": []}})
+        self.cache.add(query, location)
+
+    def test_reordered_query_served_with_marker(self):
+        self._store("michael kors lexington watch")
+        hit = self.cache.lookup("Lexington  Michael Kors", "Mumbai")
+        self.assertEqual(hit["served_from"], "semantic_cache")
+        self.assertEqual(hit["semantic_match"]["query"], "michael kors lexington watch")
+        self.assertIsNone(self.cache.lookup("fossil gen 6 smartwatch", "mumbai"))
+        self.assertIsNone(self.cache.lookup("lexington michael kors", "delhi"))
+
+    def test_numbers_must_agree(self):
+        self._store("mamaearth onion hair oil 250ml")
+        self.assertIsNone(self.cache.lookup("onion hair oil mamaearth 400ml", "mumbai"))
+        self.assertIsNotNone(self.cache.lookup("onion hair oil mamaearth 250ml", "mumbai"))
+
+    def test_audience_colour_material_and_brand_must_agree(self):
+        # Every query embeds identically, so only the attribute check can keep them apart
+        self.cache = SemanticQueryCache(embed=lambda q: np.ones(8, dtype=np.float32), threshold=0.85)
+        self._store("fabindia cotton kurta for men")
+        self._store("red cotton kurta")
+        self.assertIsNone(self.cache.lookup("fabindia cotton kurta for women", "mumbai"))
+        self.assertIsNone(self.cache.lookup("fabindia cotton kurta for kids", "mumbai"))
+        self.assertIsNone(self.cache.lookup("blue cotton kurta", "mumbai"))
+        self.assertIsNone(self.cache.lookup("michael kors lexington stainless watch", "mumbai"))
+        self.assertEqual(self.cache.lookup("cotton kurta for men fabindia", "mumbai")["semantic_match"]["query"],
+                         "fabindia cotton kurta for men")
+        self.assertEqual(self.cache.lookup("cotton kurta red", "mumbai")["semantic_match"]["query"], "red cotton kurta")
+
+        self._store("michael kors lexington rose gold watch")
+        self.assertIsNone(self.cache.lookup("michael kors lexington silver watch", "mumbai"))
+        self.assertIsNone(self.cache.lookup("michael kors parker rose gold watch", "mumbai"))
+        self.assertIsNone(self.cache.lookup("fossil lexington rose gold watch", "mumbai"))
+        self.assertIsNotNone(self.cache.lookup("lexington rose gold michael kors watch", "mumbai"))
+
+    def test_expired_results_drop_the_pointer_and_index_grows(self):
+        for i in range(70):  # past the initial 64-row capacity
+            self._store(f"kurta set style {i}")
+        self.assertEqual(self.cache.stats()["size"], 70)
+        clear_all_cache()
+        self.assertIsNone(self.cache.lookup("kurta set style 5", "mumbai"))
+        self.assertEqual(self.cache.stats()["stale_pointers"], 1)
+        self.assertEqual(self.cache.stats()["size"], 69)
+
+    def test_embedding_failure_is_a_miss(self):
+        self._store("nike air jordan")
+        self.cache.embed_fn = mock.Mock(side_effect=RuntimeError("quota"))
+        self.assertIsNone(self.cache.lookup("jordan nike air shoes", "mumbai"))
+
+
+if __name__ == "__main__":
+    unittest.main()
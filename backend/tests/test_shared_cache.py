@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from app.services.cache_service import CacheService
+from app.services.search_payload_codec import pack_search, unpack_search
+from app.services.shared_cache_service import SharedCacheStore
+
+class TestSharedCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "shared_cache.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _worker(self, **kwargs):
+        return CacheService(shared=SharedCacheStore(self.path), **kwargs)
+
+    def test_workers_share_results(self):
+        a, b = self._worker(), self._worker()
+        a.set("search:oneplus 12:mumbai", {"online": [1, 2]}, 60)
+
+        self.assertEqual(b.get("search:oneplus 12:mumbai"), {"online": [1, 2]})
+        self.assertEqual(b.stats()["shared_hits"], 1)
+        b.get("search:oneplus 12:mumbai")  # now served from b's L1
+        self.assertEqual(b.stats()["shared_hits"], 1)
+        self.assertEqual(b.stats()["hits"], 2)
+
+    def test_clear_propagates_after_l1_ttl(self):
+        a, b = self._worker(l1_ttl=0), self._worker(l1_ttl=0)
+        a.set("brand:fabindia", {"items": []}, 60)
+        self.assertIsNotNone(b.get("brand:fabindia"))
+
+        a.clear()
+        self.assertIsNone(b.get("brand:fabindia"))
+
+    def test_l1_is_bounded_and_expired_entries_miss(self):
+        cache = self._worker(max_entries=2)
+        for key in ("search:a", "search:b", "search:c"):
+            cache.set(key, key, 60)
+        cache.set("search:gone", "x", -1)
+
+        self.assertEqual(cache.stats()["size"], 2)
+        self.assertEqual(cache.get("search:a"), "search:a")  # refilled from the shared tier
+        self.assertIsNone(cache.get("search:gone"))
+
+    def test_search_payload_round_trip(self):
+        items = [{"id": str(i), "url": f"https://shop/p/{i}", "immersive_token": "t" * 200} for i in range(3)]
+        response = {"original_query": "kurta", "results": {"online": items, "local": [],
+                    "exact_matches": [items[0]], "variant_matches": [dict(items[1])], "similar_matches": [items[2]]},
+                    "clean_brands": []}
+
+        packed = pack_search(response)
+        self.assertEqual(unpack_search(packed), response)
+        self.assertEqual(list(unpack_search(packed)), list(response))
+        self.assertEqual(unpack_search(pack_search({"results": None})), {"results": None})
+
+        cache = self._worker()
+        cache.register_codec("search", pack_search, unpack_search)
+        cache.set("search:kurta:mumbai", response, 60)
+        hit = cache.get("search:kurta:mumbai")
+        self.assertEqual(hit, response)
+        hit["results"]["online"].clear()  # callers get their own copy
+        self.assertEqual(len(cache.get("search:kurta:mumbai")["results"]["online"]), 3)
+        self.assertGreater(cache.stats()["encoded_bytes"], 0)
+
+    def test_l1_hits_decode_outside_the_lock(self):
+        cache = self._worker()
+        held = []
+
+        def decode(blob):
+            held.append(cache._lock.locked())
+            return unpack_search(blob)
+
+        cache.register_codec("search", pack_search, decode)
+        cache.set("search:kurta:mumbai", {"results": {"online": [1]}}, 60)
+        cache.get("search:kurta:mumbai")  # L1 hit
+        self.assertEqual(held, [False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import time
+import unittest
+from app.services.stage_executor import StageExecutor
+
+class TestStageExecutor(unittest.TestCase):
+    def test_independent_stages_run_concurrently(self):
+        ex = StageExecutor("test")
+        ex.add("root", lambda r: "url")
+        ex.add("a", lambda r: time.sleep(0.2) or r["root"] + ":a", deps=["root"])
+        ex.add("b", lambda r: time.sleep(0.2) or r["root"] + ":b", deps=["root"])
+
+        started = time.perf_counter()
+        run = ex.run()
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(run["results"]["a"], "url:a")
+        self.assertEqual(run["results"]["b"], "url:b")
+        self.assertLess(elapsed, 0.35)
+        self.assertIn("a", run["timings_ms"])
+
+    def test_accept_cancels_remaining(self):
+        ex = StageExecutor("test")
+        ex.add("fast", lambda r: "good")
+        ex.add("slow", lambda r: time.sleep(1) or "late")
+        ex.add("after_slow", lambda r: "never", deps=["slow"])
+
+        run = ex.run(accept=lambda name, value, results: value == "good")
+
+        self.assertEqual(run["accepted_by"], "fast")
+        self.assertEqual(run["status"]["slow"], "cancelled")
+        self.assertEqual(run["status"]["after_slow"], "cancelled")
+
+    def test_failed_dependency_skips_dependents(self):
+        ex = StageExecutor("test")
+        ex.add("boom", lambda r: 1 / 0)
+        ex.add("child", lambda r: "x", deps=["boom"])
+
+        run = ex.run()
+
+        self.assertEqual(run["status"]["boom"], "error")
+        self.assertEqual(run["status"]["child"], "skipped")
+
+    def test_hedged_stage_skipped_after_accept(self):
+        calls = []
+        ex = StageExecutor("test")
+        ex.add("cheap", lambda r: "answer")
+        ex.add("paid", lambda r: calls.append(1), hedge_on="cheap", hedge_seconds=1)
+
+        ex.run(accept=lambda name, value, results: name == "cheap")
+        time.sleep(0.05)
+
+        self.assertEqual(calls, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from unittest import mock
+
+from app.services import suggest_service
+from app.services.registry import BRANDS
+from app.services.suggest_service import SuggestIndex
+
+
+class TestSuggestIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SuggestIndex()
+        self.index.build(BRANDS, [
+            {"term": "nike air jordan 1", "count": 40},
+            {"term": "Nike Air Max", "count": 12},
+            {"term": "nivea body lotion", "count": 3},
+            {"term": "nikon camera", "count": 1},  # below SUGGEST_MIN_COUNT
+        ])
+
+    def test_prefix_ranking_and_word_start_matches(self):
+        texts = [s["text"] for s in self.index.suggest("Ni", 20)]
+        self.assertEqual(texts[0], "Nike")  # registry brand first
+        self.assertIn("nike air jordan 1", texts)
+        self.assertNotIn("nikon camera", texts)
+        self.assertLess(texts.index("nike air jordan 1"), texts.index("Nike Air Max"))
+
+        self.assertIn("nike air jordan 1", [s["text"] for s in self.index.suggest("jordan")])
+        self.assertEqual(self.index.suggest(""), [])
+
+    def test_logged_searches_become_suggestions(self):
+        self.assertEqual(self.index.suggest("zzz kurta"), [])
+        self.index.record("ZZZ  Kurta")
+        self.assertEqual(self.index.suggest("zzz kurta"), [])
+        self.index.record("zzz kurta")
+        self.assertEqual(self.index.suggest("zzz k")[0], {"text": "zzz kurta", "type": "query", "count": 2})
+        self.index.record("https://amzn.in/d/xyz")
+        self.assertEqual(self.index.suggest("https"), [])
+
+    def test_prefix_slice_matches_full_scan_on_a_large_index(self):
+        searches = [{"term": f"query {i} product", "count": 2 + i % 50} for i in range(5000)]
+        with mock.patch.object(suggest_service, "SUGGEST_MIN_COUNT", 2):
+            self.index.build(BRANDS, searches)
+
+        def full_scan(prefix, limit):
+            matches = []
+            for phrase, entry in self.index._phrases.items():
+                keys = [k for k in SuggestIndex._index_keys(phrase) if k.startswith(prefix)]
+                if keys:
+                    rank = (SuggestIndex._score(entry), phrase in keys, -len(phrase))
+                    matches.append((rank, entry["text"]))
+            return [text for _, text in sorted(matches, key=lambda m: m[0], reverse=True)[:limit]]
+
+        for prefix in ("query 12", "query 4", "q", "product", "ni", "zzz"):
+            self.index._memo.clear()  # exercise the bisect + top-K, not the memo
+            self.assertEqual([s["text"] for s in self.index.suggest(prefix, 8)], full_scan(prefix, 8), prefix)
+        self.assertIn(("zzz", 8), self.index._memo)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from app.services.title_normalizer_service import TitleNormalizerService
+
+class TestTitleNormalizerService(unittest.TestCase):
+    def setUp(self):
+        self.normalizer = TitleNormalizerService()
+
+    def test_strips_filler_and_site_suffix(self):
+        result = self.normalizer.normalize(
+            "Buy Mamaearth Onion Hair Oil for Hair Growth - 250ml Online at Best Price in India | Amazon.in",
+            source="og"
+        )
+        self.assertEqual(result["brand"], "Mamaearth")
+        self.assertEqual(result["search_query"], "Mamaearth Onion Hair Oil for Hair Growth 250ml")
+        self.assertEqual(result["size"], "250ml")
+        self.assertGreaterEqual(result["confidence"], 0.75)
+
+    def test_structured_brand_and_pack(self):
+        result = self.normalizer.normalize("Onion Hair Oil 250 ml (Pack of 2)", brand_hint="Mamaearth", source="json_ld")
+        self.assertEqual(result["product_name"], "Mamaearth Onion Hair Oil 250 ml (Pack of 2)")
+        self.assertEqual(result["search_query"], "Mamaearth Onion Hair Oil 250ml")
+        self.assertEqual(result["pack"], 2)
+        self.assertEqual(result["confidence"], 1.0)
+
+    def test_unknown_brand_long_title_is_low_confidence(self):
+        result = self.normalizer.normalize(
+            "BRUTON Shoes for Men Running Sports Walking Gym Training Casual Sneakers Lightweight Stylish Comfortable",
+            source="og"
+        )
+        self.assertEqual(result["brand"], "Unknown")
+        self.assertLess(result["confidence"], 0.75)
+
+    def test_brand_alias_needs_word_boundary(self):
+        brand, _ = self.normalizer.detect_brand("Pumpkin Spice Candle")
+        self.assertIsNone(brand)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from types import SimpleNamespace
+
+from app.services.stage_executor import StageExecutor
+from app.services.tracing_service import (
+    traced, trace_span, record_llm, record_serpapi, current_trace, aggregate_traces
+)
+
+
+class TestTracing(unittest.TestCase):
+    def test_spans_and_costs_recorded(self):
+        usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=100)
+        with traced("unit_trace", query="x") as trace:
+            with trace_span("stage_a"):
+                record_serpapi()
+                record_llm("gpt-4o-mini", SimpleNamespace(usage=usage))
+            record_llm("gpt-4o", None, vision=True)
+        summary = trace.summary()
+        self.assertIn("stage_a", summary["stages_ms"])
+        self.assertEqual(summary["calls"], {"serpapi": 1, "gpt-4o-mini": 1, "gpt-4o-vision": 1})
+        self.assertEqual(summary["tokens"]["gpt-4o-mini"], 1100)
+        self.assertGreater(summary["estimated_cost_usd"], 0.01)
+        self.assertIsNone(current_trace())
+        self.assertGreaterEqual(aggregate_traces("unit_trace")["calls"]["serpapi"], 1)
+
+    def test_nested_traced_joins_outer(self):
+        with traced("unit_outer") as outer:
+            with traced("unit_inner", cache_hit=True) as inner:
+                self.assertIs(inner, outer)
+        self.assertTrue(outer.tags["cache_hit"])
+
+    def test_no_trace_is_noop(self):
+        record_serpapi()
+        with trace_span("orphan"):
+            pass
+        self.assertIsNone(current_trace())
+
+    def test_stage_executor_propagates_trace(self):
+        with traced("unit_stages") as trace:
+            ex = StageExecutor("unit")
+            ex.add("a", lambda r: record_serpapi())
+            ex.run(timeout=5)
+        self.assertEqual(trace.calls.get("serpapi"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
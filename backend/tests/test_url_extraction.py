@@ -0,0 +1,62 @@
+import time
+import unittest
+from unittest import mock
+
+from app.services import url_scraper_service
+from app.services.tracing_service import traced
+from app.services.url_scraper_service import URLScraperService
+
+PRODUCT_URL = "https://shop.example/p/blue-kurta"
+
+
+class TestURLExtractionStages(unittest.TestCase):
+    def setUp(self):
+        self.service = URLScraperService()
+        self.service.serpapi_key = "test"
+        self.service._resolve_url = lambda url: url
+        self.lookups = []
+        self.service._lookup_indexed_url = lambda url: self.lookups.append(url) or {"product_name": "Indexed"}
+
+    def _run(self, meta, delay=0.0):
+        self.service._extract_metadata_from_html = lambda url: time.sleep(delay) or meta
+        with mock.patch.object(url_scraper_service, "URL_SERPAPI_HEDGE_MS", 50), traced("url_test") as trace:
+            run = self.service._run_extraction_stages(PRODUCT_URL)
+        return run, trace
+
+    def test_json_ld_page_makes_no_paid_lookup(self):
+        run, trace = self._run({"json_ld": {"name": "Blue Kurta"}, "title": "Blue Kurta"})
+        self.assertEqual(run["accepted_by"], "html_meta")
+        self.assertEqual(self.lookups, [])
+        self.assertNotIn("url_serpapi", trace.tags)
+
+    def test_lookup_is_hedged_and_upgrades_an_og_title(self):
+        started = time.perf_counter()
+        self.service._lookup_indexed_url = lambda url: self.lookups.append(time.perf_counter() - started) or {
+            "product_name": "Indexed"}
+        run, trace = self._run({"title": "Blue Kurta | Shop"}, delay=0.3)
+        self.assertEqual(len(self.lookups), 1)
+        self.assertLess(self.lookups[0], 0.25)  # started before the slow HTML fetch finished
+        self.assertEqual(run["results"]["serpapi"], {"product_name": "Indexed"})
+        self.assertEqual(trace.tags["url_serpapi"], "hedge")
+
+        self.service._run_extraction_stages = lambda url: run
+        info = self.service.extract_product_from_url(PRODUCT_URL)
+        self.assertEqual(info["confidence"], "high")
+        self.assertTrue(info["product_name"].startswith("Indexed"))
+
+    def test_hedge_made_moot_by_late_json_ld_is_tagged(self):
+        run, trace = self._run({"json_ld": {"name": "Blue Kurta"}}, delay=0.2)
+        self.assertEqual(len(self.lookups), 1)
+        self.assertEqual(trace.tags["url_serpapi"], "hedge_unused")
+
+    def test_opt_out_runs_lookup_after_html_meta(self):
+        with mock.patch.object(url_scraper_service, "URL_SERPAPI_HEDGE", False):
+            run, trace = self._run({"title": "Blue Kurta | Shop"})
+            self.assertEqual(run["results"]["serpapi"], {"product_name": "Indexed"})
+            self.assertEqual(trace.tags["url_serpapi"], "after_html")
+            self._run({"json_ld": {"name": "Blue Kurta"}}, delay=0.2)
+        self.assertEqual(len(self.lookups), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()